@@ -0,0 +1,138 @@
+"""
+Build many videos in one process.
+
+Usage:
+    python batch.py batch.json [--network 4] [--cpu 2] [--projects 4]
+
+batch.json is a list of projects (or {"projects": [...]}), each with at least
+a "name" and a "prompt"; any other Project field (images_per_video, channel,
+base_dir) can be set per entry.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from logger import get_logger
+from main import STAGES, run_project
+from project import Project
+
+load_dotenv()
+
+logger = get_logger()
+
+
+def load_batch(path: str) -> List[Project]:
+    with open(path) as f:
+        data = json.load(f)
+    entries = data["projects"] if isinstance(data, dict) else data
+    projects = [Project.from_dict(entry) for entry in entries]
+    names = [p.name for p in projects]
+    if len(names) != len(set(names)):
+        raise ValueError("Project names in a batch must be unique")
+    return projects
+
+
+def run_batch(
+    projects: List[Project],
+    network_slots: int = 4,
+    cpu_slots: Optional[int] = None,
+    max_projects: Optional[int] = None,
+    force=(),
+    from_stage: Optional[str] = None
+) -> Dict:
+    """
+    Runs the pipeline of every project, sharing bounded worker pools between them.
+
+    Generation stages (script, prompts, images) share `network_slots` slots;
+    audio and video rendering run in a process pool of `cpu_slots` workers so
+    they are not serialized by the GIL. Gemini clients, the HTTP session and
+    decoded background tracks are cached per process and therefore shared by
+    every project handled there.
+
+    Args:
+        projects (List[Project]): Projects to build
+        network_slots (int): Maximum concurrent network-bound stages (default: 4)
+        cpu_slots (int): Maximum concurrent rendering stages (default: half the CPU cores)
+        max_projects (int): Maximum projects in flight at once (default: network_slots + cpu_slots)
+        force (Iterable[str]): Stages to rerun in every project even if up to date
+        from_stage (str): Rerun this stage and every stage after it in every project
+
+    Returns:
+        dict: Per-project status and aggregate throughput
+    """
+    cpu_slots = cpu_slots or max(1, (os.cpu_count() or 2) // 2)
+    max_projects = max_projects or network_slots + cpu_slots
+    resources = {
+        "network": threading.BoundedSemaphore(network_slots),
+        "cpu": threading.BoundedSemaphore(cpu_slots),
+    }
+
+    started = time.monotonic()
+    results = {}
+    # spawn: the parent holds threads, which fork does not copy safely
+    with ProcessPoolExecutor(max_workers=cpu_slots, mp_context=multiprocessing.get_context("spawn")) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=max_projects, thread_name_prefix="project") as project_pool:
+        futures = {
+            project_pool.submit(run_project, p, force=force, from_stage=from_stage,
+                                resources=resources, cpu_executor=cpu_pool): p
+            for p in projects
+        }
+        for future, project in futures.items():
+            try:
+                report = future.result()
+                results[project.name] = {
+                    "ok": report.ok,
+                    "wall_time": round(report.wall_time, 1),
+                    "failed": {r.name: r.error for r in report.failed()},
+                }
+            except Exception as e:
+                logger.error(f"Project {project.name} crashed: {e}")
+                results[project.name] = {"ok": False, "wall_time": None, "failed": {"pipeline": str(e)}}
+
+    elapsed = time.monotonic() - started
+    completed = sum(1 for r in results.values() if r["ok"])
+    return {
+        "projects": results,
+        "completed": completed,
+        "failed": len(results) - completed,
+        "wall_time": round(elapsed, 1),
+        "videos_per_hour": round(completed / (elapsed / 3600), 2) if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build several projects with shared worker pools")
+    parser.add_argument("manifest", help="JSON file listing the projects to build")
+    parser.add_argument("--network", type=int, default=4, help="Concurrent network-bound stages")
+    parser.add_argument("--cpu", type=int, default=None, help="Concurrent rendering stages")
+    parser.add_argument("--projects", type=int, default=None, help="Projects in flight at once")
+    parser.add_argument("--from-stage", choices=STAGES, metavar="STAGE", default=None,
+                        help=f"Rerun this stage and every stage after it ({', '.join(STAGES)})")
+    parser.add_argument("--force-all", action="store_true", help="Ignore manifests and rerun everything")
+    args = parser.parse_args()
+
+    summary = run_batch(
+        load_batch(args.manifest),
+        network_slots=args.network,
+        cpu_slots=args.cpu,
+        max_projects=args.projects,
+        force=STAGES if args.force_all else (),
+        from_stage=args.from_stage,
+    )
+    for name, result in summary["projects"].items():
+        status = "done" if result["ok"] else f"failed ({', '.join(result['failed'])})"
+        print(f"{name}: {status}")
+    print(f"Completed {summary['completed']}/{len(summary['projects'])} videos in {summary['wall_time']:.1f}s "
+          f"({summary['videos_per_hour']:.2f} videos/hour)")
+    logger.info(f"Batch summary: {json.dumps(summary)}")
+
+
+if __name__ == "__main__":
+    main()
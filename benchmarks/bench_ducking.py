@@ -0,0 +1,75 @@
+"""
+Cost of speech-aware ducking in the audio stage.
+
+Builds a synthetic narration (speech bursts with pauses) and a background
+track, then times media_methods.duck_under_speech against the per-segment
+approach it replaces (splitting the background into short segments and
+applying a pydub gain to each), and the constant reduction of before.
+Checks that the ducked background sits `--reduction` dB down under speech
+and `--depth` dB higher in pauses.
+
+Usage:
+    python benchmarks/bench_ducking.py [--seconds 300] [--segment-ms 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300, help="Length of the narration")
+    parser.add_argument("--segment-ms", type=int, default=50, help="Segment length of the pydub approach")
+    parser.add_argument("--reduction", type=float, default=20, help="Reduction under speech (dB)")
+    parser.add_argument("--depth", type=float, default=8, help="Rise in pauses (dB)")
+    args = parser.parse_args()
+
+    from pydub import AudioSegment
+    from pydub.generators import Sine, WhiteNoise
+    from media_methods import duck_under_speech
+
+    # 3 s of speech, 2 s of pause, like gTTS output (24 kHz mono)
+    burst = Sine(180).to_audio_segment(duration=3000, volume=-18).set_frame_rate(24000).set_channels(1)
+    pause = AudioSegment.silent(duration=2000, frame_rate=24000)
+    narration = (burst + pause) * (args.seconds // 5)
+    background = WhiteNoise().to_audio_segment(duration=len(narration) + 2000, volume=-15)
+    background = background.set_channels(2).set_frame_rate(44100).set_sample_width(2)
+
+    start = time.perf_counter()
+    background - args.reduction
+    constant_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ducked = AudioSegment.empty()
+    step = args.segment_ms
+    for pos in range(0, len(background), step):
+        speaking = narration[pos:pos + step].dBFS > -40
+        gain = -args.reduction if speaking else args.depth - args.reduction
+        ducked += background[pos:pos + step].apply_gain(gain)
+    segments_time = time.perf_counter() - start
+
+    duck_under_speech(background[:1000], narration[:1000], args.reduction, args.depth)  # warm up imports
+    start = time.perf_counter()
+    ducked = duck_under_speech(background, narration, args.reduction, args.depth)
+    vector_time = time.perf_counter() - start
+
+    print(f"{args.seconds}s narration, {len(background) / 1000:.0f}s stereo background")
+    print(f"constant gain:             {constant_time:.3f}s")
+    print(f"pydub gain per {step}ms:     {segments_time:.3f}s")
+    print(f"duck_under_speech:         {vector_time:.3f}s  x{segments_time / vector_time:.1f}")
+
+    speech_db = ducked[1000:2000].dBFS - background[1000:2000].dBFS
+    pause_db = ducked[3800:4500].dBFS - background[3800:4500].dBFS
+    print(f"gain under speech {speech_db:.2f} dB, in pauses {pause_db:.2f} dB")
+    if abs(speech_db + args.reduction) > 0.5 or abs(pause_db - (args.depth - args.reduction)) > 0.5:
+        print("UNEXPECTED GAIN")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
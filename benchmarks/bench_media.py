@@ -0,0 +1,239 @@
+"""
+Offline benchmark of the media pipeline's hot paths.
+
+Generates synthetic images, narration and background music, then times
+create_audio_with_background (with TTS stubbed by the synthetic narration and
+captions timed over it), ingest_images,
+create_video_with_transitions and add_intro_and_closure for every
+combination of video duration and image count. Each case runs in its own
+interpreter so peak memory is measured per case.
+
+Usage:
+    python benchmarks/bench_media.py [--durations 10 30 60] [--images 5 15] [--size 1920x1080]
+    python benchmarks/bench_media.py --save-baseline      # store results as the new baseline
+    python benchmarks/bench_media.py --tolerance 0.15     # flag cases >15% slower than baseline
+
+Results are compared against benchmarks/baseline_media.json when it exists;
+the exit status is 1 if any case regressed.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline_media.json")
+FPS = 30
+
+# Metrics compared against the baseline (lower is better)
+COMPARED = ("audio_time", "ingest_time", "video_time", "final_time", "peak_rss_mb")
+
+
+def synth_images(folder, count, size, seed=0):
+    """
+    Write `count` distinct PNGs of `size` (w, h): a gradient, smooth blobs
+    (so that ingestion does not take them for near-duplicates) and noise.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    for i in range(count):
+        base = rng.uniform(0, 255, 3)
+        angle = rng.uniform(0, np.pi)
+        ramp = (np.cos(angle) * xx / w + np.sin(angle) * yy / h)[..., None]
+        blobs = Image.fromarray(rng.uniform(0, 255, (6, 8)).astype(np.uint8)).resize((w, h), Image.BICUBIC)
+        img = base + 60 * ramp + (np.asarray(blobs, dtype=np.float32)[..., None] - 128) + rng.normal(0, 12, (h, w, 3))
+        Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(os.path.join(folder, f"gen_{i:03d}.png"))
+
+
+def synth_audio(duration, seed=0, speech_like=True):
+    """
+    Synthetic narration (syllable-like tone bursts with pauses) or background
+    music (slow chord), as a 44.1kHz stereo AudioSegment.
+    """
+    import numpy as np
+    from pydub import AudioSegment
+
+    sr = 44100
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    if speech_like:
+        pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+        carrier = np.sin(2 * np.pi * np.cumsum(pitch) / sr) + 0.3 * rng.normal(0, 1, t.size)
+        syllables = (np.sin(2 * np.pi * 4 * t) > 0) * (np.sin(2 * np.pi * 0.25 * t) > -0.6)
+        signal = 0.3 * carrier * syllables
+    else:
+        signal = 0.1 * sum(np.sin(2 * np.pi * f * t) for f in (220, 277.2, 329.6))
+    samples = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    stereo = np.repeat(samples[:, None], 2, axis=1)
+    return AudioSegment(stereo.tobytes(), frame_rate=sr, sample_width=2, channels=2)
+
+
+def peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+
+def run_case(duration, images, size, intro, closure):
+    """Run one case in this process and return its measurements."""
+    sys.path.insert(0, ROOT)
+    from media_methods import create_audio_with_background, create_video_with_transitions, add_intro_and_closure
+    from ingest import ingest_images
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proj = os.path.join(tmp, "project")
+        img_dir = os.path.join(proj, "images")
+        script_dir = os.path.join(proj, "script")
+        bg_dir = os.path.join(tmp, "backgrounds")
+        for d in (img_dir, script_dir, bg_dir):
+            os.makedirs(d)
+        synth_images(img_dir, images, size)
+        background = synth_audio(90, seed=1, speech_like=False)
+        background.export(os.path.join(bg_dir, "bg_synthetic.wav"), format="wav")
+        with open(os.path.join(bg_dir, "catalog.json"), "w") as f:
+            json.dump({"tracks": [{"id": "bg_synthetic", "path": "bg_synthetic.wav", "status": "complete",
+                                   "duration": len(background) / 1000, "loudness": background.dBFS}]}, f)
+        # Narration is shorter than the target so fades bring the video to ~duration
+        narration = synth_audio(max(1.0, duration - 2))
+
+        result = {"duration": duration, "images": images, "size": f"{size[0]}x{size[1]}"}
+        audio_path = os.path.join(script_dir, "script.mp3")
+        start = time.perf_counter()
+        # Captions are timed over the narration and drawn by the video step
+        words = "the new model brings more power a sharper design and better range to every rider".split()
+        text = ". ".join(" ".join(words[(i + j) % len(words)] for j in range(8)) for i in range(int(duration) // 2))
+        ok, msg = create_audio_with_background(
+            text=text, bg_music_path=bg_dir, output_path=audio_path, captions_path=os.path.join(script_dir, "captions.json"),
+            bg_volume_reduction=20, fade_duration=2000, crossfade_duration=1000, tts_audio=narration)
+        result["audio_time"] = round(time.perf_counter() - start, 3)
+        if not ok:
+            raise RuntimeError(msg)
+
+        start = time.perf_counter()
+        ok, msg = ingest_images(img_dir, os.path.join(proj, "canvas"), size=size)
+        result["ingest_time"] = round(time.perf_counter() - start, 3)
+        if not ok:
+            raise RuntimeError(msg)
+
+        compiled = os.path.join(proj, "compiled_video.mp4")
+        start = time.perf_counter()
+        ok, msg = create_video_with_transitions(
+            base_folder=proj, output_path=compiled,
+            image_duration=8.0, transition_duration=3.0, min_zoom=1.0, max_zoom=1.2)
+        result["video_time"] = round(time.perf_counter() - start, 3)
+        if not ok:
+            raise RuntimeError(msg)
+
+        from moviepy.editor import VideoFileClip
+        with VideoFileClip(compiled) as clip:
+            media_duration = clip.duration
+        frames = int(media_duration * FPS)
+        result["media_duration"] = round(media_duration, 2)
+        result["video_fps"] = round(frames / result["video_time"], 2)
+        result["video_rtf"] = round(result["video_time"] / media_duration, 3)
+
+        final = os.path.join(proj, "final_video.mp4")
+        start = time.perf_counter()
+        ok, msg = add_intro_and_closure(final_video_path=compiled, output_path=final,
+                                        intro_path=intro, closure_path=closure)
+        result["final_time"] = round(time.perf_counter() - start, 3)
+        if not ok:
+            raise RuntimeError(msg)
+        with VideoFileClip(final) as clip:
+            result["final_fps"] = round(clip.duration * FPS / result["final_time"], 2)
+            result["final_rtf"] = round(result["final_time"] / clip.duration, 3)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def case_key(result):
+    return f"{result['size']}/{result['duration']}s/{result['images']}img"
+
+
+def compare(results, baseline, tolerance):
+    """Return regression messages for results worse than baseline by more than `tolerance`."""
+    regressions = []
+    for result in results:
+        base = baseline.get(case_key(result))
+        if not base:
+            continue
+        for metric in COMPARED:
+            if metric in base and metric in result and base[metric] > 0 and result[metric] > base[metric] * (1 + tolerance):
+                change = 100 * (result[metric] / base[metric] - 1)
+                regressions.append(f"{case_key(result)} {metric}: {result[metric]} vs {base[metric]} (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[10, 30, 60], help="Video durations (s)")
+    parser.add_argument("--images", type=int, nargs="+", default=[5, 15], help="Image counts")
+    parser.add_argument("--size", default="1920x1080", help="Image size WxH")
+    parser.add_argument("--intro", default=os.path.join(ROOT, "meta", "intro.mp4"))
+    parser.add_argument("--closure", default=os.path.join(ROOT, "meta", "closure.mp4"))
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before flagging")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    if args.case:
+        # Child process: run one case and print its measurements
+        case = json.loads(args.case)
+        print(json.dumps(run_case(case["duration"], case["images"], size, args.intro, args.closure)))
+        return 0
+
+    results = []
+    for duration in args.durations:
+        for images in args.images:
+            case = json.dumps({"duration": duration, "images": images})
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--case", case, "--size", args.size,
+                 "--intro", args.intro, "--closure", args.closure],
+                capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"Case {duration}s/{images} images failed:\n{out.stderr[-2000:]}")
+                return 1
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{case_key(result):<24} audio {result['audio_time']:>7.2f}s  ingest {result['ingest_time']:>6.2f}s  "
+                  f"video {result['video_time']:>7.2f}s ({result['video_fps']:.1f} fps, RTF {result['video_rtf']:.2f})  "
+                  f"final {result['final_time']:>7.2f}s ({result['final_fps']:.1f} fps)  "
+                  f"peak {result['peak_rss_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        baseline.update({case_key(r): r for r in results})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION: {line}")
+    if baseline and not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
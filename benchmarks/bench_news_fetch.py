@@ -0,0 +1,61 @@
+"""
+News fetching in utils/trend_finder.py against a local fake GNews.
+
+Times the original pattern (one search per product with a one-second pause
+in between) against NewsFetcher's concurrent, rate-limited fetch, and then
+a repeated run that is served from the TTL cache.
+
+Usage:
+    python benchmarks/bench_news_fetch.py [--products 10] [--latency 0.5] [--rate 2] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "utils"))
+
+import trend_finder  # noqa: E402
+from fakes import FakeGNews  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10, help="Products to score")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake search")
+    parser.add_argument("--pause", type=float, default=1.0, help="Pause between searches in the original loop")
+    parser.add_argument("--rate", type=float, default=1.0, help="Searches per second allowed by the limiter")
+    parser.add_argument("--burst", type=int, default=4, help="Burst size of the limiter")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent searches")
+    args = parser.parse_args()
+
+    queries = [f"Fake Model {i} bike India" for i in range(args.products)]
+
+    client = FakeGNews(latency=args.latency)
+    start = time.perf_counter()
+    for query in queries:
+        client.get_news(query)
+        time.sleep(args.pause)
+    sequential = time.perf_counter() - start
+
+    client = FakeGNews(latency=args.latency)
+    fetcher = trend_finder.NewsFetcher(client, max_workers=args.workers,
+                                       limiter=trend_finder.RateLimiter(args.rate, args.burst))
+    start = time.perf_counter()
+    fetcher.get_many(queries)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    fetcher.get_many(queries)
+    warm = time.perf_counter() - start
+
+    print(f"{args.products} searches, {args.latency}s latency each")
+    print(f"sequential + {args.pause}s pause: {sequential:.2f}s")
+    print(f"fetcher (rate {args.rate}/s, burst {args.burst}, {args.workers} workers): {cold:.2f}s  x{sequential / cold:.1f}")
+    print(f"fetcher, cached:        {warm * 1000:.1f}ms  ({client.calls} searches made in total)")
+    return 0 if client.calls == args.products else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
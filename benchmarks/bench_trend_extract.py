@@ -0,0 +1,109 @@
+"""
+Throughput of product extraction in utils/trend_finder.py.
+
+Builds a synthetic corpus of news headlines and descriptions (a mix of
+product mentions, other brands' news and filler), then times the indexed
+extractor against the original approach of running every uncompiled
+pattern over every text, and checks that both find the same products in
+texts without exclude keywords (with them, the indexed extractor only
+rejects products mentioned near the keyword, so results differ by design).
+
+Usage:
+    python benchmarks/bench_trend_extract.py [--articles 20000] [--category bike]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "utils"))
+
+import trend_finder  # noqa: E402
+
+MODELS = {
+    "bike": ["Royal Enfield Classic 350", "Bajaj Pulsar 220 F", "TVS Apache 160 RTR", "KTM Duke 390",
+             "Yamaha R 15 V4", "Hero Xpulse 200 Pro", "Jawa Perak", "Honda CB 350", "Triumph Speed 400"],
+    "car": ["Tata Nexon EV 2024", "Mahindra XUV700", "Maruti Suzuki Brezza", "Hyundai Creta 2024",
+            "Kia Seltos GT", "Toyota Innova Hycross", "MG Hector Plus", "Skoda Kushaq Style"],
+    "smartphone": ["iPhone 15 Pro", "Samsung Galaxy S24 Ultra", "OnePlus 12 R", "Nothing Phone (2)",
+                   "Xiaomi 14 Pro", "Realme 12 Pro", "Vivo V30 Pro"],
+}
+FILLER = ("launch price review India variant booking mileage features unveiled rivals segment "
+          "delivery waiting period colours specs top speed dealers festive offer market").split()
+EXCLUDE_NOISE = ["helmet", "service", "cover", "accessory", "insurance", "charger"]
+
+
+def corpus(n, category, seed=0):
+    """`n` articles as (title, description) pairs."""
+    rng = random.Random(seed)
+    models = MODELS[category]
+    others = [m for c, ms in MODELS.items() if c != category for m in ms]
+
+    def sentence(mention_rate):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(6, 14))]
+        if rng.random() < mention_rate:
+            words.insert(rng.randrange(len(words)), rng.choice(models))
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(others))
+        if rng.random() < 0.05:
+            words.append(rng.choice(EXCLUDE_NOISE))
+        return " ".join(words).capitalize() + "."
+
+    return [(sentence(0.6), " ".join(sentence(0.3) for _ in range(rng.randint(2, 5)))) for _ in range(n)]
+
+
+def original_extract(text, category):
+    """The pre-index implementation: rebuild patterns, run each one uncompiled."""
+    patterns = trend_finder.PRODUCT_PATTERNS.get(category.lower(), {})
+    if not patterns:
+        return []
+    products = []
+    for pattern in patterns["patterns"]:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            if not any(excl in text.lower() for excl in patterns["exclude"]):
+                products.append(match.group())
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=20000, help="Articles in the corpus")
+    parser.add_argument("--category", default="bike", choices=sorted(MODELS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per method (best is reported)")
+    args = parser.parse_args()
+
+    articles = corpus(args.articles, args.category)
+    texts = [t for article in articles for t in article]
+    extract_batch = trend_finder.AutoProductRanker.extract_products_batch
+
+    def best(fn):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    # The extraction methods do not touch the ranker's clients, so no instance is needed
+    old_time, old = best(lambda: [original_extract(t, args.category) for t in texts])
+    new_time, new = best(lambda: extract_batch(None, texts, args.category))
+
+    mentions = sum(len(found) for found in new)
+    print(f"{args.articles} articles ({len(texts)} texts, {mentions} mentions), category '{args.category}'")
+    print(f"original: {old_time:.3f}s  ({len(texts) / old_time:,.0f} texts/s)")
+    print(f"indexed:  {new_time:.3f}s  ({len(texts) / new_time:,.0f} texts/s)  x{old_time / new_time:.1f}")
+    exclude = trend_finder._INDEXES[args.category].exclude_re
+    mismatched = sum(1 for t, a, b in zip(texts, old, new) if a != b and not exclude.search(t.lower()))
+    rescued = sum(len(b) - len(a) for t, a, b in zip(texts, old, new) if exclude.search(t.lower()))
+    print(f"mentions kept by window-scoped exclusion: {rescued}")
+    if mismatched:
+        print(f"MISMATCH: indexed extraction differs from the original in {mismatched} texts")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
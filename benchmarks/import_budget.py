@@ -0,0 +1,74 @@
+"""
+Check that the CLI entry point stays cheap to import.
+
+Runs `import main` and `python main.py status` in fresh interpreters and fails
+(exit status 1) if either exceeds its time budget or if importing main pulls
+in any of the heavy media/AI libraries that only individual stages need.
+
+Usage:
+    python benchmarks/import_budget.py [--import-budget 0.5] [--status-budget 1.0]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("moviepy", "pydub", "gtts", "numpy", "pollinations", "google.generativeai", "pytrends", "requests", "PIL")
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def best_of(runs, fn):
+    return min(fn() for _ in range(runs))
+
+
+def measure_import():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_status():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "status"], cwd=ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget", type=float, default=0.5, help="Seconds allowed for `import main`")
+    parser.add_argument("--status-budget", type=float, default=1.0, help="Seconds allowed for `main.py status`")
+    parser.add_argument("--runs", type=int, default=3, help="Best of this many runs is compared to the budget")
+    args = parser.parse_args()
+
+    probes = [measure_import() for _ in range(args.runs)]
+    import_time = min(p["elapsed"] for p in probes)
+    heavy = sorted({m for p in probes for m in p["heavy"]})
+    status_time = best_of(args.runs, measure_status)
+
+    failures = []
+    if heavy:
+        failures.append(f"`import main` imported heavy modules: {', '.join(heavy)}")
+    if import_time > args.import_budget:
+        failures.append(f"`import main` took {import_time:.3f}s (budget {args.import_budget:.3f}s)")
+    if status_time > args.status_budget:
+        failures.append(f"`main.py status` took {status_time:.3f}s (budget {args.status_budget:.3f}s)")
+
+    print(f"import main:    {import_time:.3f}s (budget {args.import_budget:.3f}s)")
+    print(f"main.py status: {status_time:.3f}s (budget {args.status_budget:.3f}s)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
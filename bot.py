@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 import sys
 from contextlib import asynccontextmanager
 import signal
+from jobqueue import JobQueue, JobScheduler, Job, QUEUED, RUNNING
+from workers import WorkerPool
 
 # Load environment variables
 load_dotenv()
@@ -47,8 +49,23 @@ SCRIPTS = {
 COMMANDS = {
     'start': '🚀 Start the bot and show available scripts',
     'help': '❓ Show all available commands and usage information',
+    'jobs': '📋 Show queued and running jobs',
+    'cancel': '🛑 Cancel a job: /cancel <job id>',
 }
 
+# Job queue; survives restarts, jobs interrupted by a shutdown are rerun on the next start
+JOBS_DB = os.getenv("CONXHUB_JOBS_DB", "jobs.db")
+# Jobs a warm worker runs before it is replaced by a fresh process
+JOBS_PER_WORKER = int(os.getenv("CONXHUB_JOBS_PER_WORKER", "20"))
+# Minimum seconds between edits of a job's status message (Telegram rate-limits edits)
+PROGRESS_EDIT_INTERVAL = float(os.getenv("CONXHUB_PROGRESS_INTERVAL", "5"))
+# Longest error output relayed to the chat (Telegram messages are capped at 4096 characters)
+MAX_ERROR_CHARS = 3000
+# Created in run_bot, so worker processes importing this module do not open them
+job_queue: JobQueue = None
+scheduler: JobScheduler = None
+worker_pool: WorkerPool = None
+
 def format_scripts_list() -> str:
     """Format available scripts into a readable list"""
     scripts_text = "📜 *Available Scripts:*\n\n"
@@ -71,8 +88,92 @@ async def create_bot():
         except Exception as e:
             logger.error(f"Error during shutdown: {e}")
 
+STAGE_ICONS = {'running': '⏳', 'done': '✅', 'failed': '❌', 'skipped': '⏭'}
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+def format_progress(stages: dict) -> str:
+    """Render the latest progress event of each stage as status lines"""
+    lines = []
+    for name, event in stages.items():
+        line = f"{STAGE_ICONS.get(event.get('state'), '⏳')} {name}"
+        if event.get('state') in (None, 'running') and event.get('percent') is not None:
+            line += f" {event['percent']:.0f}%"
+            if event.get('total_frames'):
+                line += f" ({event['frames']}/{event['total_frames']} frames, {event.get('fps', 0)} fps)"
+            if event.get('eta') is not None:
+                line += f", ETA {format_duration(event['eta'])}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def cancel_markup(job_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton("🛑 Cancel", callback_data=f"cancel_{job_id}")]])
+
+def make_job_runner(bot):
+    """Build the coroutine the scheduler uses to run one job."""
+    async def run_job(job: Job):
+        script = SCRIPTS[job.script]
+
+        async def status(text, markup=None):
+            if job.chat_id and job.message_id:
+                try:
+                    await bot.edit_message_text(text, chat_id=job.chat_id, message_id=job.message_id, reply_markup=markup)
+                except Exception as e:
+                    logger.error(f"Failed to update status of job {job.id}: {e}")
+
+        await status(f"⚙️ *Executing {script['description']}...* (job #{job.id})\n\nPlease wait while we process your request.",
+                     cancel_markup(job.id))
+        # Notify that the script is running
+        await bot.send_message(chat_id=CHAT_ID, text=f"🚀 *{script['description']}* is running... (job #{job.id})")
+
+        header = f"⚙️ *Executing {script['description']}...* (job #{job.id})"
+        stages = {}
+
+        async def report_progress():
+            shown = None
+            while True:
+                await asyncio.sleep(PROGRESS_EDIT_INTERVAL)
+                text = f"{header}\n\n{format_progress(stages)}"
+                if stages and text != shown:
+                    await status(text, cancel_markup(job.id))
+                    shown = text
+
+        def on_progress(event):
+            # Only the latest event per stage is kept
+            stages[event['stage']] = event
+
+        reporter = asyncio.create_task(report_progress())
+        try:
+            success, output = await worker_pool.run(script['file'], job.params, on_progress=on_progress)
+        except asyncio.CancelledError:
+            if job_queue.get(job.id).state != RUNNING:
+                # Cancelled by the user rather than by a shutdown
+                await status(f"🛑 *{script['description']}* (job #{job.id}) was cancelled.")
+            raise
+        finally:
+            reporter.cancel()
+
+        if success:
+            await status(f"✅ *{script['description']}* completed successfully! 🎉\n\nThank you for your patience.")
+            if output:
+                logger.info(f"Script output: {output.strip()}")
+            # Notify that the script run is completed
+            await bot.send_message(chat_id=CHAT_ID, text=f"✅ *{script['description']}* run completed successfully!")
+            return True, "Completed"
+
+        error_msg = output.strip()[-MAX_ERROR_CHARS:] if output else "No error output available"
+        logger.error(f"Script failed with error: {error_msg}")
+        await status(f"❌ *{script['description']}* failed with the following error:\n\n{error_msg}")
+        # Notify that the script run failed
+        await bot.send_message(chat_id=CHAT_ID, text=f"❌ *{script['description']}* run failed with error:\n\n{error_msg}")
+        return False, error_msg
+
+    return run_job
+
 async def execute_script(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Execute selected script with proper error handling"""
+    """Queue the selected script; the scheduler runs it when a slot is free"""
     query = update.callback_query
     script_key = query.data.replace('run_', '')
     
@@ -81,36 +182,59 @@ async def execute_script(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
         
     script = SCRIPTS[script_key]
-    message = await query.message.edit_text(f"⚙️ *Executing {script['description']}...*\n\nPlease wait while we process your request.")
     
     try:
-        # Notify that the script is running
-        await context.bot.send_message(chat_id=CHAT_ID, text=f"🚀 *{script['description']}* is running...")
-
-        process = await asyncio.create_subprocess_exec(
-            'python', script['file'],
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        job, created = job_queue.submit(script_key, lock_key=script['file'])
+        if not created:
+            await query.message.edit_text(
+                f"ℹ️ *{script['description']}* is already {job.state} as job #{job.id}.",
+                reply_markup=cancel_markup(job.id)
+            )
+            return
+        position = job_queue.position(job.id)
+        message = await query.message.edit_text(
+            f"🕒 *{script['description']}* queued as job #{job.id} (position {position}).",
+            reply_markup=cancel_markup(job.id)
         )
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            await message.edit_text(f"✅ *{script['description']}* completed successfully! 🎉\n\nThank you for your patience.")
-            if stdout:
-                logger.info(f"Script output: {stdout.decode().strip()}")
-            # Notify that the script run is completed
-            await context.bot.send_message(chat_id=CHAT_ID, text=f"✅ *{script['description']}* run completed successfully!")
-        else:
-            error_msg = stderr.decode().strip() if stderr else "No error output available"
-            logger.error(f"Script failed with error: {error_msg}")
-            await message.edit_text(f"❌ *{script['description']}* failed with the following error:\n\n{error_msg}")
-            # Notify that the script run failed
-            await context.bot.send_message(chat_id=CHAT_ID, text=f"❌ *{script['description']}* run failed with error:\n\n{error_msg}")
+        job_queue.set_status_message(job.id, message.chat_id, message.message_id)
+        scheduler.notify()
     except Exception as e:
-        logger.error(f"Error executing script: {e}")
-        await message.edit_text(f"❌ An unexpected error occurred:\n\n{str(e)}")
-        # Notify that an unexpected error occurred
-        await context.bot.send_message(chat_id=CHAT_ID, text=f"❌ An unexpected error occurred while running *{script['description']}*:\n\n{str(e)}")
+        logger.error(f"Error queueing script: {e}")
+        await query.message.edit_text(f"❌ An unexpected error occurred:\n\n{str(e)}")
+
+async def cancel_job(job_id: int, bot) -> str:
+    """Cancel a job and describe the outcome"""
+    previous = scheduler.cancel(job_id)
+    if previous is None:
+        return f"ℹ️ Job #{job_id} is not queued or running."
+    if previous == QUEUED:
+        job = job_queue.get(job_id)
+        if job.chat_id and job.message_id:
+            try:
+                await bot.edit_message_text(f"🛑 Job #{job_id} was cancelled before it started.",
+                                            chat_id=job.chat_id, message_id=job.message_id)
+            except Exception as e:
+                logger.error(f"Failed to update status of job {job_id}: {e}")
+    return f"🛑 Job #{job_id} cancelled."
+
+async def jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /jobs command"""
+    jobs = job_queue.active()
+    if not jobs:
+        await update.message.reply_text("📭 No queued or running jobs.")
+        return
+    lines = ["📋 *Jobs:*\n"]
+    for job in jobs:
+        icon = "⚙️" if job.state == RUNNING else "🕒"
+        lines.append(f"{icon} #{job.id} {SCRIPTS.get(job.script, {}).get('description', job.script)} - {job.state}")
+    await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+
+async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /cancel <job id> command"""
+    if not context.args or not context.args[0].lstrip('#').isdigit():
+        await update.message.reply_text("Usage: /cancel <job id>")
+        return
+    await update.message.reply_text(await cancel_job(int(context.args[0].lstrip('#')), context.bot))
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
@@ -153,6 +277,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "1. Use /start to see available scripts\n"
         "2. Click on any script button to run it\n"
         "3. Wait for the processing to complete\n"
+        "4. Use /jobs to see the queue and /cancel <job id> to stop a job\n"
     )
     
     await update.message.reply_text(help_text, parse_mode='Markdown')
@@ -164,6 +289,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer()  # Acknowledge the button press
         if query.data.startswith('run_'):
             await execute_script(update, context)
+        elif query.data.startswith('cancel_'):
+            await query.message.reply_text(await cancel_job(int(query.data.replace('cancel_', '')), context.bot))
     except Exception as e:
         logger.error(f"Error handling button: {e}")
 
@@ -172,6 +299,8 @@ async def setup_bot(app: Application):
     # Add handlers
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("jobs", jobs_command))
+    app.add_handler(CommandHandler("cancel", cancel_command))
     app.add_handler(CallbackQueryHandler(button_handler))
     
     # Send startup notification
@@ -202,12 +331,27 @@ async def run_bot():
             for sig in signals:
                 signal.signal(sig, lambda s, _: stop_signal.set())
             
+            # Start the job scheduler
+            global job_queue, scheduler, worker_pool
+            job_queue = JobQueue(JOBS_DB)
+            scheduler = JobScheduler(job_queue, make_job_runner(app.bot))
+            worker_pool = WorkerPool(scheduler.max_concurrent, max_jobs_per_worker=JOBS_PER_WORKER)
+            worker_pool.start()
+            scheduler_task = asyncio.create_task(scheduler.run())
+            
             # Start polling in the background
             async with app:
                 await app.updater.start_polling()
                 logger.info("Bot is polling for updates...")
                 # Wait until one of the signals is received
                 await stop_signal.wait()
+                scheduler_task.cancel()
+                try:
+                    await scheduler_task
+                except asyncio.CancelledError:
+                    pass
+                worker_pool.stop()
+                job_queue.close()
                 
     except Exception as e:
         logger.error(f"Bot operation error: {e}")
@@ -0,0 +1,181 @@
+"""
+Subtitles timed to the narration and drawn into the video frames.
+
+The audio stage knows how long the TTS took to speak each chunk of the
+script; time_captions() splits every chunk into caption lines and spreads
+the chunk's duration over them by length. The captions are saved as
+captions.json next to script.mp3.
+
+CaptionRenderer rasterizes each caption once with PIL into a small RGBA
+sprite (premultiplied, cropped to the text box) and blends it into the
+frames it is shown on with integer NumPy arithmetic on that region only.
+Text is laid out once per caption rather than once per frame, and a
+1080p frame with a caption takes a few milliseconds, a few percent of
+the Ken Burns step.
+"""
+import bisect
+import json
+import math
+import re
+import textwrap
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_captions(text: str, max_chars: int = 42, max_lines: int = 2) -> List[str]:
+    """
+    Split text into captions of up to `max_lines` lines of `max_chars` characters.
+    Captions do not run across sentences.
+    """
+    captions = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        lines = textwrap.wrap(sentence, width=max_chars)
+        for i in range(0, len(lines), max_lines):
+            captions.append("\n".join(lines[i:i + max_lines]))
+    return captions
+
+
+def time_captions(chunks: Sequence[Tuple[str, float]], max_chars: int = 42, max_lines: int = 2) -> List[Dict]:
+    """
+    Caption timings from the spoken chunks of the narration.
+
+    Args:
+        chunks (Sequence[Tuple[str, float]]): (text, seconds it takes to speak) of each
+            TTS chunk, in the order they are played from the start of the audio
+        max_chars (int): Characters per caption line
+        max_lines (int): Lines per caption
+
+    Returns:
+        List[Dict]: Captions with 'start' and 'end' (seconds) and 'text'
+    """
+    captions = []
+    offset = 0.0
+    for text, duration in chunks:
+        lines = split_captions(text, max_chars, max_lines)
+        weights = [len(line) + 1 for line in lines]
+        total = sum(weights)
+        start = offset
+        for line, weight in zip(lines, weights):
+            end = start + duration * weight / total
+            captions.append({"start": round(start, 3), "end": round(end, 3), "text": line})
+            start = end
+        offset += duration
+    return captions
+
+
+def save_captions(path: str, captions: List[Dict]) -> None:
+    with open(path, "w") as f:
+        json.dump({"captions": captions}, f, indent=2)
+
+
+def load_captions(path: str) -> List[Dict]:
+    with open(path) as f:
+        return json.load(f)["captions"]
+
+
+class _Sprite:
+    """A rasterized caption: premultiplied color and inverse alpha, ready to blend at (x, y)."""
+
+    def __init__(self, rgba: np.ndarray, x: int, y: int):
+        alpha = rgba[:, :, 3:].astype(np.uint16)
+        self.premultiplied = rgba[:, :, :3].astype(np.uint16) * alpha
+        self.inverse_alpha = 255 - alpha
+        self.x, self.y = x, y
+        self.h, self.w = rgba.shape[:2]
+
+    def blend(self, frame: np.ndarray) -> None:
+        region = frame[self.y:self.y + self.h, self.x:self.x + self.w]
+        mixed = region * self.inverse_alpha
+        mixed += self.premultiplied
+        # Exact rounding division by 255 without a division
+        mixed += 128
+        mixed += mixed >> 8
+        region[...] = mixed >> 8
+
+
+class CaptionRenderer:
+    """
+    Draws the caption shown at time t into video frames.
+
+    Args:
+        captions (List[Dict]): Captions with 'start', 'end' (seconds) and 'text'
+        size (Tuple[int, int]): Frame size (w, h)
+        font_size (int): Text height in pixels (default: 1/18 of the frame height)
+        font_path (str): TrueType font (default: DejaVu Sans Bold, or PIL's default font)
+        cache_size (int): Rasterized captions kept in memory
+    """
+
+    def __init__(
+        self,
+        captions: List[Dict],
+        size: Tuple[int, int],
+        font_size: Optional[int] = None,
+        font_path: Optional[str] = None,
+        cache_size: int = 4
+    ):
+        from PIL import ImageFont
+
+        self.captions = sorted(captions, key=lambda c: c["start"])
+        self._starts = [c["start"] for c in self.captions]
+        self.width, self.height = size
+        self.font_size = font_size or max(12, self.height // 18)
+        try:
+            self.font = ImageFont.truetype(font_path or "DejaVuSans-Bold.ttf", self.font_size)
+        except OSError:
+            self.font = ImageFont.load_default(self.font_size)
+        self._sprites: "OrderedDict[int, _Sprite]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def at(self, t: float) -> Optional[int]:
+        """Index of the caption shown at time t, if any."""
+        i = bisect.bisect_right(self._starts, t) - 1
+        if i >= 0 and t < self.captions[i]["end"]:
+            return i
+        return None
+
+    def _rasterize(self, text: str) -> _Sprite:
+        from PIL import Image, ImageDraw
+
+        stroke = max(1, self.font_size // 14)
+        pad = self.font_size // 3
+        measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+        left, top, right, bottom = measure.multiline_textbbox((0, 0), text, font=self.font, align="center",
+                                                              stroke_width=stroke)
+        left, top, right, bottom = int(left), int(top), math.ceil(right), math.ceil(bottom)
+        w = min(self.width, right - left + 2 * pad)
+        h = min(self.height, bottom - top + 2 * pad)
+        image = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        draw.rounded_rectangle((0, 0, w - 1, h - 1), radius=pad, fill=(0, 0, 0, 140))
+        draw.multiline_text((pad - left, pad - top), text, font=self.font, fill=(255, 255, 255, 255),
+                            align="center", stroke_width=stroke, stroke_fill=(0, 0, 0, 255))
+        x = (self.width - w) // 2
+        y = max(0, self.height - h - self.height // 16)
+        return _Sprite(np.asarray(image), x, y)
+
+    def _sprite(self, i: int) -> _Sprite:
+        sprite = self._sprites.get(i)
+        if sprite is None:
+            sprite = self._sprites[i] = self._rasterize(self.captions[i]["text"])
+            if len(self._sprites) > self._cache_size:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """
+        Blend the caption of time t into an RGB frame.
+
+        Returns:
+            np.ndarray: The frame (a writable copy when `frame` is read-only)
+        """
+        i = self.at(t)
+        if i is None:
+            return frame
+        if not frame.flags.writeable:
+            frame = frame.copy()
+        self._sprite(i).blend(frame)
+        return frame
@@ -6,3 +6,20 @@ images_per_video=15
 
 proj_prompt="Royal Enfield Himalayan 750 massive adventure motorcycle"
 proj_name="Royal Enfield Himalayan 750"
+
+# Stream the script from Gemini and synthesize narration while it is still being written
+stream_script=True
+
+# Also write a Prometheus text-format metrics file next to each project's run_report.json
+metrics_prometheus=False
+
+# Time each step of every rendered frame and write render_profile.json to the project folder
+# (False, True, or "cprofile" to also write render.pstats); CONXHUB_RENDER_PROFILE overrides this
+render_profile=False
+
+# Remote services: "live" (Gemini, Pollinations, gTTS) or "fake" (deterministic local stand-ins,
+# see fakes.py); CONXHUB_PROVIDERS overrides this
+providers="live"
+# Behavior of the fakes: seconds per call (or {"script"/"prompts"/"images"/"tts": seconds}),
+# probability of a failed call, calls per second per service (0 = unlimited) and error seed
+fake_providers=dict(latency=0.0,error_rate=0.0,rate_limit=0,seed=0)
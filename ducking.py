@@ -0,0 +1,167 @@
+"""
+Speech-aware ducking of the background music.
+
+The narration is cut into short frames and the RMS level of every frame is
+computed at once with NumPy. Frames louder than a threshold count as speech.
+Speech activity is held for a while after each word and starts a little
+before it, so the background does not pump between words. The background
+gain is then `reduction_db` below unity under speech and `depth_db` higher in
+pauses. The gain curve is smoothed with a moving average, interpolated to
+the samples and multiplied into the background in one vectorized pass.
+
+SpeechDucker works on blocks of any size (process() then flush()); output
+lags input by the lookahead and smoothing windows. duck() runs a whole track
+through it in one go.
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def frame_rms_db(samples: np.ndarray, frame: int) -> np.ndarray:
+    """
+    RMS level (dBFS) of each complete frame of `samples`.
+
+    Args:
+        samples (np.ndarray): Mono float samples scaled to [-1, 1]
+        frame (int): Frame length in samples
+
+    Returns:
+        np.ndarray: One level per frame; a trailing partial frame is ignored
+    """
+    frames = samples[:len(samples) // frame * frame].reshape(-1, frame)
+    rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame)
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+class SpeechDucker:
+    """
+    Lowers background samples while the narration is speaking.
+
+    Args:
+        frame_rate (int): Sample rate of both signals
+        reduction_db (float): Background reduction under speech, in dB
+        depth_db (float): How much louder the background gets in pauses, in dB
+            (0 = constant `reduction_db`, i.e. no ducking)
+        threshold_db (float): Frame level (dBFS) above which the narration counts as speech
+        frame_ms (int): Analysis frame length
+        hold_ms (int): Time speech stays active after a speech frame
+        lookahead_ms (int): Time the background dips before speech starts
+        smooth_ms (int): Length of the moving average applied to the gain curve
+    """
+
+    def __init__(
+        self,
+        frame_rate: int,
+        reduction_db: float = 15.0,
+        depth_db: float = 8.0,
+        threshold_db: float = -40.0,
+        frame_ms: int = 10,
+        hold_ms: int = 300,
+        lookahead_ms: int = 100,
+        smooth_ms: int = 200
+    ):
+        self.frame = max(1, frame_rate * frame_ms // 1000)
+        self.threshold_db = threshold_db
+        self.duck_db = -reduction_db
+        self.idle_db = min(0.0, depth_db - reduction_db)
+        self.hold = hold_ms // frame_ms
+        self.lookahead = lookahead_ms // frame_ms
+        self.smooth = max(0, smooth_ms // frame_ms // 2)
+        # Activity frames needed on each side of a frame to compute its gain
+        self.before = self.hold + self.smooth
+        self.after = self.lookahead + self.smooth
+        # Speech before the first block counts as silence
+        self._activity = np.zeros(self.before, dtype=np.float32)
+        self._speech = np.zeros(0, dtype=np.float32)
+        self._background = None
+        self._gain = None
+        self._flushed = False
+
+    @property
+    def latency(self) -> int:
+        """Samples that process() holds back until the following blocks arrive."""
+        return self.after * self.frame
+
+    def _gains(self, activity: np.ndarray) -> np.ndarray:
+        """Smoothed gain (dB) of the frames whose whole context is in `activity`."""
+        window = self.hold + self.lookahead + 1
+        if len(activity) < window + 2 * self.smooth:
+            return np.zeros(0, dtype=np.float32)
+        held = np.lib.stride_tricks.sliding_window_view(activity, window).max(axis=1)
+        target = self.idle_db + (self.duck_db - self.idle_db) * held
+        width = 2 * self.smooth + 1
+        cumulative = np.concatenate(([0.0], np.cumsum(target, dtype=np.float64)))
+        return ((cumulative[width:] - cumulative[:-width]) / width).astype(np.float32)
+
+    def _apply(self, gains_db: np.ndarray) -> np.ndarray:
+        """Duck as many pending background frames as there are gains and return them."""
+        if not len(gains_db):
+            return self._background[:0]
+        gains = np.power(10.0, gains_db / 20.0, dtype=np.float32)
+        if self._gain is None:
+            self._gain = gains[0]
+        # Ramp linearly from the previous frame's gain to each frame's gain across the frame
+        start = np.concatenate(([self._gain], gains[:-1]))
+        ramp = np.arange(1, self.frame + 1, dtype=np.float32) / self.frame
+        curve = np.multiply.outer(gains - start, ramp)
+        curve += start[:, None]
+        curve = curve.reshape(-1)
+        self._gain = gains[-1]
+        count = len(curve)
+        block, self._background = self._background[:count], self._background[count:]
+        return np.multiply(block, curve[:len(block), None])
+
+    def process(self, background: np.ndarray, speech: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Feed the next block and get the background that can be ducked so far.
+
+        Args:
+            background (np.ndarray): Background samples, shape (n, channels), float
+            speech (np.ndarray): Narration samples of the same span, mono float in [-1, 1];
+                None or a shorter block means silence for the rest
+
+        Returns:
+            np.ndarray: Ducked background, shape (m, channels); lags the input by `latency`
+        """
+        if self._flushed:
+            raise RuntimeError("SpeechDucker was already flushed")
+        background = np.asarray(background, dtype=np.float32)
+        if self._background is None:
+            self._background = np.zeros((0, background.shape[1]), dtype=np.float32)
+        self._background = np.concatenate((self._background, background))
+
+        block = np.zeros(len(background), dtype=np.float32)
+        if speech is not None:
+            speech = np.asarray(speech, dtype=np.float32)[:len(background)]
+            block[:len(speech)] = speech
+        self._speech = np.concatenate((self._speech, block))
+
+        frames = len(self._speech) // self.frame
+        levels = frame_rms_db(self._speech, self.frame)
+        self._speech = self._speech[frames * self.frame:]
+        self._activity = np.concatenate((self._activity, (levels > self.threshold_db).astype(np.float32)))
+
+        gains = self._gains(self._activity)[:len(self._background) // self.frame]
+        # Keep the context the next gains need
+        self._activity = self._activity[len(gains):]
+        return self._apply(gains)
+
+    def flush(self) -> np.ndarray:
+        """Duck and return the rest of the background; the narration is silent from here on."""
+        if self._background is None:
+            return np.zeros((0, 1), dtype=np.float32)
+        pending = len(self._background)
+        frames = -(-pending // self.frame)
+        # Pad the last partial frame and the lookahead with silence
+        speech = np.zeros(frames * self.frame - len(self._speech) + self.after * self.frame, dtype=np.float32)
+        self._speech = np.concatenate((self._speech, speech))
+        levels = frame_rms_db(self._speech, self.frame)
+        self._activity = np.concatenate((self._activity, (levels > self.threshold_db).astype(np.float32)))
+        gains = self._gains(self._activity)[:frames]
+        self._flushed = True
+        return self._apply(gains)
+
+    def duck(self, background: np.ndarray, speech: Optional[np.ndarray] = None) -> np.ndarray:
+        """Duck a whole background track against the narration (process() and flush() in one call)."""
+        return np.concatenate((self.process(background, speech), self.flush()))
@@ -0,0 +1,372 @@
+"""Local stand-ins for remote services, for running the pipeline offline."""
+import hashlib
+import io
+import random
+import threading
+import time
+from typing import Dict, Optional, Union
+
+
+class FakeServiceError(Exception):
+    """Injected failure of a fake service call."""
+
+
+class FakeRateLimitError(FakeServiceError):
+    """A fake service call was rejected for exceeding the rate limit (like HTTP 429)."""
+
+
+class FaultInjector:
+    """
+    Latency, random errors and rate limits for fake service calls.
+
+    Args:
+        latency (float | dict): Seconds each call takes, or a {service: seconds} mapping
+        error_rate (float): Probability that a call fails with FakeServiceError
+        rate_limit (float): Calls per second allowed per service; extra calls fail
+            with FakeRateLimitError (0 = unlimited)
+        seed (int): Seed for the injected errors, so runs are reproducible
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Dict[str, float]] = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        seed: Optional[int] = 0
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Token bucket per service: (tokens, last refill time)
+        self._buckets: Dict[str, list] = {}
+        self.calls: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+
+    def _delay(self, service: str) -> float:
+        if isinstance(self.latency, dict):
+            return self.latency.get(service, 0.0)
+        return self.latency
+
+    def call(self, service: str) -> None:
+        """Account for one call of `service`; sleeps for its latency and may raise."""
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            if self.rate_limit:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(service, (self.rate_limit, now))
+                tokens = min(self.rate_limit, tokens + (now - last) * self.rate_limit)
+                if tokens < 1:
+                    self._buckets[service] = [tokens, now]
+                    self.failures[service] = self.failures.get(service, 0) + 1
+                    raise FakeRateLimitError(f"{service}: rate limit of {self.rate_limit}/s exceeded")
+                self._buckets[service] = [tokens - 1, now]
+            fail = self.error_rate and self._random.random() < self.error_rate
+        delay = self._delay(service)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.failures[service] = self.failures.get(service, 0) + 1
+            raise FakeServiceError(f"{service}: injected failure")
+
+
+def _seeded(*parts) -> random.Random:
+    """Random generator seeded by the given values, for deterministic fake output."""
+    return random.Random(hashlib.sha256("\n".join(map(str, parts)).encode()).hexdigest())
+
+
+_WORDS = (
+    "engine power torque design frame suspension rider terrain comfort speed "
+    "technology performance journey adventure range handling control battery "
+    "chassis weight balance precision innovation future experience road trail"
+).split()
+
+
+def fake_text(seed, sentences: int) -> str:
+    """Deterministic filler sentences."""
+    rng = _seeded("text", seed)
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 18))]
+        out.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"]))
+    return " ".join(out)
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Mimics google.generativeai.GenerativeModel.generate_content.
+
+    Args:
+        text (str): Full response text to return; when None, a deterministic
+            'Title:...Script:...' response is derived from the prompt
+        chunk_size (int): Characters per streamed chunk
+        delay (float): Seconds to wait before each streamed chunk
+        faults (FaultInjector): Latency/errors/rate limits applied to each request
+        sentences (int): Script length when the response is derived from the prompt
+    """
+
+    def __init__(self, text=None, chunk_size=40, delay=0.0, faults=None, sentences=40):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.faults = faults
+        self.sentences = sentences
+
+    def _response(self, prompt):
+        if self.text is not None:
+            return self.text
+        return f"Title: {fake_text(prompt, 1)[:-1]}\nScript: {fake_text(prompt, self.sentences)}"
+
+    def generate_content(self, prompt, stream=False):
+        if self.faults:
+            self.faults.call("script")
+        text = self._response(prompt)
+        if not stream:
+            time.sleep(self.delay)
+            return _Chunk(text)
+        return self._stream(text)
+
+    def _stream(self, text):
+        for i in range(0, len(text), self.chunk_size):
+            time.sleep(self.delay)
+            yield _Chunk(text[i:i + self.chunk_size])
+
+
+class FakeProviders:
+    """
+    In-process stand-ins for Gemini, Pollinations and gTTS with the same
+    interface as providers.LiveProviders. Output is deterministic for a given
+    input; waits between requests are skipped.
+
+    Args:
+        faults (FaultInjector): Latency/errors/rate limits applied to every call
+        image_size (tuple): Size (w, h) of generated images (default: 1920x1080)
+        words_per_minute (int): Speaking rate used for the length of fake speech
+    """
+
+    def __init__(self, faults: Optional[FaultInjector] = None, image_size=(1920, 1080), words_per_minute=150):
+        self.faults = faults or FaultInjector()
+        self.image_size = image_size
+        self.words_per_minute = words_per_minute
+
+    def pause(self, kind: str) -> None:
+        pass
+
+    def script_model(self, api_key=None):
+        return FakeGenerativeModel(faults=self.faults)
+
+    def prompts(self, system: str, topic: str, n: int) -> str:
+        self.faults.call("prompts")
+        rng = _seeded("prompts", topic, n)
+        return "\n".join(f"{i}. {topic}, {' '.join(rng.choice(_WORDS) for _ in range(6))}"
+                         for i in range(1, n + 1))
+
+    def image(self, prompt: str, params: Dict) -> bytes:
+        """
+        PNG bytes of a gradient with soft blobs, whose colors and layout are derived
+        from the prompt and seed (distinct enough not to be taken for near-duplicates).
+        """
+        import numpy as np
+        from PIL import Image
+
+        self.faults.call("images")
+        rng = _seeded("image", prompt, params.get("seed"))
+        w, h = self.image_size
+        start = np.array([rng.randint(0, 255) for _ in range(3)], dtype=np.float32)
+        end = np.array([rng.randint(0, 255) for _ in range(3)], dtype=np.float32)
+        ramp = np.linspace(0.0, 1.0, w, dtype=np.float32)[None, :, None]
+        grid = np.array([[rng.randint(0, 255) for _ in range(8)] for _ in range(6)], dtype=np.uint8)
+        blobs = np.asarray(Image.fromarray(grid).resize((w, h), Image.BICUBIC), dtype=np.float32)[..., None]
+        image = start + (end - start) * ramp + (blobs - 128) * 0.5
+        buf = io.BytesIO()
+        Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(buf, format="PNG")
+        return buf.getvalue()
+
+    def speech(self, text: str, temp_dir: str, language: str = 'en', tld: str = 'com', slow: bool = False):
+        """A quiet tone as long as `text` would take to read out."""
+        from pydub.generators import Sine
+
+        self.faults.call("tts")
+        words = max(1, len(text.split()))
+        duration_ms = int(60000 * words / self.words_per_minute * (1.5 if slow else 1.0))
+        return Sine(220).to_audio_segment(duration=duration_ms, volume=-20).set_channels(2).set_frame_rate(44100)
+
+
+class FakeGNews:
+    """
+    Mimics gnews.GNews.get_news with deterministic articles.
+
+    Args:
+        country (str): Country code, as on GNews
+        period (str): Search period, as on GNews
+        max_results (int): Articles per search
+        latency (float): Seconds each search takes
+        faults (FaultInjector): Errors/rate limits applied to each search
+        mentions (list): Product names that half of the articles mention
+    """
+
+    def __init__(self, language='en', country='IN', period='14d', max_results=100, latency=0.0, faults=None,
+                 mentions=()):
+        self.mentions = list(mentions)
+        self.language = language
+        self.country = country
+        self.period = period
+        self.max_results = max_results
+        self.latency = latency
+        self.faults = faults
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_news(self, query):
+        with self._lock:
+            self.calls += 1
+        if self.faults:
+            self.faults.call("news")
+        time.sleep(self.latency)
+        rng = _seeded("news", query, self.country, self.period)
+        articles = []
+        for i in range(rng.randint(self.max_results // 2, self.max_results)):
+            published = time.gmtime(time.time() - rng.randint(0, 14 * 86400))
+            mention = f" {rng.choice(self.mentions)}" if self.mentions and rng.random() < 0.5 else ""
+            articles.append({
+                "title": f"{query}:{mention} {fake_text((query, i), 1)}",
+                "description": fake_text((query, i, "description"), 3),
+                "published date": time.strftime("%a, %d %b %Y %H:%M:%S GMT", published),
+                "url": f"https://news.example.com/{hashlib.sha256(f'{query}/{i}'.encode()).hexdigest()[:16]}",
+                "publisher": {"href": "https://news.example.com", "title": "Example News"},
+            })
+        return articles
+
+
+class FakeFreesound:
+    """
+    Local HTTP server mimicking the Freesound text search API and its preview
+    downloads, for utils/bg_music.py. Previews are deterministic bytes and
+    honor Range requests.
+
+    Use as a context manager; `api_url` is the search endpoint to sync from.
+
+    Args:
+        tracks (int): Tracks in the fake catalog
+        preview_bytes (int): Size of each preview file
+        page_size (int): Results per search page (the request's page_size is capped to it)
+        cut_after (int): When set, the first download of each preview drops the
+            connection after this many bytes, like an interrupted sync
+        latency (float): Seconds each request takes
+    """
+
+    def __init__(self, tracks=30, preview_bytes=256 * 1024, page_size=10, cut_after=None, latency=0.0):
+        self.tracks = [{
+            "id": 1000 + i,
+            "name": f"Soft Background {i}",
+            "license": "http://creativecommons.org/publicdomain/zero/1.0/",
+            "description": fake_text(("freesound", i), 1),
+            "duration": float(_seeded("duration", i).randint(30, 240)),
+        } for i in range(tracks)]
+        self.preview_bytes = preview_bytes
+        self.page_size = page_size
+        self.cut_after = cut_after
+        self.latency = latency
+        self.requests: Dict[str, int] = {"search": 0, "preview": 0, "range": 0}
+        self._cut = set()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def preview(self, track_id: int) -> bytes:
+        return _seeded("preview", track_id).randbytes(self.preview_bytes)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/apiv2/search/text/"
+
+    def _count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def _search(self, params):
+        size = min(int(params.get("page_size", ["15"])[0]), self.page_size)
+        page = int(params.get("page", ["1"])[0])
+        results = [dict(t, previews={"preview-hq-mp3": f"{self.url}/previews/{t['id']}.mp3"})
+                   for t in self.tracks[(page - 1) * size:page * size]]
+        more = page * size < len(self.tracks)
+        return {"count": len(self.tracks), "results": results,
+                "next": f"{self.api_url}?page={page + 1}" if more else None}
+
+    def _handler(self):
+        import json
+        import re
+        from http.server import BaseHTTPRequestHandler
+        from urllib.parse import parse_qs, urlparse
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(fake.latency)
+                url = urlparse(self.path)
+                if url.path == "/apiv2/search/text/":
+                    fake._count("search")
+                    body = json.dumps(fake._search(parse_qs(url.query))).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                match = re.fullmatch(r"/previews/(\d+)\.mp3", url.path)
+                if not match:
+                    self.send_error(404)
+                    return
+                fake._count("preview")
+                track_id = int(match.group(1))
+                data = fake.preview(track_id)
+                start = 0
+                if self.headers.get("Range"):
+                    fake._count("range")
+                    start = int(re.match(r"bytes=(\d+)-", self.headers["Range"]).group(1))
+                    if start >= len(data):
+                        self.send_error(416)
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Content-Length", str(len(data) - start))
+                self.end_headers()
+                with fake._lock:
+                    cut = fake.cut_after is not None and track_id not in fake._cut
+                    fake._cut.add(track_id)
+                if cut:
+                    # Send part of the body, then drop the connection
+                    self.wfile.write(data[start:start + fake.cut_after])
+                    self.close_connection = True
+                    return
+                self.wfile.write(data[start:])
+
+        return Handler
+
+    def __enter__(self):
+        from http.server import ThreadingHTTPServer
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
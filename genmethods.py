@@ -1,13 +1,13 @@
-from tqdm import tqdm
 import os
-import time
-import google.generativeai as genai
 from logger import get_logger
-import pollinations
+import progress
+import metrics
+from providers import get_providers
 import random
 from uuid import uuid4
-from urllib.parse import quote
-import requests
+import re
+from typing import List
+from functools import lru_cache
 
 logger = get_logger()
 
@@ -22,14 +22,115 @@ logger = get_logger()
 # )
 
 
-def genscript(api_key,channel_name,proj_prompt,proj_name,script_path):
+@lru_cache(maxsize=4)
+def _script_model(api_key, model_name='gemini-1.5-flash'):
+    """Gemini model, created once per key and shared by every script generation in the process."""
+    import google.generativeai as genai
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(
-        f"Create a detailed YouTube script for the channel {channel_name}. The video should present and explain the concept of '{proj_prompt}' in a clear, engaging, and experimental way (predict additional knowledge and features on your own). Include intuitive and innovative ideas to illustrate the concept effectively, making it relatable and intriguing for viewers. Add a captivating introduction, experimental demonstrations, technical specifications based on product (like for example power and torque for vehicles), real-life applications, and a compelling conclusion that ties everything together. It should strictly be in a format 'Title:<Engaging and Catchy video title like upcoming {proj_name} to increase user clicks>\nScript:<Engaging Script>' avoid use of suggestions, third person references, Including Steps, or having visual and audio suggestions like 'intro music or video playing etc' just use direct script suitable to fed into a TTS model"
-    )
-    # logger.debug(response.text)
-    video_title,script=response.text.split('Script:')
+    return genai.GenerativeModel(model_name)
+
+
+@lru_cache(maxsize=1)
+def _http_session():
+    """Shared connection pool for image downloads."""
+    import requests
+    return requests.Session()
+
+
+def _script_prompt(channel_name,proj_prompt,proj_name):
+    return f"Create a detailed YouTube script for the channel {channel_name}. The video should present and explain the concept of '{proj_prompt}' in a clear, engaging, and experimental way (predict additional knowledge and features on your own). Include intuitive and innovative ideas to illustrate the concept effectively, making it relatable and intriguing for viewers. Add a captivating introduction, experimental demonstrations, technical specifications based on product (like for example power and torque for vehicles), real-life applications, and a compelling conclusion that ties everything together. It should strictly be in a format 'Title:<Engaging and Catchy video title like upcoming {proj_name} to increase user clicks>\nScript:<Engaging Script>' avoid use of suggestions, third person references, Including Steps, or having visual and audio suggestions like 'intro music or video playing etc' just use direct script suitable to fed into a TTS model"
+
+
+class ScriptStreamParser:
+    """
+    Incremental parser for the 'Title:...Script:...' response format.
+
+    Text is fed chunk by chunk as it streams in; once the 'Script:' header has
+    been seen, every complete sentence of the script is returned as soon as the
+    whitespace following it arrives, so it can be forwarded to TTS early.
+    """
+
+    # A sentence ends with . ! or ? (optionally followed by closing quotes/brackets) and whitespace
+    SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+    def __init__(self):
+        self._header = ""
+        self._body = []
+        self._pending = ""
+        self.in_script = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume a chunk of streamed text and return the sentences it completed."""
+        if not self.in_script:
+            self._header += chunk
+            if "Script:" not in self._header:
+                return []
+            self._header, chunk = self._header.split("Script:", 1)
+            self.in_script = True
+
+        self._body.append(chunk)
+        self._pending += chunk
+        last_end = None
+        for last_end in self.SENTENCE_END.finditer(self._pending):
+            pass
+        if last_end is None:
+            return []
+        complete, self._pending = self._pending[:last_end.end()], self._pending[last_end.end():]
+        return self._split(complete)
+
+    def close(self) -> List[str]:
+        """Flush whatever is left once the stream has ended."""
+        if not self.in_script:
+            raise ValueError("Response did not contain a 'Script:' section")
+        rest, self._pending = self._pending, ""
+        return self._split(rest)
+
+    def _split(self, text: str) -> List[str]:
+        sentences, start = [], 0
+        for m in self.SENTENCE_END.finditer(text):
+            sentences.append(text[start:m.end()].strip())
+            start = m.end()
+        sentences.append(text[start:].strip())
+        return [s for s in sentences if s]
+
+    @property
+    def script(self) -> str:
+        return "".join(self._body)
+
+    @property
+    def title(self) -> str:
+        return self._header
+
+
+def genscript(api_key,channel_name,proj_prompt,proj_name,script_path,stream=False,on_sentence=None,model=None):
+    """
+    Generate the video title and script with Gemini.
+
+    Args:
+        stream (bool): Consume the response incrementally instead of waiting for all of it
+        on_sentence (Callable[[str], None]): Called with each complete script sentence as it
+            streams in (only used when stream=True)
+        model: Generative model to use instead of creating a Gemini model (e.g. a local fake)
+    """
+    if model is None:
+        model = get_providers().script_model(api_key)
+    prompt = _script_prompt(channel_name,proj_prompt,proj_name)
+
+    metrics.incr("api_calls")
+    if stream:
+        parser = ScriptStreamParser()
+        for chunk in model.generate_content(prompt, stream=True):
+            for sentence in parser.feed(chunk.text):
+                if on_sentence:
+                    on_sentence(sentence)
+        for sentence in parser.close():
+            if on_sentence:
+                on_sentence(sentence)
+        video_title,script=parser.title,parser.script
+    else:
+        response = model.generate_content(prompt)
+        # logger.debug(response.text)
+        video_title,script=response.text.split('Script:')
     try:
         video_title=video_title.split('Title: ')[1]
     except Exception as e:
@@ -48,21 +149,8 @@ def genprompts(proj_prompt,n_prompts=10):
     llm_prompt=f"""You are a prompt generator AI, that generates {n_prompts} random prompts on the given topic for getting realisting looking images from a text to image model, 
             the prompts should include prompts to generate images such as introduction of the given product by the company, and images of that product from different angles and realistic environments and each prompth should be plain text model without any headers or much special characters starting from its indexing like 1. <prompt 1 text>\n 2. <prompt 2 text> and so on."""
     
-    text_model: pollinations.TextModel = pollinations.text(
-    frequency_penalty = 1,
-    presence_penalty = 0.5,
-    temperature = 1,
-    top_p = 1,
-    model = pollinations.text_default,
-    stream = True,
-    contextual = True, # True: Holds conversation context up to 10. False: Has no conversation context
-    system = llm_prompt
-    )
-    
-    img_prompt=text_model.generate(
-    prompt=proj_prompt,
-    display=True
-    ).text
+    metrics.incr("api_calls")
+    img_prompt=get_providers().prompts(llm_prompt,proj_prompt,n_prompts)
     img_prompts= [line.strip().split(". ",1)[1] for line in img_prompt.split("\n") if line.strip()] #convert generated text list into python list
     return img_prompts
 
@@ -97,12 +185,13 @@ def genimages(prompts, genpath):
         genpath (str): Output directory path for generated images
     """
     
+    from tqdm import tqdm
+
     # Ensure output directory exists
     os.makedirs(genpath, exist_ok=True)
     
-    # Base URL for the Pollinations API
-    base_url = "https://image.pollinations.ai/prompt"
-    
+    provider = get_providers()
+
     # Default parameters matching the original image_model
     params = {
         'model': 'stable-diffusion',  # pollinations.image_default
@@ -113,25 +202,19 @@ def genimages(prompts, genpath):
         'private': 'false'
     }
     
-    time.sleep(1)  # Initial delay as in original
+    provider.pause("image")  # Initial delay as in original
     
-    for pr in tqdm(prompts, total=len(prompts), desc="Generating Images"):
+    for i, pr in enumerate(tqdm(prompts, total=len(prompts), desc="Generating Images")):
+        progress.emit("images", percent=100.0 * i / len(prompts), images=i, total_images=len(prompts))
         try:
             # Generate new random seed for each image
             params['seed'] = random.randint(0, 1000)
             
-            # URL encode the prompt
-            encoded_prompt = quote(pr)
-            
-            # Construct full URL with parameters
-            url = f"{base_url}/{encoded_prompt}"
             params['models']=random.choice(['stable-diffusion','flux-realism'])
-            query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-            full_url = f"{url}?{query_string}"
-            
-            # Make request with same timeout as original
-            response = requests.get(full_url, timeout=30)
-            response.raise_for_status()
+
+            metrics.incr("api_calls")
+            content = provider.image(pr, params)
+            metrics.incr("bytes_downloaded", len(content))
             
             # Generate unique filename
             filename = f"gen_{str(uuid4())[:8]}.png"
@@ -139,13 +222,14 @@ def genimages(prompts, genpath):
             
             # Save the image
             with open(filepath, 'wb') as f:
-                f.write(response.content)
-                
-            time.sleep(1)  # Same delay between images as original
+                f.write(content)
+
+            provider.pause("image")  # Same delay between images as original
             
         except Exception as e:
             logger.error(e)
+            metrics.incr("retries")
             print("Generation on hold for 30s...")
             logger.info("Generation on hold...")
-            time.sleep(30)
+            provider.pause("image_hold")
 
@@ -0,0 +1,186 @@
+"""
+Ingestion of downloaded images into render-ready canvases.
+
+Every file in the project's images folder is decoded once. Files that do
+not decode, are too small, or are blank or mostly one flat color (the
+error placeholders image services return) are rejected. Near-duplicates
+are dropped with a perceptual-hash index: a 64-bit DCT hash per image,
+computed for all images in one batch, compared by Hamming distance with
+vectorized popcounts.
+
+The images that remain are cover-cropped and resized once to the video
+size, so the renderer's windows are never larger than its frames however
+large the downloads are. Each is saved as <image file>.npy in the
+project's canvas folder as soon as it is ready, which the renderer loads
+without decoding. index.json records what was kept and what was rejected
+and why.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Images with a shorter side are rejected
+MIN_SIDE = 256
+# Grayscale standard deviation below which an image counts as blank
+BLANK_STD = 6.0
+# Share of pixels in the most common gray level above which an image counts as a flat placeholder
+FLAT_SHARE = 0.85
+# Images whose hashes differ in at most this many of 64 bits are near-duplicates
+DUPLICATE_BITS = 10
+
+HASH_SIZE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m
+
+
+_DCT = _dct_matrix(HASH_SIZE)
+
+
+def phash(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Perceptual hashes of a batch of grayscale thumbnails.
+
+    Args:
+        thumbnails (np.ndarray): Shape (n, 32, 32)
+
+    Returns:
+        np.ndarray: n uint64 hashes; bit i is set where low-frequency DCT coefficient i is above the median
+    """
+    coefficients = _DCT @ thumbnails.astype(np.float64) @ _DCT.T
+    low = coefficients[:, :8, :8].reshape(len(thumbnails), 64)
+    # The DC term only reflects overall brightness
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+class HashIndex:
+    """Perceptual hashes of the images kept so far, queried all at once."""
+
+    def __init__(self):
+        self.hashes = np.zeros(0, dtype=np.uint64)
+
+    def nearest(self, h: int) -> Tuple[Optional[int], int]:
+        """(position, Hamming distance) of the closest hash in the index, or (None, 64) when it is empty."""
+        if not len(self.hashes):
+            return None, 64
+        distances = np.bitwise_count(self.hashes ^ np.uint64(h))
+        i = int(np.argmin(distances))
+        return i, int(distances[i])
+
+    def add(self, h: int) -> None:
+        self.hashes = np.append(self.hashes, np.uint64(h))
+
+
+def check_image(gray: np.ndarray) -> Optional[str]:
+    """Why a decoded image (small grayscale copy) is unusable, or None if it looks fine."""
+    if gray.std() < BLANK_STD:
+        return "blank"
+    levels = np.bincount((gray // 8).astype(np.intp).ravel(), minlength=32)
+    if levels.max() > FLAT_SHARE * gray.size:
+        return "placeholder"
+    return None
+
+
+def canvas_file(image_file: str) -> str:
+    """Name of the canvas of an image; the full file name keeps gen_1.png and gen_1.jpg apart."""
+    return f"{image_file}.npy"
+
+
+def _prepare(path: str, canvas_path: str, size: Tuple[int, int]) -> Dict:
+    """Decode an image once; check it, make its hash thumbnail and save it fitted to `size`."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as source:
+            image = source.convert("RGB")
+    except Exception as e:
+        return {"reason": f"unreadable ({e.__class__.__name__})"}
+    if min(image.size) < MIN_SIDE:
+        return {"reason": f"too small ({image.size[0]}x{image.size[1]})"}
+    gray = image.convert("L")
+    reason = check_image(np.asarray(gray.resize((64, 64), Image.BILINEAR)))
+    if reason:
+        return {"reason": reason}
+    thumbnail = np.asarray(gray.resize((HASH_SIZE, HASH_SIZE), Image.BILINEAR))
+    np.save(canvas_path, np.asarray(ImageOps.fit(image, size, Image.LANCZOS)))
+    return {"thumbnail": thumbnail}
+
+
+def load_index(canvas_folder: str) -> Optional[Dict]:
+    """The canvas index of a project, or None if the images were not ingested."""
+    path = os.path.join(canvas_folder, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def ingest_images(
+    image_folder: str,
+    canvas_folder: str,
+    size: Tuple[int, int] = (1920, 1080),
+    max_distance: int = DUPLICATE_BITS,
+    workers: int = 4
+) -> Tuple[bool, str]:
+    """
+    Turn the downloaded images into canvases the renderer can use as they are.
+
+    Args:
+        image_folder (str): Folder with the downloaded images
+        canvas_folder (str): Folder the canvases and index.json are written to
+        size (Tuple[int, int]): Video size (w, h)
+        max_distance (int): Hash distance (bits) up to which images count as duplicates
+        workers (int): Images decoded and resized in parallel
+
+    Returns:
+        Tuple[bool, str]: (success status, message)
+    """
+    names = sorted(f for f in os.listdir(image_folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not names:
+        return False, "No image files found in images folder"
+    os.makedirs(canvas_folder, exist_ok=True)
+
+    # Decoding and resizing release the GIL; canvases are written as they are made
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        prepared = list(pool.map(
+            lambda name: _prepare(os.path.join(image_folder, name), os.path.join(canvas_folder, canvas_file(name)), size),
+            names))
+
+    rejected = [{"source": name, "reason": p["reason"]} for name, p in zip(names, prepared) if "reason" in p]
+    usable = [(name, p) for name, p in zip(names, prepared) if "reason" not in p]
+    hashes = phash(np.stack([p["thumbnail"] for _, p in usable])) if usable else []
+
+    index = HashIndex()
+    kept = []
+    for (name, p), h in zip(usable, hashes):
+        match, distance = index.nearest(h)
+        if match is not None and distance <= max_distance:
+            rejected.append({"source": name, "reason": f"duplicate of {kept[match]['source']} ({distance} bits)"})
+            continue
+        index.add(h)
+        kept.append({"source": name, "file": canvas_file(name), "phash": f"{int(h):016x}"})
+
+    # Canvases of duplicates, and of images that are gone or rejected now
+    current = {entry["file"] for entry in kept}
+    for name in os.listdir(canvas_folder):
+        if name.endswith(".npy") and name not in current:
+            os.remove(os.path.join(canvas_folder, name))
+
+    with open(os.path.join(canvas_folder, INDEX_FILE), "w") as f:
+        json.dump({"size": list(size), "images": kept, "rejected": rejected}, f, indent=2)
+
+    if not kept:
+        return False, f"No usable images: all {len(names)} were rejected"
+    return True, (f"Ingested {len(kept)} of {len(names)} images at {size[0]}x{size[1]}"
+                  + (f" ({len(rejected)} rejected)" if rejected else ""))
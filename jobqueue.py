@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+@dataclass
+class Job:
+    id: int
+    script: str
+    params: Dict
+    dedup_key: str
+    lock_key: str
+    state: str
+    message: str
+    chat_id: Optional[int]
+    message_id: Optional[int]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+
+class JobQueue:
+    """
+    Durable job queue stored in SQLite.
+
+    Jobs move queued -> running -> done/failed, or to cancelled at any point
+    before they finish. Submitting a request identical to one that is still
+    queued or running returns the existing job instead of a new one.
+
+    Args:
+        path (str): SQLite database file (default: jobs.db)
+    """
+
+    def __init__(self, path: str = "jobs.db"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    script TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    lock_key TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    message TEXT NOT NULL DEFAULT '',
+                    chat_id INTEGER,
+                    message_id INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, state)")
+
+    @staticmethod
+    def _row(row) -> Optional[Job]:
+        if row is None:
+            return None
+        data = dict(row)
+        data["params"] = json.loads(data["params"])
+        return Job(**data)
+
+    def submit(self, script: str, params: Optional[Dict] = None, lock_key: Optional[str] = None) -> Tuple[Job, bool]:
+        """
+        Queue a job unless an identical one is already queued or running.
+
+        Args:
+            script (str): Key of the script to run
+            params (dict): Parameters of the run; part of the identity used for deduplication
+            lock_key (str): Jobs sharing a lock key never run at the same time (default: the script key)
+
+        Returns:
+            Tuple[Job, bool]: The job, and whether it was newly created
+        """
+        params = params or {}
+        encoded = json.dumps(params, sort_keys=True)
+        dedup_key = hashlib.sha256(f"{script}\n{encoded}".encode()).hexdigest()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND state IN (?, ?) ORDER BY id LIMIT 1",
+                (dedup_key, *ACTIVE_STATES)).fetchone()
+            if row is not None:
+                return self._row(row), False
+            cur = self._db.execute(
+                "INSERT INTO jobs (script, params, dedup_key, lock_key, state, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (script, encoded, dedup_key, lock_key or script, QUEUED, time.time()))
+            return self._row(self._db.execute("SELECT * FROM jobs WHERE id = ?", (cur.lastrowid,)).fetchone()), True
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._row(self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def active(self) -> List[Job]:
+        """Queued and running jobs, oldest first."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY id", ACTIVE_STATES).fetchall()
+        return [self._row(r) for r in rows]
+
+    def position(self, job_id: int) -> int:
+        """1-based position of a queued job in the queue (0 if it is not queued)."""
+        with self._lock:
+            row = self._db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] != QUEUED:
+                return 0
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = ? AND id <= ?",
+                                    (QUEUED, job_id)).fetchone()[0]
+
+    def claim_next(self, busy_locks) -> Optional[Job]:
+        """Mark the oldest queued job whose lock key is free as running and return it."""
+        with self._lock, self._db:
+            for row in self._db.execute("SELECT * FROM jobs WHERE state = ? ORDER BY id", (QUEUED,)):
+                if row["lock_key"] in busy_locks:
+                    continue
+                self._db.execute("UPDATE jobs SET state = ?, started_at = ? WHERE id = ?",
+                                 (RUNNING, time.time(), row["id"]))
+                return self._row(self._db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        return None
+
+    def finish(self, job_id: int, state: str, message: str = "") -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, message = ?, finished_at = ? WHERE id = ? AND state IN (?, ?)",
+                (state, message, time.time(), job_id, *ACTIVE_STATES))
+
+    def cancel(self, job_id: int) -> Optional[str]:
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            str: The state the job was in before, or None if it was not active
+        """
+        with self._lock, self._db:
+            row = self._db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] not in ACTIVE_STATES:
+                return None
+            self._db.execute("UPDATE jobs SET state = ?, finished_at = ? WHERE id = ?",
+                             (CANCELLED, time.time(), job_id))
+            return row["state"]
+
+    def set_status_message(self, job_id: int, chat_id: int, message_id: int) -> None:
+        """Remember the chat message that shows this job's status."""
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET chat_id = ?, message_id = ? WHERE id = ?",
+                             (chat_id, message_id, job_id))
+
+    def recover(self) -> int:
+        """Requeue jobs left running by a previous process; returns how many were requeued."""
+        with self._lock, self._db:
+            return self._db.execute("UPDATE jobs SET state = ?, started_at = NULL WHERE state = ?",
+                                    (QUEUED, RUNNING)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _available_memory() -> Optional[int]:
+    """Available physical memory in bytes, if it can be determined."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_concurrency(cpus_per_job: float = 2, memory_per_job_gb: float = 2.0) -> int:
+    """
+    How many jobs this machine can run at once.
+
+    Honors CONXHUB_MAX_JOBS when set; otherwise the smaller of the CPU-bound
+    and memory-bound limits, and at least one.
+    """
+    if os.getenv("CONXHUB_MAX_JOBS"):
+        return max(1, int(os.environ["CONXHUB_MAX_JOBS"]))
+    limit = int((os.cpu_count() or 1) // cpus_per_job)
+    memory = _available_memory()
+    if memory is not None:
+        limit = min(limit, int(memory // (memory_per_job_gb * 1024 ** 3)))
+    return max(1, limit)
+
+
+class JobScheduler:
+    """
+    Runs queued jobs with bounded concurrency.
+
+    Args:
+        queue (JobQueue): Queue to take jobs from
+        run_job (Callable): Coroutine running one job; returns (success, message). It is
+            cancelled (asyncio.CancelledError) when the job is cancelled while running.
+        max_concurrent (int): Jobs allowed to run at once (default: default_concurrency())
+        poll_interval (float): Seconds between queue checks when idle (default: 2.0)
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        run_job: Callable[[Job], Awaitable[Tuple[bool, str]]],
+        max_concurrent: Optional[int] = None,
+        poll_interval: float = 2.0
+    ):
+        self.queue = queue
+        self.run_job = run_job
+        self.max_concurrent = max_concurrent or default_concurrency()
+        self.poll_interval = poll_interval
+        self._running: Dict[int, Tuple[asyncio.Task, str]] = {}
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    def notify(self) -> None:
+        """Wake the scheduler, e.g. after a job was submitted."""
+        self._wake.set()
+
+    def cancel(self, job_id: int) -> Optional[str]:
+        """Cancel a job, stopping it if it is running; returns its previous state."""
+        previous = self.queue.cancel(job_id)
+        if previous == RUNNING and job_id in self._running:
+            self._running[job_id][0].cancel()
+        return previous
+
+    async def _run(self, job: Job) -> None:
+        try:
+            success, message = await self.run_job(job)
+            self.queue.finish(job.id, DONE if success else FAILED, message)
+        except asyncio.CancelledError:
+            # On shutdown the job stays "running" so recover() requeues it next time
+            if not self._stopping:
+                self.queue.finish(job.id, CANCELLED, "Cancelled")
+        except Exception as e:
+            logger.error(f"Job {job.id} crashed: {e}")
+            self.queue.finish(job.id, FAILED, str(e))
+        finally:
+            self._running.pop(job.id, None)
+            self._wake.set()
+
+    async def run(self) -> None:
+        """Schedule jobs until cancelled; running jobs are requeued on the next start."""
+        requeued = self.queue.recover()
+        if requeued:
+            logger.info(f"Requeued {requeued} job(s) interrupted by the last shutdown")
+        logger.info(f"Job scheduler running up to {self.max_concurrent} job(s) at once")
+        try:
+            while True:
+                while len(self._running) < self.max_concurrent:
+                    job = self.queue.claim_next({lock for _, lock in self._running.values()})
+                    if job is None:
+                        break
+                    logger.info(f"Starting job {job.id} ({job.script})")
+                    self._running[job.id] = (asyncio.create_task(self._run(job)), job.lock_key)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._stopping = True
+            tasks = [task for task, _ in self._running.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,36 +1,149 @@
+import atexit
+import contextvars
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+from contextlib import contextmanager
 from config import proj_name
 
-# Create logs directory if it doesn't exist
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+# Log files are rotated at this size, keeping this many old files (log_<project>.log.1, ...)
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
 
-# Configure module-level logger
-logger = logging.getLogger('app_logger')
-logger.setLevel(logging.DEBUG)
+# Project whose log file records emitted in the current context go to
+_project = contextvars.ContextVar("log_project", default=None)
+
+def _slug(name):
+    return name.replace(" ","_")
+
+class _LazyFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that creates the logs directory on its first record
+    rather than at import, so importing the logger has no side effects.
+    """
+    def __init__(self, filename):
+        super().__init__(filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+# Create formatter for the file and console output
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+class _ProjectRouter(logging.Handler):
+    """Writes each record to the log file of its project; runs on the listener thread."""
+    def __init__(self, default):
+        super().__init__(logging.DEBUG)
+        self.default = default
+        self._files = {}
+
+    def _file(self, name):
+        if name not in self._files:
+            fh = _LazyFileHandler(f'logs/log_{name}.log')
+            fh.setFormatter(formatter)
+            self._files[name] = fh
+        return self._files[name]
+
+    def emit(self, record):
+        self._file(getattr(record, "project", None) or self.default).handle(record)
+
+    def close(self):
+        for fh in self._files.values():
+            fh.close()
+        super().close()
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread instead of writing them, tagged with
+    the project of the emitting context so they reach that project's log.
+    """
+    def prepare(self, record):
+        if not getattr(record, "project", None):
+            record.project = _project.get()
+        return super().prepare(record)
+
+    def emit(self, record):
+        _start_listener()
+        super().emit(record)
 
-# Create file handler which logs even debug messages
-f_name = proj_name.replace(" ","_")
-log_filename = f'logs/log_{f_name}.log'
-if os.path.exists(log_filename):
-    os.remove(log_filename)
-fh = logging.FileHandler(log_filename)
-fh.setLevel(logging.DEBUG)
+class _ProjectTag(logging.Filter):
+    def __init__(self, project):
+        super().__init__()
+        self.project = project
+
+    def filter(self, record):
+        record.project = self.project
+        return True
+
+# Create file router which logs even debug messages
+f_name = _slug(proj_name)
+router = _ProjectRouter(f_name)
 
 # Create console handler with a higher log level
 ch = logging.StreamHandler()
 ch.setLevel(logging.ERROR)
-
-# Create formatter and add it to the handlers
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
 ch.setFormatter(formatter)
 
-# Add the handlers to the logger
-logger.addHandler(fh)
-logger.addHandler(ch)
+# Configure module-level logger; records are written by a listener thread so
+# callers (including the render loop) never wait on disk
+_queue = queue.SimpleQueue()
+_listener = None
+_listener_lock = threading.Lock()
+
+def _start_listener():
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            listener = logging.handlers.QueueListener(_queue, router, ch, respect_handler_level=True)
+            listener.start()
+            # Drain the queue and close the files at exit
+            atexit.register(listener.stop)
+            _listener = listener
+
+logger = logging.getLogger('app_logger')
+logger.setLevel(logging.DEBUG)
+logger.addHandler(_ContextQueueHandler(_queue))
+
+_project_loggers = {}
+_project_lock = threading.Lock()
+
+@contextmanager
+def log_project(project):
+    """
+    Send records logged in this context to the log file of `project`, whichever
+    logger they come from. Threads started through contextvars.copy_context()
+    (e.g. pipeline stages) inherit it.
+    """
+    token = _project.set(_slug(project))
+    try:
+        yield
+    finally:
+        _project.reset(token)
+
+def current_project():
+    """Project whose log file records emitted in this context go to (None: the default log)."""
+    return _project.get()
+
+def get_logger(project=None):
+    """
+    Get the application logger, or a logger writing to the log file of `project`.
 
-def get_logger():
-    return logger
\ No newline at end of file
+    Project loggers let several projects run in one process (batch mode)
+    without their messages ending up in each other's log files.
+    """
+    if project is None:
+        return logger
+    name = _slug(project)
+    if name == f_name:
+        return logger
+    with _project_lock:
+        if name not in _project_loggers:
+            plog = logging.getLogger(f'app_logger.{name}')
+            plog.addFilter(_ProjectTag(name))
+            _project_loggers[name] = plog
+        return _project_loggers[name]
@@ -1,9 +1,19 @@
 import os
+import argparse
+import contextlib
 from dotenv import load_dotenv
-from config import channel_name,default_dir,proj_prompt, proj_name,images_per_video
-from genmethods import genscript,genimages,genprompts
-from logger import get_logger
-from media_methods import create_audio_with_background,create_video_with_transitions,add_intro_and_closure
+from config import stream_script,metrics_prometheus
+from logger import current_project,get_logger,log_project
+from pipeline import Stage, StageError, run_stages
+from manifest import RunManifest, resumable
+from project import Project
+import progress
+import metrics
+from metrics import RunMetrics
+
+# genmethods and media_methods pull in moviepy, pydub, gtts and the AI clients;
+# they are imported inside the stages that need them so that single-stage
+# commands and `status` start quickly.
 
 load_dotenv()
 
@@ -13,93 +23,420 @@ logger=get_logger()
 
 meta_path="meta/"
 
-def main():
-    
-    os.makedirs(default_dir,exist_ok=True)
+def _check(result, what, name, log=logger):
+    """Turn a media method's (success, message) result into a stage outcome."""
+    success, message = result
+    if not success:
+        log.error(f"Failed to {what} for {name}")
+        log.error(message)
+        raise StageError(message)
+    print(message)
+    log.info(message)
+    return message
+
+
+def _in_pool(fn, project, kwargs):
+    """Pool side of _call(): log to the stage's project and count its metrics there."""
+    with log_project(project) if project else contextlib.nullcontext():
+        return metrics.run_counted(fn, **kwargs)
+
+
+def _call(cpu_executor, fn, **kwargs):
+    """Run a CPU-bound media method, in the shared process pool when one is given."""
+    if cpu_executor is None:
+        return fn(**kwargs)
+    # The pool process has none of this thread's context; its counters come back with the result
+    result, counters = cpu_executor.submit(_in_pool, fn, current_project(), kwargs).result()
+    metrics.merge(counters)
+    return result
+
+
+# Stages in dependency order:
+#   script -> audio ------------\
+#                                timeline -> video -> final
+#   prompts -> images -> ingest -/
+STAGES=["script","prompts","images","ingest","audio","timeline","video","final"]
+STAGE_RESOURCES={
+    "script":"network",
+    "prompts":"network",
+    "images":"network",
+    "ingest":"cpu",
+    "audio":"cpu",
+    "timeline":"cpu",
+    "video":"cpu",
+    "final":"cpu",
+}
+STAGE_DEPS={
+    "script":(),
+    "prompts":(),
+    "images":("prompts",),
+    "ingest":("images",),
+    "audio":("script",),
+    "timeline":("audio","ingest"),
+    "video":("timeline",),
+    "final":("video",),
+}
+
+audio_settings=dict(bg_music_path="backgrounds",bg_volume_reduction=20,duck_depth=8,fade_duration=2000,crossfade_duration=1000)
+# seed=None picks a new seed whenever the timeline is replanned; the plan records it
+timeline_settings=dict(image_duration=8.0,transition_duration=3.0,min_zoom=1.0,max_zoom=1.2,seed=None,transition="cut")
+video_settings=dict(captions=True)
+# Images are fitted once to the video size
+ingest_settings=dict(size=(1920,1080))
+
+
+def _downstream(stage):
+    """The given stage plus every stage that (transitively) depends on it."""
+    found={stage}
+    for name in STAGES:
+        if any(d in found for d in STAGE_DEPS[name]):
+            found.add(name)
+    return found
+
+
+def _list_images(img_path):
+    return sorted(os.path.join(img_path,f) for f in os.listdir(img_path)
+                  if f.lower().endswith(('.png','.jpg','.jpeg','.webp')))
+
 
-    proj_path=os.path.join(default_dir,proj_name)
-    img_path=os.path.join(proj_path,"images")
-    script_path=os.path.join(proj_path,"script")
-    
-    os.makedirs(proj_path,exist_ok=True)
-    os.makedirs(img_path,exist_ok=True)
-    os.makedirs(script_path,exist_ok=True)
+def _list_canvas(canvas_path):
+    if not os.path.isdir(canvas_path):
+        return []
+    return sorted(os.path.join(canvas_path,f) for f in os.listdir(canvas_path)
+                  if f.endswith(".npy") or f=="index.json")
 
+
+def _stage_specs(project,log,tts=None,cpu_executor=None):
+    """
+    What each stage runs, how its inputs are hashed, which files it produces and
+    how its result is reloaded from disk when it is skipped.
+    """
+    name=project.name
+    proj_path,img_path,script_path=project.path,project.img_path,project.script_path
+    canvas_path=project.canvas_path
     google_api_key=os.getenv("GOOGLE_API_KEY")
-    print("Generating Script...")
-    video_title,script=genscript(google_api_key,channel_name,proj_prompt,proj_name,script_path)
-    logger.info(f"Generated Script for {proj_name}")
-    logger.info(f"Title: {video_title}")
-
-    print("Generating Prompts...")
-    prompts=genprompts(proj_prompt,n_prompts=images_per_video)
-    logger.info(f"Generated {len(prompts)} prompts for {proj_name}")
-
-    print("Generating Images...")
-    genimages(prompts,img_path)
-    logger.info(f"Generated {len(prompts)} images for {proj_name}")
-
-    print("Performing media compilations...")
-    logger.info(f"Compiling media for {proj_name}")
-
-    success, message = create_audio_with_background(
-        text=script,
-        bg_music_path="backgrounds",
-        output_path=f"{script_path}/script.mp3",
-        bg_volume_reduction=20,
-        fade_duration=2000,
-        crossfade_duration=1000
-    )
-    if not success:
-        logger.error(f"Failed to create audio for {proj_name}")
-        logger.error(message)
-        return
-    print(message)
-    logger.info(f"Created audio for {proj_name}")
-    logger.info(message)
-
-    success, message=create_video_with_transitions(
-    base_folder=proj_path,
-    output_path=f"{proj_path}/compiled_video.mp4",
-    image_duration=8.0,
-    transition_duration=3.0,
-    min_zoom=1.0,
-    max_zoom=1.2
-    )
-    if not success:
-        logger.error(f"Failed to create video for {proj_name}")
-        logger.error(message)
-        return
-    print(message)
-    logger.info(f"Created video for {proj_name}")
-    logger.info(message)
-
-    success, message = add_intro_and_closure(
-        final_video_path=f"{proj_path}/compiled_video.mp4",
-        output_path=f"{proj_path}/final_video.mp4",
-        intro_path=f"{meta_path}/intro.mp4",
-        closure_path=f"{meta_path}/closure.mp4"
-    )
-    if not success:
-        logger.error(f"Failed to add intro and closure for {proj_name}")
-        logger.error(message)
-        return
-    print(message)
-    logger.info(f"Added intro and closure for {proj_name}")
 
-    logger.info(f"Completed media compilation for {proj_name} !")
+    script_file=os.path.join(script_path,"script.txt")
+    title_file=os.path.join(script_path,"title.txt")
+    prompts_file=os.path.join(script_path,"prompts.txt")
+    audio_file=os.path.join(script_path,"script.mp3")
+    captions_file=os.path.join(script_path,"captions.json")
+    timeline_file=os.path.join(proj_path,"timeline.json")
+    compiled_file=os.path.join(proj_path,"compiled_video.mp4")
+    final_file=os.path.join(proj_path,"final_video.mp4")
+    intro_file=os.path.join(meta_path,"intro.mp4")
+    closure_file=os.path.join(meta_path,"closure.mp4")
 
+    def script_stage(deps):
+        from genmethods import genscript
+        print(f"Generating Script for {name}...")
+        try:
+            video_title,script=genscript(google_api_key,project.channel,project.prompt,name,script_path,
+                                         stream=tts is not None,on_sentence=tts.feed if tts else None)
+        except Exception:
+            if tts:
+                tts.close()
+            raise
+        log.info(f"Generated Script for {name}")
+        log.info(f"Title: {video_title}")
+        return video_title,script
 
-if __name__=="__main__":
-    main()
+    def load_script(deps):
+        with open(title_file) as f:
+            video_title=f.read()
+        with open(script_file) as f:
+            script=f.read()
+        return video_title,script
+
+    def prompts_stage(deps):
+        from genmethods import genprompts
+        print(f"Generating Prompts for {name}...")
+        prompts=genprompts(project.prompt,n_prompts=project.images_per_video)
+        with open(prompts_file,"w") as f:
+            f.write("\n".join(prompts))
+        log.info(f"Generated {len(prompts)} prompts for {name}")
+        return prompts
+
+    def load_prompts(deps):
+        with open(prompts_file) as f:
+            return [line for line in f.read().split("\n") if line.strip()]
+
+    def images_stage(deps):
+        from genmethods import genimages
+        print(f"Generating Images for {name}...")
+        genimages(deps["prompts"],img_path)
+        log.info(f"Generated {len(deps['prompts'])} images for {name}")
+
+    def ingest_stage(deps):
+        from ingest import ingest_images
+        print(f"Ingesting Images for {name}...")
+        _check(_call(cpu_executor, ingest_images,
+            image_folder=img_path,
+            canvas_folder=canvas_path,
+            **ingest_settings
+        ), "ingest images", name, log)
+        log.info(f"Ingested images for {name}")
+
+    def audio_stage(deps):
+        from media_methods import create_audio_with_background
+        print(f"Performing media compilations for {name}...")
+        log.info(f"Compiling media for {name}")
+        _, script = deps["script"]
+        tts_audio=tts.finish() if tts and tts.has_text else None
+        _check(_call(cpu_executor, create_audio_with_background,
+            text=script,
+            tts_audio=tts_audio,
+            tts_chunks=tts.timings if tts_audio else None,
+            output_path=audio_file,
+            captions_path=captions_file,
+            **audio_settings
+        ), "create audio", name, log)
+        log.info(f"Created audio for {name}")
+
+    def timeline_stage(deps):
+        from media_methods import create_timeline
+        _check(_call(cpu_executor, create_timeline,
+            base_folder=proj_path,
+            output_path=timeline_file,
+            **timeline_settings
+        ), "plan timeline", name, log)
+        log.info(f"Planned timeline for {name}")
 
+    def video_stage(deps):
+        from media_methods import create_video_with_transitions
+        _check(_call(cpu_executor, create_video_with_transitions,
+            base_folder=proj_path,
+            output_path=compiled_file,
+            timeline_path=timeline_file,
+            **video_settings
+        ), "create video", name, log)
+        log.info(f"Created video for {name}")
 
+    def final_stage(deps):
+        from media_methods import add_intro_and_closure
+        _check(_call(cpu_executor, add_intro_and_closure,
+            final_video_path=compiled_file,
+            output_path=final_file,
+            intro_path=intro_file,
+            closure_path=closure_file
+        ), "add intro and closure", name, log)
+        log.info(f"Added intro and closure for {name}")
 
-    
+    return {
+        "script":dict(run=script_stage,load=load_script,
+                      inputs=lambda deps:{"params":{"channel":project.channel,"prompt":project.prompt,"name":name}},
+                      outputs=lambda:[script_file,title_file]),
+        "prompts":dict(run=prompts_stage,load=load_prompts,
+                       inputs=lambda deps:{"params":{"prompt":project.prompt,"n":project.images_per_video}},
+                       outputs=lambda:[prompts_file]),
+        "images":dict(run=images_stage,
+                      inputs=lambda deps:{"params":{"prompts":deps["prompts"]}},
+                      outputs=lambda:_list_images(img_path)),
+        "ingest":dict(run=ingest_stage,
+                      inputs=lambda deps:{"params":ingest_settings,"files":_list_images(img_path)},
+                      outputs=lambda:_list_canvas(canvas_path)),
+        "audio":dict(run=audio_stage,
+                     inputs=lambda deps:{"params":audio_settings,"files":[script_file]},
+                     outputs=lambda:[audio_file,captions_file]),
+        "timeline":dict(run=timeline_stage,
+                        inputs=lambda deps:{"params":timeline_settings,"files":[audio_file,os.path.join(canvas_path,"index.json")]},
+                        outputs=lambda:[timeline_file]),
+        "video":dict(run=video_stage,
+                     inputs=lambda deps:{"params":video_settings,"files":[audio_file,captions_file,timeline_file]+_list_canvas(canvas_path)},
+                     outputs=lambda:[compiled_file]),
+        "final":dict(run=final_stage,
+                     inputs=lambda deps:{"files":[compiled_file,intro_file,closure_file]},
+                     outputs=lambda:[final_file]),
+    }
 
 
+def _load_deps(specs,stage):
+    """Results of a stage's dependencies, reloaded from the files of their last run."""
+    deps={}
+    for dep in STAGE_DEPS[stage]:
+        load=specs[dep].get("load")
+        try:
+            deps[dep]=load({}) if load else None
+        except FileNotFoundError:
+            raise StageError(f"Stage '{stage}' needs the output of '{dep}'; run that stage first")
+    return deps
 
 
+def run_project(project,force=(),from_stage=None,resources=None,cpu_executor=None):
+    """
+    Build the video for one project.
 
+    Stages whose inputs are unchanged since the last run and whose outputs are
+    still intact (see manifest.json in the project folder) are skipped.
 
+    Args:
+        project (Project): The project to build
+        force (Iterable[str]): Stages to rerun even if they are up to date
+        from_stage (str): Rerun this stage and everything downstream of it
+        resources (dict): Shared "network"/"cpu" semaphores bounding stages across projects
+        cpu_executor (Executor): Process pool the audio/video stages are rendered in
 
+    Returns:
+        PipelineReport: Per-stage results and timings
+    """
+    # Records from every module (pipeline, manifest, genmethods...) go to this project's log
+    with log_project(project.name):
+        return _run_project(project,force,from_stage,resources,cpu_executor)
+
+
+def _run_project(project,force=(),from_stage=None,resources=None,cpu_executor=None):
+    name=project.name
+    log=get_logger(name)
+    project.create_dirs()
+
+    forced=set(force)
+    if from_stage:
+        forced|=_downstream(from_stage)
+    manifest=RunManifest(project.path)
+
+    # In streaming mode narration is synthesized while the script is still being written
+    tts=None
+    if stream_script:
+        from media_methods import IncrementalTTS
+        tts=IncrementalTTS()
+    stage_specs=_stage_specs(project,log,tts=tts,cpu_executor=cpu_executor)
+    run_metrics=RunMetrics(name)
+
+    try:
+        report = run_stages([
+            Stage(stage, run_metrics.wrap(stage, resumable(manifest, stage, force=stage in forced, **stage_specs[stage])),
+                  deps=STAGE_DEPS[stage], resource=STAGE_RESOURCES[stage] if resources else None)
+            for stage in STAGES
+        ], resources=resources)
+    finally:
+        if tts:
+            tts.close()
+        run_metrics.close()
+    print(report.summary())
+    log.info(f"Pipeline report for {name}:\n{report.summary()}")
+    try:
+        run_metrics.write(project.path,report,prometheus=metrics_prometheus)
+    except OSError as e:
+        log.error(f"Failed to write run report for {name}: {e}")
+
+    if not report.ok:
+        for r in report.failed():
+            log.error(f"Stage '{r.name}' failed for {name}: {r.error}")
+        return report
+
+    log.info(f"Completed media compilation for {name} !")
+    return report
+
+
+def run_stage(project,stage,force=False):
+    """
+    Run a single stage, taking its dependencies' results from their last run.
+
+    Returns:
+        bool: Whether the stage completed (or was already up to date)
+    """
+    log=get_logger(project.name)
+    project.create_dirs()
+    specs=_stage_specs(project,log)
+    try:
+        with log_project(project.name):
+            resumable(RunManifest(project.path),stage,force=force,**specs[stage])(_load_deps(specs,stage))
+    except Exception as e:
+        log.error(f"Stage '{stage}' failed for {project.name}: {e}")
+        print(f"Stage '{stage}' failed: {e}")
+        return False
+    return True
+
+
+def project_status(project):
+    """
+    State of every stage according to the project's manifest.
+
+    Returns:
+        List[Tuple[str, str, str]]: (stage, state, completed_at) where state is
+        "up to date", "outdated" or "not run"
+    """
+    specs=_stage_specs(project,get_logger(project.name))
+    manifest=RunManifest(project.path)
+    rows=[]
+    for stage in STAGES:
+        entry=manifest.stages.get(stage)
+        if not entry:
+            rows.append((stage,"not run",""))
+            continue
+        try:
+            spec=specs[stage]["inputs"](_load_deps(specs,stage))
+            fresh=manifest.is_fresh(stage,manifest.hash_inputs(spec.get("params",{}),spec.get("files",())))
+        except (StageError,OSError):
+            fresh=False
+        rows.append((stage,"up to date" if fresh else "outdated",entry.get("completed_at","")))
+    return rows
+
+
+def main(force=(),from_stage=None):
+    """Build the video for the project configured in config.py."""
+    return run_project(Project.from_config(),force=force,from_stage=from_stage)
+
+
+# CLI subcommands running a single stage
+COMMANDS={
+    "script":"script",
+    "prompts":"prompts",
+    "images":"images",
+    "ingest":"ingest",
+    "audio":"audio",
+    "timeline":"timeline",
+    "render":"video",
+    "finalize":"final",
+}
+
+
+def parse_args(argv=None):
+    parser=argparse.ArgumentParser(description="Generate a video for the configured project")
+    parser.add_argument("--name",help="Project name (default: proj_name from config.py)")
+    parser.add_argument("--prompt",help="Project prompt (default: proj_prompt from config.py)")
+    sub=parser.add_subparsers(dest="command",metavar="COMMAND")
+
+    run=sub.add_parser("run",help="Run the whole pipeline (default)")
+    for p in (parser,run):
+        p.add_argument("--force",nargs="+",choices=STAGES,default=[],metavar="STAGE",
+                       help=f"Rerun these stages even if they are up to date ({', '.join(STAGES)})")
+        p.add_argument("--from-stage",choices=STAGES,metavar="STAGE",
+                       help="Rerun this stage and every stage after it")
+        p.add_argument("--force-all",action="store_true",help="Ignore the manifest and rerun everything")
+
+    for command,stage in COMMANDS.items():
+        p=sub.add_parser(command,help=f"Run only the '{stage}' stage")
+        p.add_argument("--force",action="store_true",help="Rerun even if up to date")
+    for p in (parser,run,sub.choices["render"]):
+        p.add_argument("--profile-render",action="store_true",help="Time each rendered frame (render_profile.json)")
+        p.add_argument("--cprofile",action="store_true",help="With --profile-render, also write render.pstats")
+    sub.add_parser("status",help="Show which stages are up to date")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None):
+    args=parse_args(argv)
+    if getattr(args,"profile_render",False):
+        # Through the environment so renders in worker processes see it too
+        os.environ["CONXHUB_RENDER_PROFILE"]="cprofile" if args.cprofile else "1"
+    if args.name or args.prompt:
+        config_project=Project.from_config()
+        project=Project(name=args.name or config_project.name,prompt=args.prompt or config_project.prompt)
+    else:
+        project=Project.from_config()
+
+    if args.command=="status":
+        for stage,state,completed_at in project_status(project):
+            print(f"{stage:<10}{state:<12}{completed_at}")
+        return 0
+    if args.command in COMMANDS:
+        return 0 if run_stage(project,COMMANDS[args.command],force=args.force) else 1
+
+    report=run_project(project,force=STAGES if args.force_all else args.force,from_stage=args.from_stage)
+    return 0 if report.ok else 1
+
+
+if __name__=="__main__":
+    progress.configure_from_env()
+    raise SystemExit(cli())
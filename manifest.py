@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from logger import get_logger
+
+logger = get_logger()
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file, read in chunks so large videos never sit in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class RunManifest:
+    """
+    Per-project record of which pipeline stages ran, on what inputs, producing what.
+
+    Stored as `manifest.json` in the project folder. For every stage it keeps the
+    hash of the stage's inputs and the size, mtime and sha256 of each output file,
+    so a rerun can skip stages whose inputs are unchanged and whose outputs are
+    still on disk untouched.
+    """
+
+    def __init__(self, proj_path: str, filename: str = "manifest.json"):
+        self.path = os.path.join(proj_path, filename)
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.stages = json.load(f).get("stages", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def digest(self, path: str) -> str:
+        """
+        sha256 of a file, reusing the recorded digest when size and mtime still match.
+        """
+        st = os.stat(path)
+        with self._lock:
+            for entry in self.stages.values():
+                out = entry.get("outputs", {}).get(path)
+                if out and out["size"] == st.st_size and out["mtime_ns"] == st.st_mtime_ns:
+                    return out["sha256"]
+        return file_digest(path)
+
+    def hash_inputs(self, params: Dict[str, Any], files: Iterable[str] = ()) -> str:
+        """Hash of a stage's parameters plus the contents of its input files."""
+        h = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode())
+        for path in sorted(files):
+            h.update(path.encode())
+            h.update(self.digest(path).encode() if os.path.exists(path) else b"missing")
+        return h.hexdigest()
+
+    def _verify(self, outputs: Dict[str, Dict[str, Any]]) -> bool:
+        for path, rec in outputs.items():
+            if not os.path.exists(path):
+                return False
+            st = os.stat(path)
+            if st.st_size != rec["size"]:
+                return False
+            if st.st_mtime_ns != rec["mtime_ns"] and file_digest(path) != rec["sha256"]:
+                return False
+        return True
+
+    def is_fresh(self, stage: str, input_hash: str) -> bool:
+        """True if the stage last ran on the same inputs and its outputs verify."""
+        with self._lock:
+            entry = self.stages.get(stage)
+        return bool(entry) and entry["inputs"] == input_hash and self._verify(entry["outputs"])
+
+    def record(self, stage: str, input_hash: str, outputs: Iterable[str], duration: float = 0.0) -> None:
+        records = {}
+        for path in outputs:
+            st = os.stat(path)
+            records[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_digest(path)}
+        with self._lock:
+            self.stages[stage] = {
+                "inputs": input_hash,
+                "outputs": records,
+                "duration": round(duration, 3),
+                "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self._save()
+
+    def invalidate(self, stage: str) -> None:
+        with self._lock:
+            if self.stages.pop(stage, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"stages": self.stages}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def resumable(
+    manifest: RunManifest,
+    name: str,
+    run: Callable[[Dict[str, Any]], Any],
+    inputs: Callable[[Dict[str, Any]], Dict[str, Any]],
+    outputs: Callable[[], List[str]],
+    load: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    force: bool = False
+) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Wraps a stage function so it is skipped when the manifest says it is up to date.
+
+    Args:
+        manifest (RunManifest): Manifest of the project being built
+        name (str): Stage name
+        run (Callable): The stage function
+        inputs (Callable): Returns {"params": {...}, "files": [...]} describing the stage's inputs
+        outputs (Callable): Returns the output files of the stage after it ran
+        load (Callable): Rebuilds the stage's return value from its outputs when it is skipped
+        force (bool): Always run the stage
+
+    Returns:
+        Callable: Stage function for pipeline.Stage
+    """
+    def func(deps):
+        spec = inputs(deps)
+        input_hash = manifest.hash_inputs(spec.get("params", {}), spec.get("files", ()))
+        if not force and manifest.is_fresh(name, input_hash):
+            logger.info(f"Stage '{name}' is up to date, skipping")
+            print(f"Skipping {name} (up to date)")
+            return load(deps) if load else None
+
+        manifest.invalidate(name)
+        start = time.monotonic()
+        value = run(deps)
+        manifest.record(name, input_hash, outputs(), time.monotonic() - start)
+        return value
+
+    return func
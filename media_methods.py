@@ -1,14 +1,23 @@
+from __future__ import annotations
+
 import os
 import random
-from gtts import gTTS
-from pydub import AudioSegment
-from typing import Optional, Tuple, List
+from typing import TYPE_CHECKING, Callable, Optional, Tuple, List
 import tempfile
 import time
 import subprocess
-from moviepy.editor import ImageClip, AudioFileClip, CompositeVideoClip, VideoClip,VideoFileClip, concatenate_videoclips
-from pathlib import Path
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import progress
+import metrics
+import renderprofile
+import contextvars
+
+# gtts, pydub, moviepy and numpy take seconds to import; they are imported by
+# the functions that use them so that importing this module stays cheap
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+    from moviepy.editor import VideoClip
 
 def check_ffmpeg_installed():
     """Check if ffmpeg is installed and accessible."""
@@ -18,23 +27,244 @@ def check_ffmpeg_installed():
     except FileNotFoundError:
         return False
 
-def get_random_background_music(bg_music_path: str) -> str:
+# Catalog written by utils/bg_music.py in the background music folder
+BG_CATALOG = "catalog.json"
+
+@lru_cache(maxsize=4)
+def _read_background_catalog(path: str, mtime: float) -> Tuple[dict, ...]:
+    import json
+    with open(path) as f:
+        return tuple(t for t in json.load(f)["tracks"] if t.get("status") == "complete" and t.get("duration"))
+
+def load_background_catalog(bg_music_path: str) -> Tuple[dict, ...]:
     """
-    Get a random background music file from the directory.
-    
+    Tracks of the background library, read from its catalog once and again only when it changes.
+
+    Args:
+        bg_music_path (str): Path to background music directory
+
+    Returns:
+        Tuple[dict, ...]: Catalog entries (id, path, duration, loudness, ...)
+    """
+    path = os.path.join(bg_music_path, BG_CATALOG)
+    try:
+        tracks = _read_background_catalog(path, os.path.getmtime(path))
+    except FileNotFoundError:
+        raise Exception(f"No background catalog in {bg_music_path}; run utils/bg_music.py --index --path {bg_music_path}")
+    if not tracks:
+        raise Exception(f"No audio files found in {bg_music_path}")
+    return tracks
+
+def select_background_music(
+    bg_music_path: str,
+    duration_ms: int,
+    crossfade_ms: int = 0,
+    rng: Optional[random.Random] = None
+) -> List[dict]:
+    """
+    Choose distinct background tracks that together cover `duration_ms` with the fewest joins.
+
+    Uses the durations in the library catalog, so nothing is listed or decoded.
+    The number of tracks is the smallest for which the longest tracks would be
+    long enough (each join overlaps `crossfade_ms`); the tracks themselves are
+    picked at random among those that still allow that. When even the whole
+    library is too short, every track is used once, longest first, and the
+    mixer repeats the sequence.
+
     Args:
         bg_music_path (str): Path to background music directory
+        duration_ms (int): Length the background has to cover, in milliseconds
+        crossfade_ms (int): Overlap of consecutive tracks, in milliseconds
+        rng (random.Random): Random source (default: the random module)
+
+    Returns:
+        List[dict]: Catalog entries of the tracks, in playing order
+    """
+    rng = rng or random
+    pool = sorted(load_background_catalog(bg_music_path), key=lambda t: t["duration"], reverse=True)
+    lengths = [t["duration"] * 1000 for t in pool]
+
+    count = 0
+    while count < len(pool) and sum(lengths[:count + 1]) - count * crossfade_ms < duration_ms:
+        count += 1
+    if count == len(pool):
+        return pool
+    count += 1
+
+    chosen = []
+    needed = duration_ms + (count - 1) * crossfade_ms
+    pool = list(zip(lengths, pool))
+    for slots in range(count, 0, -1):
+        # Longest `slots` tracks; a track can be taken if the longest others still fill the remaining slots
+        top = pool[:slots]
+        top_sum = sum(length for length, _ in top)
+        rest = top_sum - top[-1][0]
+        candidates = [i for i, (length, _) in enumerate(pool)
+                      if length + (top_sum - length if i < slots - 1 else rest) >= needed]
+        length, track = pool.pop(rng.choice(candidates))
+        chosen.append(track)
+        needed -= length
+    rng.shuffle(chosen)
+    return chosen
+
+def synthesize_speech(
+    text: str,
+    temp_dir: str,
+    language: str = 'en',
+    tld: str = 'com',
+    slow: bool = False,
+    max_retries: int = 3
+) -> AudioSegment:
+    """
+    Converts text to speech with the configured TTS provider (gTTS when live), retrying on transient failures.
+    
+    Args:
+        text (str): The text to convert to speech
+        temp_dir (str): Directory for the intermediate mp3 files
+        language (str): Language code for TTS (default: 'en')
+        tld (str): Top-level domain for accent (default: 'com' for US English)
+        slow (bool): Whether to use slower speech (default: False)
+        max_retries (int): Number of attempts before giving up (default: 3)
     
     Returns:
-        str: Path to selected background music file
+        AudioSegment: The synthesized speech
+    """
+    from providers import get_providers
+
+    provider = get_providers()
+    for attempt in range(max_retries):
+        metrics.incr("api_calls")
+        try:
+            return provider.speech(text, temp_dir, language=language, tld=tld, slow=slow)
+        except Exception as e:
+            if attempt == max_retries - 1:
+                raise Exception(f"Failed to generate TTS after {max_retries} attempts: {str(e)}")
+            metrics.incr("retries")
+            provider.pause("tts_retry")
+
+class IncrementalTTS:
     """
-    audio_files = [f for f in os.listdir(bg_music_path) 
-                   if f.lower().endswith(('.mp3', '.wav', '.m4a'))]
+    Synthesizes narration sentence by sentence while the script is still being written.
     
-    if not audio_files:
-        raise Exception(f"No audio files found in {bg_music_path}")
+    Sentences passed to feed() are grouped into chunks of at least `min_chars`
+    characters and synthesized in order on a background thread; finish() waits
+    for the outstanding chunks and returns the joined narration. After that,
+    `timings` holds the text and spoken duration of every chunk.
     
-    return random.choice(audio_files)
+    Args:
+        language (str): Language code for TTS (default: 'en')
+        tld (str): Top-level domain for accent (default: 'com' for US English)
+        slow (bool): Whether to use slower speech (default: False)
+        min_chars (int): Minimum characters per TTS request (default: 300)
+        synthesize (Callable): Function mapping text to an AudioSegment, replaces gTTS (e.g. a local fake)
+    """
+    def __init__(
+        self,
+        language: str = 'en',
+        tld: str = 'com',
+        slow: bool = False,
+        min_chars: int = 300,
+        synthesize: Optional[Callable[[str], AudioSegment]] = None
+    ):
+        self.min_chars = min_chars
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._synthesize = synthesize or (
+            lambda text: synthesize_speech(text, self._temp_dir.name, language=language, tld=tld, slow=slow)
+        )
+        # A single worker keeps requests sequential and chunks in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self._futures = []
+        self._buffer: List[str] = []
+        self.chunks: List[str] = []
+        self.durations: List[int] = []
+
+    def feed(self, sentence: str) -> None:
+        """Queue a complete sentence for synthesis."""
+        self._buffer.append(sentence)
+        if sum(len(s) + 1 for s in self._buffer) >= self.min_chars:
+            self._submit()
+
+    def _submit(self) -> None:
+        if not self._buffer:
+            return
+        chunk = " ".join(self._buffer)
+        self._buffer = []
+        self.chunks.append(chunk)
+        # Run in the caller's context so TTS calls count towards the stage feeding the sentences
+        self._futures.append(self._executor.submit(contextvars.copy_context().run, self._synthesize, chunk))
+
+    @property
+    def has_text(self) -> bool:
+        """Whether any sentence has been fed yet."""
+        return bool(self._buffer or self._futures)
+
+    def finish(self) -> AudioSegment:
+        """Synthesize any remaining text and return the full narration."""
+        try:
+            self._submit()
+            if not self._futures:
+                raise Exception("No text was fed for TTS")
+            segments = [f.result() for f in self._futures]
+            self.durations = [len(s) for s in segments]
+            return sum(segments[1:], segments[0])
+        finally:
+            self.close()
+
+    @property
+    def timings(self) -> List[Tuple[str, int]]:
+        """(text, milliseconds) of each synthesized chunk, in playing order; filled by finish()."""
+        return list(zip(self.chunks, self.durations))
+
+    def close(self) -> None:
+        """Drop pending work and release the worker thread and temp files."""
+        for f in self._futures:
+            f.cancel()
+        self._executor.shutdown(wait=True)
+        self._temp_dir.cleanup()
+
+@lru_cache(maxsize=16)
+def _load_background(bg_path: str) -> AudioSegment:
+    """Decode a background track once and reuse it for every video made in this process."""
+    from pydub import AudioSegment
+    return AudioSegment.from_file(bg_path)
+
+def duck_under_speech(
+    background: AudioSegment,
+    speech: AudioSegment,
+    reduction_db: float,
+    depth_db: float
+) -> AudioSegment:
+    """
+    Lower `background` by `reduction_db` while `speech` is speaking and by `depth_db` less in its pauses.
+
+    Args:
+        background (AudioSegment): Background music
+        speech (AudioSegment): Narration it will be mixed with, starting at the same time
+        reduction_db (float): Reduction under speech in dB
+        depth_db (float): How many dB the background rises in pauses
+
+    Returns:
+        AudioSegment: The ducked background, same length and format as `background`
+    """
+    import numpy as np
+    from ducking import SpeechDucker
+
+    def samples(segment):
+        dtype = np.dtype(f"<i{segment.sample_width}")
+        scale = float(1 << (8 * segment.sample_width - 1))
+        values = np.frombuffer(segment.raw_data, dtype=dtype).astype(np.float32) / np.float32(scale)
+        return values.reshape(-1, segment.channels), dtype, scale
+
+    music, dtype, scale = samples(background)
+    narration = samples(speech)[0].mean(axis=1)
+    if speech.frame_rate != background.frame_rate:
+        # Nearest-sample resampling is enough for measuring speech levels
+        positions = np.arange(len(narration) * background.frame_rate // speech.frame_rate)
+        narration = narration[positions * speech.frame_rate // background.frame_rate]
+
+    ducked = SpeechDucker(background.frame_rate, reduction_db, depth_db).duck(music, narration)
+    ducked = np.clip(ducked * np.float32(scale), -scale, scale - 1).astype(dtype)
+    return background._spawn(ducked.tobytes())
 
 def create_audio_with_background(
     text: str,
@@ -45,70 +275,80 @@ def create_audio_with_background(
     slow: bool = False,
     bg_volume_reduction: int = 15,
     fade_duration: int = 3000,
-    crossfade_duration: int = 1000  # Duration for crossfade between loops
+    crossfade_duration: int = 1000,  # Duration for crossfade between loops
+    tts_audio: Optional[AudioSegment] = None,
+    duck_depth: float = 8,
+    tts_chunks: Optional[List[Tuple[str, int]]] = None,
+    captions_path: Optional[str] = None
 ) -> Tuple[bool, str]:
     """
     Creates an audio file combining text-to-speech with looped background music.
     
     Args:
         text (str): The text to convert to speech
-        bg_music_path (str): Path to the directory containing background music files
+        bg_music_path (str): Path to the directory containing background music files and their catalog
         output_path (str): Path where the final audio should be saved
         language (str): Language code for TTS (default: 'en')
         tld (str): Top-level domain for accent (default: 'com' for US English)
         slow (bool): Whether to use slower speech (default: False)
-        bg_volume_reduction (int): How many dB to reduce background music by (default: 15)
+        bg_volume_reduction (int): How many dB to reduce background music by under speech (default: 15)
         fade_duration (int): Duration for fade effects in milliseconds (default: 3000)
         crossfade_duration (int): Duration for crossfade between loops (default: 1000)
+        tts_audio (AudioSegment): Narration that was already synthesized (e.g. by IncrementalTTS);
+            when given, `text` is not sent to TTS again
+        duck_depth (float): How many dB the background rises in pauses of the narration;
+            0 keeps it at `bg_volume_reduction` throughout (default: 8)
+        tts_chunks (List[Tuple[str, int]]): (text, milliseconds) of each chunk of `tts_audio`
+            (IncrementalTTS.timings); without it the narration counts as one chunk of `text`
+        captions_path (str): Where to save captions timed to the narration (default: no captions)
     """
     if not check_ffmpeg_installed():
         return False, ("ffmpeg is not installed or not in PATH. Please install ffmpeg")
+    from pydub import AudioSegment
 
     try:
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Generate TTS audio
-            max_retries = 3
-            for attempt in range(max_retries):
-                temp_tts_path = os.path.join(temp_dir, f"temp_tts_{attempt}.mp3")
-                try:
-                    tts = gTTS(text=text, lang=language, tld=tld, slow=slow)
-                    tts.save(temp_tts_path)
-                    time.sleep(0.5)
-                    tts_audio = AudioSegment.from_mp3(temp_tts_path)
-                    break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise Exception(f"Failed to generate TTS after {max_retries} attempts: {str(e)}")
-                    time.sleep(1)
+            # Generate TTS audio unless it was synthesized ahead of time
+            if tts_audio is None:
+                tts_audio = synthesize_speech(text, temp_dir, language=language, tld=tld, slow=slow)
             
             # Get TTS duration
             tts_duration = len(tts_audio)
             
-            # Get random background music
+            # Time the captions to the spoken chunks
+            if captions_path:
+                from captions import save_captions, time_captions
+                chunks = tts_chunks or [(text, tts_duration)]
+                save_captions(captions_path, time_captions([(chunk, ms / 1000) for chunk, ms in chunks]))
+            
+            # Choose background tracks that cover the narration with the fewest joins
+            remaining_duration = tts_duration + fade_duration
             try:
-                chosen_bg = get_random_background_music(bg_music_path)
-                bg_path = os.path.join(bg_music_path, chosen_bg)
-                background_music = AudioSegment.from_file(bg_path)
+                tracks = select_background_music(bg_music_path, remaining_duration, crossfade_duration)
+                backgrounds = [_load_background(os.path.join(bg_music_path, t["path"])) for t in tracks]
             except Exception as e:
                 return False, f"Error loading background music: {str(e)}"
             
-            # Adjust background music volume
-            background_music = background_music - bg_volume_reduction
+            # Bring every track to the library's average loudness
+            levels = [t["loudness"] for t in load_background_catalog(bg_music_path) if t.get("loudness") is not None]
+            reference = sum(levels) / len(levels) if levels else None
+            backgrounds = [bg + (reference - t["loudness"]) if t.get("loudness") is not None else bg
+                           for bg, t in zip(backgrounds, tracks)]
             
-            # Create looped background music to match TTS length
+            # Join the tracks (repeating them only if the library is too short) to match TTS length
             looped_background = AudioSegment.empty()
-            remaining_duration = tts_duration + fade_duration
-            bg_length = len(background_music)
-            
+            pieces = 0
             while len(looped_background) < remaining_duration:
+                background_music = backgrounds[pieces % len(backgrounds)]
                 if len(looped_background) == 0:
                     looped_background = background_music
                 else:
-                    # Crossfade when adding new loop to avoid clicks/pops
+                    # Crossfade when adding the next track to avoid clicks/pops
                     looped_background = looped_background.append(
                         background_music,
                         crossfade=crossfade_duration
                     )
+                pieces += 1
             
             # Trim to exact length needed
             looped_background = looped_background[:tts_duration + fade_duration]
@@ -116,6 +356,9 @@ def create_audio_with_background(
             # Add fade effects
             looped_background = looped_background.fade_in(fade_duration).fade_out(fade_duration)
             
+            # Reduce the background volume, less so where the narration pauses
+            looped_background = duck_under_speech(looped_background, tts_audio, bg_volume_reduction, duck_depth)
+            
             # Combine audio
             combined_audio = looped_background.overlay(tts_audio)
             
@@ -135,7 +378,8 @@ def create_audio_with_background(
             
             return True, (f"Successfully created audio file: {output_path}\n"
                          f"TTS Duration: {tts_duration/1000:.1f} seconds\n"
-                         f"Background Track: {chosen_bg} (looped to match TTS duration)")
+                         f"Background Tracks: {', '.join(t['path'] for t in tracks)} "
+                         f"({pieces - 1} joins to match TTS duration)")
             
     except Exception as e:
         return False, f"Error creating audio: {str(e)}"
@@ -269,17 +513,182 @@ def create_audio_with_background(
 #     except Exception as e:
 #         return False, f"Error creating video: {str(e)}"
     
+def _image_sources(base_folder: str) -> Tuple[str, List[str], Optional[dict]]:
+    """
+    Folder and names of the images a video is made of: the canvases of the
+    ingest stage (canvas/index.json) when they exist, otherwise the downloaded images.
+
+    Returns:
+        Tuple[str, List[str], Optional[dict]]: (folder, image names, canvas index or None)
+    """
+    from ingest import load_index
+    canvas_folder = os.path.join(base_folder, "canvas")
+    canvas_index = load_index(canvas_folder)
+    if canvas_index and canvas_index["images"]:
+        return canvas_folder, [entry["file"] for entry in canvas_index["images"]], canvas_index
+    image_folder = os.path.join(base_folder, "images")
+    image_files = sorted(f for f in os.listdir(image_folder)
+                         if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')))
+    return image_folder, image_files, None
+
+def create_timeline(
+    base_folder: str,
+    output_path: Optional[str] = None,
+    image_duration: float = 3.0,
+    transition_duration: float = 1.0,
+    min_zoom: float = 1.0,
+    max_zoom: float = 1.2,
+    seed: Optional[int] = None,
+    transition: str = "cut"
+) -> tuple[bool, str]:
+    """
+    Plans the slots of a video over the narration and saves the plan (see timeline.py).
+    
+    Args:
+        base_folder (str): Path containing 'images' (or 'canvas') and 'script' subfolders
+        output_path (str): Where the plan is saved (default: timeline.json in base_folder)
+        image_duration (float): Duration each image should be shown (seconds)
+        transition_duration (float): Duration of transition effects (seconds)
+        min_zoom (float): Minimum zoom factor for the Ken Burns effect
+        max_zoom (float): Maximum zoom factor for the Ken Burns effect
+        seed (int): Seed of the plan (default: a random one, recorded in the plan)
+        transition (str): How each image comes in: "cut" or "crossfade"
+    
+    Returns:
+        tuple[bool, str]: (Success status, Message)
+    """
+    from moviepy.editor import AudioFileClip
+    from timeline import TIMELINE_FILE, plan_timeline
+
+    output_path = output_path or os.path.join(base_folder, TIMELINE_FILE)
+    try:
+        audio_file = os.path.join(base_folder, "script", "script.mp3")
+        if not os.path.exists(audio_file):
+            return False, "script.mp3 not found in script folder"
+        with AudioFileClip(audio_file) as audio:
+            total_duration = audio.duration
+
+        _, image_files, _ = _image_sources(base_folder)
+        if not image_files:
+            return False, "No image files found in images folder"
+
+        plan = plan_timeline(image_files, total_duration, image_duration, transition_duration,
+                             min_zoom, max_zoom, seed=seed, transition=transition)
+        plan.save(output_path)
+        return True, f"Planned {len(plan.entries)} slots over {total_duration:.1f}s (seed {plan.seed}): {output_path}"
+
+    except Exception as e:
+        return False, f"Error planning timeline: {str(e)}"
+
+def _ken_burns_clip(img_path: str, entry, canvas_index: Optional[dict], profiler=None) -> VideoClip:
+    """Clip of one timeline entry: its image zoomed and panned as planned, for the entry's whole length."""
+    import numpy as np
+    from PIL import Image
+    from moviepy.editor import VideoClip
+
+    if canvas_index:
+        # Already decoded and sized
+        source = Image.fromarray(np.load(img_path))
+        w, h = canvas_index["size"]
+    else:
+        with Image.open(img_path) as image:
+            source = image.convert("RGB")
+        w, h = source.size
+    src_w, src_h = source.size
+    scale_x, scale_y = w / src_w, h / src_h
+
+    def create_frame(t):
+        current_zoom, current_x, current_y = entry.window(t, (w, h))
+
+        # The (x, y, w, h) window of the frame zoomed by current_zoom is the
+        # window (x, y, w, h) / current_zoom of the source (scaled to the
+        # source's size); resize() reads only the pixels that window needs
+        x1, y1 = current_x / (current_zoom * scale_x), current_y / (current_zoom * scale_y)
+        x2 = min(src_w, (current_x + w) / (current_zoom * scale_x))
+        y2 = min(src_h, (current_y + h) / (current_zoom * scale_y))
+
+        if profiler is None:
+            return np.asarray(source.resize((w, h), Image.LANCZOS, box=(x1, y1, x2, y2)))
+
+        start = time.perf_counter()
+        resized = source.resize((w, h), Image.LANCZOS, box=(x1, y1, x2, y2))
+        scaled = time.perf_counter()
+        frame = np.asarray(resized)
+        done = time.perf_counter()
+        profiler.add("resize", scaled - start)
+        profiler.add("convert", done - scaled)
+        return frame
+
+    return VideoClip(create_frame, duration=entry.length)
+
+def _timeline_video(base_folder: str, plan, start: float, end: float, captions: bool, profiler=None):
+    """
+    The frames of [start, end) of a plan, as a clip starting at 0, and the entry clips it is made of.
+
+    Entries are clipped to the time they are visible, so an image that the
+    next one cuts over is not drawn underneath it. An entry that crossfades in
+    fades in over the previous one for plan.fade_in(entry) seconds.
+    """
+    from moviepy.editor import CompositeVideoClip
+
+    image_folder, image_files, canvas_index = _image_sources(base_folder)
+    entries = plan.between(start, end)
+    if not entries:
+        raise Exception(f"Timeline has nothing to show between {start}s and {end}s")
+    missing = sorted({e.image for e in entries} - set(image_files))
+    if missing:
+        raise Exception(f"Timeline refers to images that are not in {image_folder}: {', '.join(missing)}")
+
+    clips = []
+    for entry in entries:
+        clip = _ken_burns_clip(os.path.join(image_folder, entry.image), entry, canvas_index, profiler)
+        fade = plan.fade_in(entry)
+        if fade > 0:
+            clip = clip.crossfadein(fade)
+        clips.append(clip.set_start(entry.start - start).set_end(min(plan.visible_until(entry), end) - start))
+    video = CompositeVideoClip(clips).set_duration(min(end, plan.end) - start)
+
+    # Draw the captions over the composited frames
+    captions_file = os.path.join(base_folder, "script", "captions.json")
+    if captions and os.path.exists(captions_file):
+        from captions import CaptionRenderer, load_captions
+        captioner = CaptionRenderer(load_captions(captions_file), video.size)
+        make_frame = video.make_frame
+
+        def captioned_frame(t):
+            if profiler is None:
+                return captioner.draw(make_frame(t), start + t)
+            frame = make_frame(t)
+            began = time.perf_counter()
+            frame = captioner.draw(frame, start + t)
+            profiler.add("captions", time.perf_counter() - began)
+            return frame
+
+        video.make_frame = captioned_frame
+    return video, clips
+
 def create_video_with_transitions(
     base_folder: str,
     output_path: str = "output_video.mp4",
     image_duration: float = 3.0,
     transition_duration: float = 1.0,
     min_zoom: float = 1.0,
-    max_zoom: float = 1.2
+    max_zoom: float = 1.2,
+    captions: bool = True,
+    timeline_path: Optional[str] = None,
+    seed: Optional[int] = None,
+    transition: str = "cut"
 ) -> tuple[bool, str]:
     """
     Creates a video from images with transitions and audio narration.
     Ensures each image is used at least once while maintaining randomness.
+
+    Renders the timeline plan at `timeline_path` when it exists; otherwise
+    plans one from the settings below first (see timeline.py).
+
+    Uses the canvases of the ingest stage (canvas/index.json) when they exist,
+    at the video size recorded there; otherwise the downloaded images, at
+    their own size.
     
     Args:
         base_folder (str): Path containing 'images' and 'script' subfolders
@@ -288,10 +697,17 @@ def create_video_with_transitions(
         transition_duration (float): Duration of transition effects (seconds)
         min_zoom (float): Minimum zoom factor for the Ken Burns effect
         max_zoom (float): Maximum zoom factor for the Ken Burns effect
+        captions (bool): Draw the captions from script/captions.json, when it exists
+        timeline_path (str): Timeline plan to render (default: plan one)
+        seed (int): Seed of the plan made when there is none (default: random)
+        transition (str): How each image comes in when planning: "cut" or "crossfade"
     
     Returns:
         tuple[bool, str]: (Success status, Message)
     """
+    from moviepy.editor import AudioFileClip
+    from timeline import TimelinePlan, plan_timeline
+
     try:
         # Validate folder structure
         image_folder = os.path.join(base_folder, "images")
@@ -308,95 +724,44 @@ def create_video_with_transitions(
         # Load audio and get duration
         audio = AudioFileClip(audio_file)
         total_duration = audio.duration
+
+        if timeline_path and os.path.exists(timeline_path):
+            plan = TimelinePlan.load(timeline_path)
+        else:
+            _, image_files, _ = _image_sources(base_folder)
+            if not image_files:
+                return False, "No image files found in images folder"
+            plan = plan_timeline(image_files, total_duration, image_duration, transition_duration,
+                                 min_zoom, max_zoom, seed=seed, transition=transition)
         
-        # Get list of images
-        image_files = [f for f in os.listdir(image_folder) 
-                      if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
-        
-        if not image_files:
-            return False, "No image files found in images folder"
-            
-        # Create a pool of unused images and a list for used images
-        unused_images = image_files.copy()
-        used_images = []
-        
-        def create_transition_clip(img_path: str, start_time: float, duration: float) -> VideoClip:
-            """Creates a clip with Ken Burns effect and random transitions."""
-            img = ImageClip(img_path)
-            
-            # Randomly choose zoom direction (in or out)
-            zoom_in = random.choice([True, False])
-            start_zoom = min_zoom if zoom_in else max_zoom
-            end_zoom = max_zoom if zoom_in else min_zoom
-            
-            # Random starting position
-            w, h = img.size
-            start_x = random.uniform(0, w * (start_zoom - 1))
-            start_y = random.uniform(0, h * (start_zoom - 1))
-            end_x = random.uniform(0, w * (end_zoom - 1))
-            end_y = random.uniform(0, h * (end_zoom - 1))
-            
-            def create_frame(t):
-                progress = t / duration
-                current_zoom = start_zoom + (end_zoom - start_zoom) * progress
-                current_x = start_x + (end_x - start_x) * progress
-                current_y = start_y + (end_y - start_y) * progress
-                
-                zoomed = img.resize(current_zoom)
-                frame = zoomed.crop(
-                    x1=current_x,
-                    y1=current_y,
-                    x2=current_x + w,
-                    y2=current_y + h
-                ).resize(img.size).get_frame(t)
-                
-                return np.array(frame)
-            
-            return VideoClip(create_frame, duration=duration)
-        
-        clips = []
-        current_time = 0
-        
-        while current_time < total_duration:
-            # If unused_images is empty but we still need more images,
-            # refill it with all images except the last used one
-            if not unused_images:
-                unused_images = [img for img in image_files if img != used_images[-1]]
-                random.shuffle(unused_images)
-            
-            # Select an image from unused_images
-            img_file = unused_images.pop()
-            used_images.append(img_file)
-            
-            img_path = os.path.join(image_folder, img_file)
-            
-            # Create clip with transition effect
-            clip_duration = min(image_duration, total_duration - current_time)
-            if clip_duration <= 0:
-                break
-                
-            clip = create_transition_clip(
-                img_path,
-                current_time,
-                clip_duration + transition_duration
-            ).set_start(current_time)
-            
-            clips.append(clip)
-            current_time += clip_duration
-        
-        # Combine all clips
-        final_video = CompositeVideoClip(clips)
+        profile, use_cprofile = renderprofile.mode()
+        profiler = renderprofile.RenderProfiler(use_cprofile) if profile else None
+
+        final_video, clips = _timeline_video(base_folder, plan, 0.0, plan.end, captions, profiler)
         
         # Add audio
         final_video = final_video.set_audio(audio)
-        
+
         # Write output file
-        final_video.write_videofile(
-            output_path,
-            fps=30,
-            codec='libx264',
-            audio_codec='aac'
-        )
+        if profiler is None:
+            final_video.write_videofile(
+                output_path,
+                fps=30,
+                codec='libx264',
+                audio_codec='aac',
+                logger=progress.render_logger("video")
+            )
+        else:
+            final_video.make_frame = profiler.wrap_composite(final_video.make_frame)
+            with profiler.encoder():
+                final_video.write_videofile(
+                    output_path,
+                    fps=30,
+                    codec='libx264',
+                    audio_codec='aac',
+                    logger=progress.render_logger("video")
+                )
+            profiler.dump(base_folder)
         
         # Clean up
         final_video.close()
@@ -409,6 +774,60 @@ def create_video_with_transitions(
     except Exception as e:
         return False, f"Error creating video: {str(e)}"
 
+def render_timeline_slice(
+    base_folder: str,
+    output_path: str,
+    start: float,
+    end: float,
+    timeline_path: Optional[str] = None,
+    captions: bool = True
+) -> tuple[bool, str]:
+    """
+    Renders the frames of [start, end) of a timeline plan, without audio.
+    
+    Slices depend only on the plan and the images, so separate workers can
+    render consecutive slices and the results can be joined.
+    
+    Args:
+        base_folder (str): Path containing 'images' (or 'canvas') and 'script' subfolders
+        output_path (str): Path where the slice will be saved
+        start (float): Start of the slice (seconds into the video)
+        end (float): End of the slice (seconds into the video)
+        timeline_path (str): Timeline plan to render (default: timeline.json in base_folder)
+        captions (bool): Draw the captions from script/captions.json, when it exists
+    
+    Returns:
+        tuple[bool, str]: (Success status, Message)
+    """
+    from timeline import TIMELINE_FILE, TimelinePlan
+
+    try:
+        plan = TimelinePlan.load(timeline_path or os.path.join(base_folder, TIMELINE_FILE))
+        video, clips = _timeline_video(base_folder, plan, start, end, captions)
+        video.write_videofile(
+            output_path,
+            fps=30,
+            codec='libx264',
+            audio=False,
+            logger=progress.render_logger("video")
+        )
+        video.close()
+        for clip in clips:
+            clip.close()
+        return True, f"Successfully rendered {start:g}s-{end:g}s: {output_path}"
+
+    except Exception as e:
+        return False, f"Error rendering timeline slice: {str(e)}"
+
+def _resize_clip(clip, size: Tuple[int, int]):
+    """Resize every frame of a clip to `size` with Pillow (moviepy's resize uses Image.ANTIALIAS, gone since Pillow 10)."""
+    import numpy as np
+    from PIL import Image
+
+    if tuple(clip.size) == tuple(size):
+        return clip
+    return clip.fl_image(lambda frame: np.asarray(Image.fromarray(frame).resize(tuple(size), Image.LANCZOS)))
+
 def add_intro_and_closure(
     final_video_path: str,
     output_path: str,
@@ -427,6 +846,8 @@ def add_intro_and_closure(
     Returns:
         tuple[bool, str]: (Success status, Message)
     """
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+
     try:
         # Load intro, final, and closure videos
         intro_clip = VideoFileClip(intro_path)
@@ -435,8 +856,8 @@ def add_intro_and_closure(
 
         # Match resolution of all clips to the final clip's resolution
         target_resolution = final_clip.size  # Width, Height
-        intro_clip = intro_clip.resize(newsize=target_resolution)
-        closure_clip = closure_clip.resize(newsize=target_resolution)
+        intro_clip = _resize_clip(intro_clip, target_resolution)
+        closure_clip = _resize_clip(closure_clip, target_resolution)
 
         # Concatenate the videos
         final_video = concatenate_videoclips([intro_clip, final_clip, closure_clip])
@@ -449,7 +870,8 @@ def add_intro_and_closure(
             audio_codec="aac",        # Audio codec
             preset="slow",            # Preset for better compression
             bitrate="2M",             # Limit bitrate to prevent excessive file size
-            threads=4                 # Utilize multiple threads
+            threads=4,                # Utilize multiple threads
+            logger=progress.render_logger("final")
         )
 
         # Clean up
@@ -0,0 +1,266 @@
+"""
+Per-stage performance metrics for pipeline runs.
+
+A RunMetrics collector wraps each stage function; while a stage runs, code
+anywhere below it (API clients, downloads, the renderer) can call incr() to
+add to that stage's counters without being handed the collector. The result
+is written as a JSON run report per project and, optionally, as a Prometheus
+text-format file for node_exporter's textfile collector.
+
+Work a stage hands to a process pool is counted in the pool process by
+run_counted() and added to the stage by merge() when the result comes back.
+"""
+import contextvars
+import json
+import os
+import resource
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_current: contextvars.ContextVar = contextvars.ContextVar("metrics_stage", default=None)
+
+
+@dataclass
+class StageMetrics:
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss: int = 0
+    bytes_downloaded: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    frames: int = 0
+    render_time: float = 0.0
+    extra: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.render_time if self.render_time > 0 else 0.0
+
+
+def _rss() -> int:
+    """Current resident set size in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is in KiB on Linux; it is the peak rather than the current value
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Add to a counter of the stage running in the current context (no-op outside a stage)."""
+    stage = _current.get()
+    if stage is None:
+        return
+    collector, metrics = stage
+    with collector._lock:
+        if hasattr(metrics, name) and name not in ("extra", "fps"):
+            setattr(metrics, name, getattr(metrics, name) + value)
+        else:
+            metrics.extra[name] = metrics.extra.get(name, 0) + value
+
+
+def merge(counters: Dict[str, Any]) -> None:
+    """Add the counters returned by run_counted() to the stage running in the current context."""
+    stage = _current.get()
+    if stage is None:
+        return
+    collector, metrics = stage
+    with collector._lock:
+        for name, value in counters.items():
+            if name == "peak_rss":
+                metrics.peak_rss = max(metrics.peak_rss, value)
+            elif name == "extra":
+                for key, extra in value.items():
+                    metrics.extra[key] = metrics.extra.get(key, 0) + extra
+            elif name != "wall_time":
+                setattr(metrics, name, getattr(metrics, name) + value)
+
+
+class _Counters:
+    """Stands in for the RunMetrics of a stage inside a pool process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+
+def run_counted(fn: Callable[..., Any], **kwargs) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run fn(**kwargs) in a pool process, counting what it incr()s there.
+
+    Returns:
+        Tuple[Any, Dict[str, Any]]: (result, counters for merge()); the counters
+        include the CPU time of this process and the children it waited for, and
+        the peak RSS of this process (over its lifetime, which may include earlier tasks)
+    """
+    metrics = StageMetrics()
+    token = _current.set((_Counters(), metrics))
+    cpu = time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        result = fn(**kwargs)
+    finally:
+        _current.reset(token)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    metrics.cpu_time = (time.process_time() - cpu
+                        + (after.ru_utime - children.ru_utime)
+                        + (after.ru_stime - children.ru_stime))
+    metrics.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return result, asdict(metrics)
+
+
+class RunMetrics:
+    """
+    Collects StageMetrics for one pipeline run.
+
+    Wall and CPU time come from the stage's own thread; CPU time also includes
+    child processes (ffmpeg) that exited while the stage ran, which is exact
+    when stages run alone and approximate when they overlap, and the CPU time
+    of work the stage ran in a process pool (see run_counted()). Peak RSS is
+    the highest process RSS sampled while the stage was running, or of the
+    pool process the stage used, whichever is higher.
+
+    Args:
+        project (str): Project name used in reports
+        sample_interval (float): Seconds between RSS samples (default: 0.25)
+    """
+
+    def __init__(self, project: str, sample_interval: float = 0.25):
+        self.project = project
+        self.sample_interval = sample_interval
+        self.stages: Dict[str, StageMetrics] = {}
+        self._active: Dict[str, StageMetrics] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.started = time.time()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            rss = _rss()
+            with self._lock:
+                for m in self._active.values():
+                    m.peak_rss = max(m.peak_rss, rss)
+
+    def wrap(self, name: str, func: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+        """Wrap a stage function so its resource usage is recorded under `name`."""
+        def tracked(deps):
+            metrics = StageMetrics(peak_rss=_rss())
+            with self._lock:
+                self.stages[name] = metrics
+                self._active[name] = metrics
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample, name="metrics-rss", daemon=True)
+                    self._sampler.start()
+            token = _current.set((self, metrics))
+            wall, cpu = time.monotonic(), time.thread_time()
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            try:
+                return func(deps)
+            finally:
+                after = resource.getrusage(resource.RUSAGE_CHILDREN)
+                with self._lock:
+                    metrics.wall_time = time.monotonic() - wall
+                    metrics.cpu_time += (time.thread_time() - cpu
+                                         + (after.ru_utime - children.ru_utime)
+                                         + (after.ru_stime - children.ru_stime))
+                    metrics.peak_rss = max(metrics.peak_rss, _rss())
+                    del self._active[name]
+                _current.reset(token)
+        return tracked
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def report(self, pipeline_report=None) -> Dict[str, Any]:
+        stages = {}
+        for name, m in self.stages.items():
+            data = asdict(m)
+            data["fps"] = round(m.fps, 2)
+            data["wall_time"] = round(m.wall_time, 3)
+            data["cpu_time"] = round(m.cpu_time, 3)
+            data["render_time"] = round(m.render_time, 3)
+            if pipeline_report is not None and name in pipeline_report.results:
+                r = pipeline_report.results[name]
+                data["status"] = r.status
+                data["wait_time"] = round(r.wait_time, 3)
+            stages[name] = data
+        report = {
+            "project": self.project,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "stages": stages,
+            "totals": {
+                "cpu_time": round(sum(m.cpu_time for m in self.stages.values()), 3),
+                "peak_rss": max((m.peak_rss for m in self.stages.values()), default=0),
+                "bytes_downloaded": sum(m.bytes_downloaded for m in self.stages.values()),
+                "api_calls": sum(m.api_calls for m in self.stages.values()),
+                "retries": sum(m.retries for m in self.stages.values()),
+            },
+        }
+        if pipeline_report is not None:
+            report["ok"] = pipeline_report.ok
+            report["wall_time"] = round(pipeline_report.wall_time, 3)
+            report["critical_path"] = pipeline_report.critical_path()
+        return report
+
+    def write(self, proj_path: str, pipeline_report=None, prometheus: bool = False) -> Dict[str, Any]:
+        """
+        Write run_report.json (and metrics.prom when `prometheus` is set) to the project folder.
+
+        Returns:
+            dict: The report that was written
+        """
+        report = self.report(pipeline_report)
+        _atomic_write(os.path.join(proj_path, "run_report.json"), json.dumps(report, indent=2))
+        if prometheus:
+            _atomic_write(os.path.join(proj_path, "metrics.prom"), to_prometheus(report))
+        return report
+
+
+# Stage fields exported to Prometheus: (field, metric name, help)
+_PROM_FIELDS = (
+    ("wall_time", "conxhub_stage_wall_seconds", "Wall-clock time of the stage"),
+    ("cpu_time", "conxhub_stage_cpu_seconds", "CPU time used by the stage"),
+    ("wait_time", "conxhub_stage_wait_seconds", "Time the stage waited for a resource slot"),
+    ("peak_rss", "conxhub_stage_peak_rss_bytes", "Peak resident memory while the stage ran"),
+    ("bytes_downloaded", "conxhub_stage_downloaded_bytes", "Bytes downloaded by the stage"),
+    ("api_calls", "conxhub_stage_api_calls", "Remote API calls made by the stage"),
+    ("retries", "conxhub_stage_retries", "Retried API calls in the stage"),
+    ("frames", "conxhub_stage_frames", "Video frames rendered by the stage"),
+    ("fps", "conxhub_stage_frames_per_second", "Render throughput of the stage"),
+)
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(report: Dict[str, Any]) -> str:
+    """Render a run report in the Prometheus text exposition format."""
+    project = _label(report["project"])
+    lines = []
+    for key, metric, help_text in _PROM_FIELDS:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for stage, data in report["stages"].items():
+            if key in data:
+                lines.append(f'{metric}{{project="{project}",stage="{_label(stage)}"}} {data[key]}')
+    if "wall_time" in report:
+        lines.append("# HELP conxhub_run_wall_seconds Wall-clock time of the whole run")
+        lines.append("# TYPE conxhub_run_wall_seconds gauge")
+        lines.append(f'conxhub_run_wall_seconds{{project="{project}"}} {report["wall_time"]}')
+        lines.append("# HELP conxhub_run_success Whether every stage of the run completed")
+        lines.append("# TYPE conxhub_run_success gauge")
+        lines.append(f'conxhub_run_success{{project="{project}"}} {1 if report["ok"] else 0}')
+    return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path: str, text: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,220 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import progress
+from logger import get_logger
+
+logger = get_logger()
+
+
+class StageError(Exception):
+    """Raised by a stage when it cannot produce its output."""
+
+
+@dataclass
+class Stage:
+    """
+    A single unit of pipeline work.
+
+    Args:
+        name (str): Unique stage name
+        func (Callable): Called with a dict mapping each dependency name to its result
+        deps (tuple): Names of the stages that must finish before this one starts
+        resource (str): Name of the shared resource pool the stage needs a slot in (e.g. "network", "cpu")
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+    resource: Optional[str] = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str = "pending"  # pending | done | failed | skipped
+    value: Any = None
+    error: Optional[str] = None
+    queued: float = 0.0
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.finished - self.started)
+
+    @property
+    def wait_time(self) -> float:
+        """Time spent waiting for a resource slot before starting."""
+        return max(0.0, self.started - self.queued) if self.started else 0.0
+
+
+class PipelineReport:
+    """Outcome of a pipeline run: per-stage results, timings and the critical path."""
+
+    def __init__(self, stages: Sequence[Stage], results: Dict[str, StageResult], started: float, finished: float):
+        self.stages = {s.name: s for s in stages}
+        self.results = results
+        self.started = started
+        self.finished = finished
+
+    @property
+    def ok(self) -> bool:
+        return all(r.status == "done" for r in self.results.values())
+
+    @property
+    def wall_time(self) -> float:
+        return self.finished - self.started
+
+    def failed(self) -> List[StageResult]:
+        return [r for r in self.results.values() if r.status == "failed"]
+
+    def critical_path(self) -> List[str]:
+        """
+        Chain of stages that determined the end time of the run.
+
+        Walks back from the last stage to finish, following at each step the
+        dependency that finished latest (i.e. the one the stage was waiting on).
+        """
+        ran = [r for r in self.results.values() if r.status in ("done", "failed")]
+        if not ran:
+            return []
+        current = max(ran, key=lambda r: r.finished)
+        path = [current.name]
+        while True:
+            deps = [self.results[d] for d in self.stages[current.name].deps
+                    if self.results[d].status in ("done", "failed")]
+            if not deps:
+                break
+            current = max(deps, key=lambda r: r.finished)
+            path.append(current.name)
+        return path[::-1]
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<12}{'status':<9}{'start':>8}{'duration':>10}"]
+        for name in self.stages:
+            r = self.results[name]
+            if r.status in ("done", "failed"):
+                lines.append(f"{name:<12}{r.status:<9}{r.started - self.started:>7.1f}s{r.duration:>9.1f}s")
+            else:
+                lines.append(f"{name:<12}{r.status:<9}{'-':>8}{'-':>10}")
+        path = self.critical_path()
+        if path:
+            path_time = sum(self.results[n].duration for n in path)
+            lines.append(f"Critical path: {' -> '.join(path)} ({path_time:.1f}s)")
+        lines.append(f"Total wall time: {self.wall_time:.1f}s")
+        # Last, so that the errors survive when the summary is cut to its tail
+        for r in self.failed():
+            lines.append(f"Stage '{r.name}' failed: {r.error}")
+        return "\n".join(lines)
+
+
+def _validate(stages: Sequence[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(names) != len(set(names)):
+        raise ValueError("Duplicate stage names in pipeline")
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f"Stage '{s.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+    # Kahn's algorithm; anything left over is part of a cycle
+    pending = {s.name: set(s.deps) for s in stages}
+    while True:
+        ready = [n for n, deps in pending.items() if not deps]
+        if not ready:
+            break
+        for n in ready:
+            del pending[n]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    if pending:
+        raise ValueError(f"Dependency cycle between stages: {', '.join(sorted(pending))}")
+
+
+def run_stages(
+    stages: Sequence[Stage],
+    max_workers: Optional[int] = None,
+    resources: Optional[Dict[str, threading.Semaphore]] = None
+) -> PipelineReport:
+    """
+    Runs stages concurrently, each one as soon as all of its dependencies are done.
+
+    A failing stage does not abort unrelated branches; every stage downstream of
+    it is marked as skipped instead of being started.
+
+    Args:
+        stages (Sequence[Stage]): Stages to run
+        max_workers (int): Maximum number of stages running at once (default: number of stages)
+        resources (dict): Semaphores bounding how many stages tagged with each resource may run
+            at once; share one dict between several run_stages calls to bound them together
+
+    Returns:
+        PipelineReport: Per-stage results and timings
+    """
+    _validate(stages)
+    results = {s.name: StageResult(s.name) for s in stages}
+
+    resources = resources or {}
+    for s in stages:
+        if s.resource and s.resource not in resources:
+            raise ValueError(f"Stage '{s.name}' needs unknown resource '{s.resource}'")
+
+    def run_one(stage: Stage):
+        slot = resources.get(stage.resource) if stage.resource else None
+        results[stage.name].queued = time.monotonic()
+        if slot:
+            slot.acquire()
+        results[stage.name].started = time.monotonic()
+        progress.emit(stage.name, state="running")
+        try:
+            return stage.func({d: results[d].value for d in stage.deps})
+        finally:
+            results[stage.name].finished = time.monotonic()
+            if slot:
+                slot.release()
+
+    def skip_dependents(failed: str) -> None:
+        for s in stages:
+            r = results[s.name]
+            if r.status == "pending" and failed in s.deps:
+                r.status = "skipped"
+                r.error = f"Upstream stage '{failed}' did not complete"
+                logger.warning(f"Skipping stage '{s.name}': {r.error}")
+                progress.emit(s.name, state="skipped")
+                skip_dependents(s.name)
+
+    started = time.monotonic()
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1, thread_name_prefix="stage") as pool:
+        while True:
+            for s in stages:
+                if (results[s.name].status == "pending" and s.name not in running.values()
+                        and all(results[d].status == "done" for d in s.deps)):
+                    logger.info(f"Starting stage '{s.name}'")
+                    # Stages run in a copy of the caller's context (log routing, metrics)
+                    running[pool.submit(contextvars.copy_context().run, run_one, s)] = s.name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                r = results[name]
+                try:
+                    r.value = future.result()
+                    r.status = "done"
+                    logger.info(f"Stage '{name}' finished in {r.duration:.1f}s")
+                    progress.emit(name, state="done", percent=100)
+                except Exception as e:
+                    r.status = "failed"
+                    r.error = str(e)
+                    logger.error(f"Stage '{name}' failed after {r.duration:.1f}s: {e}")
+                    progress.emit(name, state="failed", error=str(e)[:200])
+                    skip_dependents(name)
+
+    return PipelineReport(stages, results, started, time.monotonic())
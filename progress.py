@@ -0,0 +1,128 @@
+"""
+Structured progress events emitted by the pipeline.
+
+Stages report what they are doing through emit(); where the events go is
+decided by whoever runs the pipeline: a worker process forwards them to the
+bot over its pipe, and `python main.py` writes them as JSON lines to the file
+descriptor named by CONXHUB_PROGRESS_FD. With no sink configured emit() is a
+no-op and moviepy keeps printing its usual progress bars.
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+_sink: Optional[Callable[[Dict], None]] = None
+_lock = threading.Lock()
+_last: Dict[str, tuple] = {}
+
+# Intermediate updates of one stage closer together than this are dropped
+MIN_INTERVAL = 0.5
+
+
+def set_sink(sink: Optional[Callable[[Dict], None]]) -> None:
+    """Send every future event to `sink` (None disables progress reporting)."""
+    global _sink
+    with _lock:
+        _sink = sink
+        _last.clear()
+
+
+def enabled() -> bool:
+    return _sink is not None
+
+
+def configure_from_env() -> None:
+    """Write events as JSON lines to the file descriptor in CONXHUB_PROGRESS_FD, if set."""
+    fd = os.getenv("CONXHUB_PROGRESS_FD")
+    if not fd:
+        return
+    stream = os.fdopen(int(fd), "w", buffering=1)
+
+    def write(event):
+        stream.write(json.dumps(event) + "\n")
+    set_sink(write)
+
+
+def emit(stage: str, state: Optional[str] = None, percent: Optional[float] = None, **fields) -> None:
+    """
+    Report progress of a stage.
+
+    Args:
+        stage (str): Stage name (script, prompts, images, audio, video, final)
+        state (str): running | done | failed | skipped; state changes are always delivered
+        percent (float): Completion of the stage in percent
+        **fields: Extra details such as frames, total_frames, fps or eta (seconds)
+    """
+    if _sink is None:
+        return
+    now = time.monotonic()
+    with _lock:
+        if state is None:
+            last = _last.get(stage)
+            if last and now - last[0] < MIN_INTERVAL and percent != 100:
+                return
+        _last[stage] = (now, percent)
+        event = {"stage": stage, "time": time.time()}
+        if state is not None:
+            event["state"] = state
+        if percent is not None:
+            event["percent"] = round(percent, 1)
+        event.update(fields)
+        try:
+            _sink(event)
+        except Exception:
+            # Progress must never break the pipeline
+            pass
+
+
+def render_logger(stage: str):
+    """
+    Logger for moviepy's write_videofile.
+
+    Counts rendered frames for the stage's metrics and, when a sink is
+    configured, turns them into progress events instead of console bars;
+    otherwise moviepy's usual progress bars are shown.
+    """
+    import metrics
+    from proglog import TqdmProgressBarLogger
+
+    show_bars = _sink is None
+
+    class RenderProgressLogger(TqdmProgressBarLogger):
+        started = None
+        last = None
+
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if show_bars:
+                super().bars_callback(bar, attr, value, old_value)
+            # 't' counts video frames; audio chunks are written first and are comparatively quick
+            if bar != "t" or attr != "index":
+                return
+            now = time.monotonic()
+            if self.started is None:
+                self.started = self.last = now
+            metrics.incr("frames")
+            metrics.incr("render_time", now - self.last)
+            self.last = now
+            if show_bars:
+                return
+            total = self.bars[bar].get("total") or 0
+            frames = value + 1
+            elapsed = now - self.started
+            fps = frames / elapsed if elapsed > 0 else 0.0
+            emit(
+                stage,
+                percent=100.0 * frames / total if total else None,
+                frames=frames,
+                total_frames=total,
+                fps=round(fps, 1),
+                eta=round((total - frames) / fps) if fps and total else None,
+            )
+
+        def callback(self, **changes):
+            if show_bars:
+                super().callback(**changes)
+
+    return RenderProgressLogger(print_messages=show_bars)
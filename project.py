@@ -0,0 +1,50 @@
+import os
+from dataclasses import dataclass
+
+import config
+
+
+@dataclass
+class Project:
+    """
+    A single video to produce.
+
+    Defaults come from config.py, so Project.from_config() reproduces the
+    single-project setup while batch runs can describe many projects at once.
+    """
+    name: str
+    prompt: str
+    images_per_video: int = config.images_per_video
+    channel: str = config.channel_name
+    base_dir: str = config.default_dir
+
+    @classmethod
+    def from_config(cls) -> "Project":
+        return cls(name=config.proj_name, prompt=config.proj_prompt)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Project":
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        if "name" not in known or "prompt" not in known:
+            raise ValueError(f"Project entry needs a 'name' and a 'prompt': {data}")
+        return cls(**known)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.base_dir, self.name)
+
+    @property
+    def img_path(self) -> str:
+        return os.path.join(self.path, "images")
+
+    @property
+    def script_path(self) -> str:
+        return os.path.join(self.path, "script")
+
+    @property
+    def canvas_path(self) -> str:
+        return os.path.join(self.path, "canvas")
+
+    def create_dirs(self) -> None:
+        for path in (self.base_dir, self.path, self.img_path, self.script_path):
+            os.makedirs(path, exist_ok=True)
@@ -0,0 +1,127 @@
+"""
+Remote services used by the pipeline, behind one interface.
+
+LiveProviders talks to Gemini (script), Pollinations (prompts and images)
+and gTTS (speech); fakes.FakeProviders returns deterministic local results
+with configurable latency, error rate and rate limits, so the pipeline's
+concurrency, retry and caching behavior can be exercised offline.
+
+The provider set is chosen by `providers` in config.py ("live" or "fake");
+CONXHUB_PROVIDERS overrides it, and CONXHUB_FAKE_LATENCY,
+CONXHUB_FAKE_ERROR_RATE, CONXHUB_FAKE_RATE_LIMIT and CONXHUB_FAKE_SEED
+override the matching `fake_providers` settings.
+"""
+import os
+import time
+from typing import Dict, Optional
+
+# Waits between requests to the live services, in seconds
+_PAUSES = {
+    "image": 1.0,        # between image requests
+    "image_hold": 30.0,  # after a failed image request
+    "tts": 0.5,          # after saving synthesized speech
+    "tts_retry": 1.0,    # before retrying speech synthesis
+}
+
+
+class LiveProviders:
+    """Gemini, Pollinations and gTTS."""
+
+    def pause(self, kind: str) -> None:
+        """Wait between requests to keep within the services' fair-use limits."""
+        time.sleep(_PAUSES.get(kind, 0.0))
+
+    def script_model(self, api_key=None):
+        from genmethods import _script_model
+        return _script_model(api_key)
+
+    def prompts(self, system: str, topic: str, n: int) -> str:
+        import pollinations
+
+        text_model: pollinations.TextModel = pollinations.text(
+            frequency_penalty=1,
+            presence_penalty=0.5,
+            temperature=1,
+            top_p=1,
+            model=pollinations.text_default,
+            stream=True,
+            contextual=True,  # True: Holds conversation context up to 10. False: Has no conversation context
+            system=system
+        )
+        return text_model.generate(prompt=topic, display=True).text
+
+    def image(self, prompt: str, params: Dict) -> bytes:
+        from urllib.parse import quote
+        from genmethods import _http_session
+
+        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
+        full_url = f"https://image.pollinations.ai/prompt/{quote(prompt)}?{query_string}"
+        response = _http_session().get(full_url, timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    def speech(self, text: str, temp_dir: str, language: str = 'en', tld: str = 'com', slow: bool = False):
+        from uuid import uuid4
+        from gtts import gTTS
+        from pydub import AudioSegment
+
+        temp_tts_path = os.path.join(temp_dir, f"temp_tts_{uuid4().hex[:8]}.mp3")
+        gTTS(text=text, lang=language, tld=tld, slow=slow).save(temp_tts_path)
+        self.pause("tts")
+        return AudioSegment.from_mp3(temp_tts_path)
+
+
+_providers = None
+
+
+def _settings() -> Dict:
+    try:
+        import config
+    except ImportError:
+        config = None
+    kind = os.getenv("CONXHUB_PROVIDERS") or getattr(config, "providers", "live")
+    fake = dict(getattr(config, "fake_providers", {}))
+    for key, env, cast in (
+        ("latency", "CONXHUB_FAKE_LATENCY", float),
+        ("error_rate", "CONXHUB_FAKE_ERROR_RATE", float),
+        ("rate_limit", "CONXHUB_FAKE_RATE_LIMIT", float),
+        ("seed", "CONXHUB_FAKE_SEED", int),
+    ):
+        if os.getenv(env):
+            fake[key] = cast(os.environ[env])
+    return {"kind": kind.strip().lower(), "fake": fake}
+
+
+def configure(kind: Optional[str] = None, **fake_settings):
+    """
+    Select the provider set used by the pipeline in this process.
+
+    Args:
+        kind (str): "live" or "fake" (default: from config/environment)
+        **fake_settings: FaultInjector arguments (latency, error_rate, rate_limit, seed)
+            and FakeProviders arguments (image_size, words_per_minute) for fakes
+
+    Returns:
+        The selected provider set
+    """
+    global _providers
+    settings = _settings()
+    kind = (kind or settings["kind"]).lower()
+    if kind == "live":
+        selected = LiveProviders()
+    elif kind == "fake":
+        from fakes import FakeProviders, FaultInjector
+        options = {**settings["fake"], **fake_settings}
+        provider_args = {k: options.pop(k) for k in ("image_size", "words_per_minute") if k in options}
+        selected = FakeProviders(FaultInjector(**options), **provider_args)
+    else:
+        raise ValueError(f"Unknown provider set: {kind!r} (expected 'live' or 'fake')")
+    _providers = selected
+    return selected
+
+
+def get_providers():
+    """The provider set for this process, selected from config/environment on first use."""
+    if _providers is None:
+        return configure()
+    return _providers
@@ -0,0 +1,171 @@
+"""
+Optional per-frame profiling of the video renderer.
+
+When enabled, create_video_with_transitions times each step of every frame
+(resize, color conversion, compositing, captions) and how long moviepy waits on
+the ffmpeg pipe when writing a frame, which is where encoder backpressure
+shows up. A summary with percentiles and a latency histogram per step is
+written to render_profile.json in the project folder, plus render.pstats
+when cProfile output is requested.
+
+Profiling is off by default. It is switched on by `render_profile` in
+config.py or the CONXHUB_RENDER_PROFILE environment variable
+(0 = off, 1 = step timings, cprofile = step timings and cProfile), which
+takes precedence. When off the renderer does a single check per frame.
+"""
+import json
+import os
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Steps in the order they happen within a frame
+STEPS = ("resize", "convert", "composite", "captions", "encode_wait")
+
+
+def mode() -> Tuple[bool, bool]:
+    """
+    Whether render profiling is enabled.
+
+    Returns:
+        Tuple[bool, bool]: (Step timings enabled, cProfile enabled)
+    """
+    value = os.getenv("CONXHUB_RENDER_PROFILE")
+    if value is None:
+        try:
+            from config import render_profile
+        except ImportError:
+            render_profile = False
+        value = render_profile
+    value = str(value).strip().lower()
+    if value in ("", "0", "false", "no", "off", "none"):
+        return False, False
+    return True, value == "cprofile"
+
+
+def _percentile(ordered, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RenderProfiler:
+    """
+    Collects per-frame step latencies of one render.
+
+    Args:
+        use_cprofile (bool): Also run cProfile over the render (default: False)
+    """
+
+    def __init__(self, use_cprofile: bool = False):
+        self.samples: Dict[str, array] = {step: array("d") for step in STEPS}
+        self.frames = 0
+        self.wall_time = 0.0
+        self._child_time = 0.0
+        self._profile = None
+        if use_cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+
+    def add(self, step: str, seconds: float) -> None:
+        """Record one sample of `step`; steps run by clip frames also count toward the composite."""
+        self.samples[step].append(seconds)
+        if step != "encode_wait":
+            self._child_time += seconds
+
+    def wrap_composite(self, make_frame):
+        """
+        Wrap the composite clip's frame function. Its own time, less the time
+        spent inside the per-clip steps, is recorded as the composite step.
+        """
+        def timed(t):
+            self._child_time = 0.0
+            start = time.perf_counter()
+            frame = make_frame(t)
+            elapsed = time.perf_counter() - start
+            self.samples["composite"].append(max(0.0, elapsed - self._child_time))
+            self.frames += 1
+            return frame
+        return timed
+
+    @contextmanager
+    def encoder(self):
+        """Time every frame written to ffmpeg while the block runs."""
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        original = FFMPEG_VideoWriter.write_frame
+        profiler = self
+
+        def write_frame(writer, img_array):
+            start = time.perf_counter()
+            try:
+                return original(writer, img_array)
+            finally:
+                profiler.samples["encode_wait"].append(time.perf_counter() - start)
+
+        # The patch is process-wide; renders run one at a time per process
+        FFMPEG_VideoWriter.write_frame = write_frame
+        start = time.perf_counter()
+        if self._profile is not None:
+            self._profile.enable()
+        try:
+            yield self
+        finally:
+            if self._profile is not None:
+                self._profile.disable()
+            self.wall_time += time.perf_counter() - start
+            FFMPEG_VideoWriter.write_frame = original
+
+    def summary(self) -> Dict:
+        steps = {}
+        for step, values in self.samples.items():
+            ordered = sorted(values)
+            counts = [0] * (len(BUCKETS_MS) + 1)
+            for value in ordered:
+                ms = value * 1000
+                for i, bound in enumerate(BUCKETS_MS):
+                    if ms <= bound:
+                        counts[i] += 1
+                        break
+                else:
+                    counts[-1] += 1
+            total = sum(ordered)
+            steps[step] = {
+                "count": len(ordered),
+                "total": round(total, 4),
+                "mean_ms": round(1000 * total / len(ordered), 3) if ordered else 0.0,
+                "p50_ms": round(1000 * _percentile(ordered, 0.50), 3),
+                "p95_ms": round(1000 * _percentile(ordered, 0.95), 3),
+                "p99_ms": round(1000 * _percentile(ordered, 0.99), 3),
+                "max_ms": round(1000 * ordered[-1], 3) if ordered else 0.0,
+                "histogram": {f"<={b}ms": c for b, c in zip(BUCKETS_MS, counts)} | {f">{BUCKETS_MS[-1]}ms": counts[-1]},
+            }
+        return {
+            "frames": self.frames,
+            "wall_time": round(self.wall_time, 3),
+            "fps": round(self.frames / self.wall_time, 2) if self.wall_time > 0 else 0.0,
+            "steps": steps,
+        }
+
+    def dump(self, folder: str) -> Optional[str]:
+        """
+        Write render_profile.json (and render.pstats with cProfile) to `folder`.
+
+        Returns:
+            str: Path of the summary file
+        """
+        import metrics
+
+        summary = self.summary()
+        for step, data in summary["steps"].items():
+            metrics.incr(f"{step}_time", data["total"])
+        path = os.path.join(folder, "render_profile.json")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        if self._profile is not None:
+            self._profile.dump_stats(os.path.join(folder, "render.pstats"))
+        return path
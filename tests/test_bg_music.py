@@ -0,0 +1,63 @@
+"""Background library sync against the local FakeFreesound server."""
+import json
+import os
+
+from fakes import FakeFreesound
+from utils import bg_music
+
+
+def _catalog(folder):
+    with open(os.path.join(folder, bg_music.CATALOG_FILE)) as f:
+        return {str(t["id"]): t for t in json.load(f)["tracks"]}
+
+
+def test_interrupted_sync_resumes_with_range_requests(tmp_path):
+    folder = str(tmp_path)
+    # Cut each first download after two full chunks, so the .part files hold something
+    with FakeFreesound(tracks=12, preview_bytes=300 * 1024, cut_after=150 * 1024) as fake:
+        ok, message = bg_music.get_soft_background_music("key", folder, nsamples=3, api_url=fake.api_url)
+        assert not ok
+        pending = [t for t in _catalog(folder).values() if t["status"] == "pending"]
+        assert len(pending) == 3
+        for entry in pending:
+            assert os.path.getsize(os.path.join(folder, entry["path"] + ".part")) == 2 * bg_music.CHUNK_SIZE
+
+        ok, message = bg_music.get_soft_background_music("key", folder, nsamples=3, api_url=fake.api_url)
+        assert ok, message
+        assert fake.requests["range"] == 3
+
+    catalog = _catalog(folder)
+    assert sorted(catalog) == sorted(str(t["id"]) for t in pending)
+    for track_id, entry in catalog.items():
+        assert entry["status"] == "complete"
+        assert entry["path"] == f"fs_{track_id}.mp3"
+        with open(os.path.join(folder, entry["path"]), "rb") as f:
+            assert f.read() == fake.preview(int(track_id))
+    assert not [name for name in os.listdir(folder) if name.endswith(".part")]
+
+
+def test_sync_leaves_hand_indexed_tracks_alone(tmp_path):
+    folder = str(tmp_path)
+    with FakeFreesound(tracks=8, preview_bytes=1024) as fake:
+        eligible = [t["id"] for t in fake.tracks if t["duration"] >= bg_music.MIN_DURATION]
+        assert {1000, 1002, 1003} <= set(eligible)
+        # Hand-copied files named like the ids of Freesound tracks
+        for track_id in (1000, 1003):
+            with open(os.path.join(folder, f"bg_{track_id}.mp3"), "wb") as f:
+                f.write(b"hand picked")
+        with open(os.path.join(folder, "fs_1002.mp3"), "wb") as f:
+            f.write(b"hand picked too")
+        bg_music.index_library(folder)
+
+        # Room for every eligible track; only fs_1002.mp3 is already taken
+        nsamples = 3 + len(eligible) - 1
+        ok, message = bg_music.get_soft_background_music("key", folder, nsamples=nsamples, api_url=fake.api_url)
+        assert ok, message
+
+    catalog = _catalog(folder)
+    assert sorted(catalog) == sorted([str(i) for i in eligible if i != 1002] + ["bg_1000", "bg_1003", "fs_1002"])
+    for name in ("bg_1000.mp3", "bg_1003.mp3", "fs_1002.mp3"):
+        with open(os.path.join(folder, name), "rb") as f:
+            assert f.read().startswith(b"hand picked")
+    assert catalog["bg_1000"]["path"] == "bg_1000.mp3"
+    assert catalog["1000"]["path"] == "fs_1000.mp3"
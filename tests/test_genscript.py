@@ -0,0 +1,61 @@
+"""Script generation against the offline FakeGenerativeModel."""
+import pytest
+
+from fakes import FakeGenerativeModel
+from genmethods import ScriptStreamParser, genscript
+
+RESPONSE = ('Title: The "Himalayan" 750 Is Coming\n'
+            'Script: Meet the new Himalayan. It climbs anything! Does it fly? '
+            'Not yet (but almost.) Riders said "wow." The end')
+
+
+def _sentences(model, prompt="prompt"):
+    parser = ScriptStreamParser()
+    sentences = []
+    for chunk in model.generate_content(prompt, stream=True):
+        sentences += parser.feed(chunk.text)
+    return parser, sentences + parser.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 40, 1000])
+def test_parser_splits_sentences_whatever_the_chunking(chunk_size):
+    parser, sentences = _sentences(FakeGenerativeModel(text=RESPONSE, chunk_size=chunk_size))
+    assert sentences == ["Meet the new Himalayan.", "It climbs anything!", "Does it fly?",
+                         "Not yet (but almost.)", 'Riders said "wow."', "The end"]
+    assert parser.title == 'Title: The "Himalayan" 750 Is Coming\n'
+    assert parser.script == RESPONSE.split("Script:", 1)[1]
+
+
+def test_parser_returns_sentences_as_soon_as_they_end():
+    parser = ScriptStreamParser()
+    assert parser.feed("Title: T\nScr") == []
+    assert parser.feed("ipt: One. Tw") == ["One."]
+    assert parser.feed("o") == []
+    assert parser.feed("! ") == ["Two!"]
+    assert parser.close() == []
+
+
+def test_parser_rejects_a_response_without_a_script():
+    parser = ScriptStreamParser()
+    parser.feed("Title: only a title. ")
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_streamed_genscript_matches_the_plain_response(tmp_path):
+    streamed_dir, plain_dir = tmp_path / "streamed", tmp_path / "plain"
+    streamed_dir.mkdir()
+    plain_dir.mkdir()
+    model = FakeGenerativeModel(chunk_size=13, sentences=12)
+
+    heard = []
+    title, script = genscript(None, "ConxHub", "a motorcycle", "Himalayan 750", str(streamed_dir),
+                              stream=True, on_sentence=heard.append, model=model)
+    plain = genscript(None, "ConxHub", "a motorcycle", "Himalayan 750", str(plain_dir), model=model)
+
+    assert (title, script) == plain
+    assert title and not title.startswith("Title:")
+    assert len(heard) == 12
+    assert " ".join(heard) == script.strip()
+    assert (streamed_dir / "script.txt").read_text() == script
+    assert (streamed_dir / "title.txt").read_text() == title
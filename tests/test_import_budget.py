@@ -0,0 +1,46 @@
+"""`import main` and `main.py status` stay fast and never load the heavy media/AI libraries."""
+import json
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+
+IMPORT_BUDGET = 0.5
+STATUS_BUDGET = 1.0
+RUNS = 3
+
+HEAVY_MODULES = ("moviepy", "google.generativeai", "pytrends", "pydub", "PIL",
+                 "gtts", "numpy", "pollinations", "requests")
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+if sys.argv[1:] == ["status"]:
+    main.cli(["status"])
+print(json.dumps({{"elapsed": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _probe(*args):
+    out = subprocess.run([sys.executable, "-c", PROBE, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _status_time():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "status"], cwd=ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def test_import_main_is_fast_and_light():
+    probes = [_probe() for _ in range(RUNS)]
+    assert min(p["elapsed"] for p in probes) < IMPORT_BUDGET
+    assert probes[0]["heavy"] == []
+
+
+def test_status_is_fast_and_light():
+    assert _probe("status")["heavy"] == []
+    assert min(_status_time() for _ in range(RUNS)) < STATUS_BUDGET
@@ -0,0 +1,103 @@
+"""A small stage DAG on the fake providers: skip propagation and manifest resume."""
+import json
+import os
+
+import pytest
+
+import providers
+from genmethods import genimages, genprompts
+from manifest import RunManifest, resumable
+from pipeline import Stage, StageError, run_stages
+
+
+@pytest.fixture
+def fake():
+    provider = providers.configure("fake", image_size=(64, 36))
+    yield provider
+    providers._providers = None
+
+
+def _specs(folder):
+    prompts_file = os.path.join(folder, "prompts.json")
+    images_folder = os.path.join(folder, "images")
+
+    def prompts_stage(deps):
+        prompts = genprompts("a motorcycle", n_prompts=3)
+        with open(prompts_file, "w") as f:
+            json.dump(prompts, f)
+        return prompts
+
+    def load_prompts(deps):
+        with open(prompts_file) as f:
+            return json.load(f)
+
+    def images_stage(deps):
+        genimages(deps["prompts"], images_folder)
+        return sorted(os.listdir(images_folder))
+
+    return {
+        "prompts": dict(run=prompts_stage, deps=(),
+                        inputs=lambda deps: {"params": {"topic": "a motorcycle", "n": 3}},
+                        outputs=lambda: [prompts_file],
+                        load=load_prompts),
+        "images": dict(run=images_stage, deps=("prompts",),
+                       inputs=lambda deps: {"params": {"prompts": deps["prompts"]}, "files": [prompts_file]},
+                       outputs=lambda: [os.path.join(images_folder, n) for n in sorted(os.listdir(images_folder))],
+                       load=lambda deps: sorted(os.listdir(images_folder))),
+    }
+
+
+def _stages(folder, manifest, force=()):
+    return [Stage(name, resumable(manifest, name, spec["run"], spec["inputs"], spec["outputs"], spec["load"],
+                                  force=name in force), spec["deps"])
+            for name, spec in _specs(folder).items()]
+
+
+def test_failure_skips_everything_downstream_only(fake, tmp_path):
+    def broken(deps):
+        raise StageError("no usable images")
+
+    stages = _stages(str(tmp_path), RunManifest(str(tmp_path))) + [
+        Stage("ingest", broken, ("images",)),
+        Stage("timeline", lambda deps: "plan", ("ingest",)),
+        Stage("render", lambda deps: "video", ("timeline",)),
+        Stage("audio", lambda deps: "narration", ("prompts",)),
+    ]
+    report = run_stages(stages)
+
+    status = {name: r.status for name, r in report.results.items()}
+    assert status == {"prompts": "done", "images": "done", "ingest": "failed",
+                      "timeline": "skipped", "render": "skipped", "audio": "done"}
+    assert report.results["timeline"].error == "Upstream stage 'ingest' did not complete"
+    assert report.results["render"].error == "Upstream stage 'timeline' did not complete"
+    assert not report.ok
+    assert "Stage 'ingest' failed: no usable images" in report.summary()
+    assert len(report.results["images"].value) == 3
+
+
+def test_manifest_resumes_without_calling_the_providers_again(fake, tmp_path):
+    first = run_stages(_stages(str(tmp_path), RunManifest(str(tmp_path))))
+    assert first.ok
+    calls = dict(fake.faults.calls)
+    assert calls == {"prompts": 1, "images": 3}
+
+    # A fresh manifest object reads what the first run recorded
+    second = run_stages(_stages(str(tmp_path), RunManifest(str(tmp_path))))
+    assert second.ok
+    assert fake.faults.calls == calls
+    assert {n: r.value for n, r in second.results.items()} == {n: r.value for n, r in first.results.items()}
+
+    # Changing an output reruns the stage that made it, and only that one
+    image = os.path.join(str(tmp_path), "images", first.results["images"].value[0])
+    os.remove(image)
+    third = run_stages(_stages(str(tmp_path), RunManifest(str(tmp_path))))
+    assert third.ok
+    assert fake.faults.calls == {"prompts": 1, "images": 6}
+
+
+def test_forced_stage_reruns_alone_when_its_output_is_unchanged(fake, tmp_path):
+    run_stages(_stages(str(tmp_path), RunManifest(str(tmp_path))))
+    report = run_stages(_stages(str(tmp_path), RunManifest(str(tmp_path)), force=("prompts",)))
+    assert report.ok
+    # The fakes are deterministic, so the rerun prompts hash the same and images stay fresh
+    assert fake.faults.calls == {"prompts": 2, "images": 3}
@@ -0,0 +1,221 @@
+"""
+Timeline plans: which image is shown when, and how it moves.
+
+A TimelinePlan is the edit decision list of a video. It has one entry per
+slot, with the image, start time, duration, Ken Burns motion and the
+transition it comes in with: a cut, or a crossfade over the time the
+previous image keeps moving (its overlap). plan_timeline() makes every
+random choice up front from a seeded random.Random (same seed and inputs, same plan), so
+planning takes microseconds per slot and does not touch the images.
+
+Plans are saved as timeline.json in the project folder. They diff cleanly,
+can be edited by hand, and can be rendered whole or in slices by
+media_methods: every entry holds everything needed to draw its frames, so
+the frames of any time range do not depend on what was rendered before.
+"""
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TIMELINE_FILE = "timeline.json"
+TRANSITIONS = ("cut", "crossfade")
+
+
+@dataclass
+class TimelineEntry:
+    """
+    One slot of the timeline.
+
+    Pan positions are fractions (x, y) of the room the zoom leaves around the
+    frame: (0, 0) is the top-left corner, (1, 1) the bottom-right.
+    """
+    slot: int
+    image: str
+    start: float
+    duration: float
+    zoom: Tuple[float, float] = (1.0, 1.0)
+    pan_from: Tuple[float, float] = (0.0, 0.0)
+    pan_to: Tuple[float, float] = (0.0, 0.0)
+    # How this slot comes in over the previous one, and how long this image keeps moving under the next one
+    transition: str = "cut"
+    overlap: float = 0.0
+
+    @property
+    def length(self) -> float:
+        """Length of the motion, including the overlap with the next slot."""
+        return self.duration + self.overlap
+
+    @property
+    def end(self) -> float:
+        return self.start + self.length
+
+    def window(self, t: float, size: Tuple[int, int]) -> Tuple[float, float, float]:
+        """
+        Zoom and top-left offset (pixels of the zoomed frame) at `t` seconds into the slot.
+
+        Args:
+            t (float): Time since the start of the slot
+            size (Tuple[int, int]): Frame size (w, h)
+
+        Returns:
+            Tuple[float, float, float]: (zoom, x, y)
+        """
+        w, h = size
+        progress = t / self.length
+        start_zoom, end_zoom = self.zoom
+        start_x = self.pan_from[0] * w * (start_zoom - 1)
+        start_y = self.pan_from[1] * h * (start_zoom - 1)
+        end_x = self.pan_to[0] * w * (end_zoom - 1)
+        end_y = self.pan_to[1] * h * (end_zoom - 1)
+        return (start_zoom + (end_zoom - start_zoom) * progress,
+                start_x + (end_x - start_x) * progress,
+                start_y + (end_y - start_y) * progress)
+
+
+@dataclass
+class TimelinePlan:
+    """
+    The entries of a video in order, with the seed and settings they were planned from.
+
+    Entries are kept in order of start time, and each entry's slot is its position.
+    """
+    seed: int
+    duration: float
+    settings: Dict = field(default_factory=dict)
+    entries: List[TimelineEntry] = field(default_factory=list)
+
+    @property
+    def images(self) -> List[str]:
+        return sorted({e.image for e in self.entries})
+
+    def __post_init__(self):
+        self.validate()
+
+    def validate(self) -> None:
+        """Sort the entries by start time and check their slots and transitions."""
+        self.entries.sort(key=lambda e: e.start)
+        for i, entry in enumerate(self.entries):
+            if entry.slot != i:
+                raise ValueError(f"Timeline entry at {entry.start}s has slot {entry.slot}; "
+                                 f"slots must number the entries 0, 1, ... in order of start time")
+            if entry.transition not in TRANSITIONS:
+                raise ValueError(f"Unknown transition '{entry.transition}' in slot {i} "
+                                 f"(one of: {', '.join(TRANSITIONS)})")
+
+    def following(self, entry: TimelineEntry) -> Optional[TimelineEntry]:
+        """The entry of the next slot, if any."""
+        return self.entries[entry.slot + 1] if entry.slot + 1 < len(self.entries) else None
+
+    def fade_in(self, entry: TimelineEntry) -> float:
+        """Seconds `entry` takes to fade in over the previous slot (0 for a cut)."""
+        if entry.transition != "crossfade" or entry.slot == 0:
+            return 0.0
+        previous = self.entries[entry.slot - 1]
+        return max(0.0, min(previous.end - entry.start, entry.length))
+
+    def visible_until(self, entry: TimelineEntry) -> float:
+        """Time at which `entry` stops showing: once the next slot has cut in or faded in completely."""
+        following = self.following(entry)
+        if following is None:
+            return entry.end
+        return min(entry.end, following.start + self.fade_in(following))
+
+    def between(self, start: float, end: float) -> List[TimelineEntry]:
+        """Entries visible at some point of [start, end)."""
+        return [e for e in self.entries if e.start < end and self.visible_until(e) > start]
+
+    @property
+    def end(self) -> float:
+        return max((e.end for e in self.entries), default=0.0)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TimelinePlan":
+        entries = []
+        for e in data["entries"]:
+            e = dict(e)
+            for key in ("zoom", "pan_from", "pan_to"):
+                e[key] = tuple(e[key])
+            entries.append(TimelineEntry(**e))
+        # Entries edited by hand may be out of order; validate() sorts and checks them
+        return cls(seed=data["seed"], duration=data["duration"], settings=data.get("settings", {}), entries=entries)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "TimelinePlan":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def plan_timeline(
+    images: Sequence[str],
+    duration: float,
+    image_duration: float = 3.0,
+    transition_duration: float = 1.0,
+    min_zoom: float = 1.0,
+    max_zoom: float = 1.2,
+    seed: Optional[int] = None,
+    transition: str = "cut"
+) -> TimelinePlan:
+    """
+    Plan the slots of a video of `duration` seconds.
+
+    Every image is used once before any is repeated, in random order after
+    the first round, and no image follows itself. Each slot zooms in or out
+    between min_zoom and max_zoom while panning between random positions.
+
+    Args:
+        images (Sequence[str]): Image names, in the order of the first round
+        duration (float): Length to fill (the narration), in seconds
+        image_duration (float): Seconds each image is shown
+        transition_duration (float): Seconds an image keeps moving under the next one
+        min_zoom (float): Minimum zoom factor for the Ken Burns effect
+        max_zoom (float): Maximum zoom factor for the Ken Burns effect
+        seed (int): Seed of the plan (default: a random one, recorded in the plan)
+        transition (str): How each slot after the first comes in: "cut" shows it at
+            once, "crossfade" fades it in over the previous image's overlap
+
+    Returns:
+        TimelinePlan: The plan
+    """
+    if not images:
+        raise ValueError("Cannot plan a timeline without images")
+    if transition not in TRANSITIONS:
+        raise ValueError(f"Unknown transition '{transition}' (one of: {', '.join(TRANSITIONS)})")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    settings = dict(image_duration=image_duration, transition_duration=transition_duration,
+                    min_zoom=min_zoom, max_zoom=max_zoom, transition=transition)
+    plan = TimelinePlan(seed=seed, duration=duration, settings=settings)
+
+    # Create a pool of unused images and a list for used images
+    unused_images = list(images)
+    used_images = []
+    current_time = 0.0
+    while current_time < duration:
+        # If unused_images is empty but we still need more images,
+        # refill it with all images except the last used one
+        if not unused_images:
+            unused_images = [img for img in images if img != used_images[-1]] or list(images)
+            rng.shuffle(unused_images)
+        image = unused_images.pop()
+        used_images.append(image)
+
+        slot_duration = min(image_duration, duration - current_time)
+        zoom_in = rng.choice([True, False])
+        zoom = (min_zoom, max_zoom) if zoom_in else (max_zoom, min_zoom)
+        pan_from = (round(rng.random(), 4), round(rng.random(), 4))
+        pan_to = (round(rng.random(), 4), round(rng.random(), 4))
+        plan.entries.append(TimelineEntry(slot=len(plan.entries), image=image, start=current_time,
+                                          duration=slot_duration, zoom=zoom, pan_from=pan_from, pan_to=pan_to,
+                                          transition=transition if plan.entries else "cut",
+                                          overlap=transition_duration))
+        current_time += slot_duration
+    return plan
@@ -1,74 +1,300 @@
-#### Downloading few background samples
-import requests
-import random
+#### Building the library of background music samples
+"""
+Downloads soft background music from the Freesound API into a local library.
+
+Tracks are saved as fs_<freesound id>.mp3 and recorded in catalog.json in the
+same folder (id, name, license, duration, loudness, path), so a track is
+only ever downloaded once, and the renderer can choose backgrounds without
+listing or decoding the folder. Previews are streamed to <file>.part in chunks over a
+pooled session, several at a time; a sync that is interrupted leaves its
+tracks marked pending in the catalog, and the next sync resumes them from
+where their .part files end.
+
+Audio files that were put in the folder by hand are added to the catalog
+with --index, keyed by their file name (bg_118.mp3 is track "bg_118"). The
+fs_ prefix keeps downloads from taking the name of such a file, and a
+track is never picked if its file name is already in the catalog.
+
+Usage:
+    FREESOUND_API_KEY=... python utils/bg_music.py [--path backgrounds] [--nsamples 10]
+    python utils/bg_music.py --index [--path backgrounds]
+"""
+import argparse
+import json
 import os
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
-def get_soft_background_music(api_key, savepath, nsamples=10):
-    """Downloads free soft background music samples from Freesound API."""
+API_URL = "https://freesound.org/apiv2/search/text/"
+CATALOG_FILE = "catalog.json"
+CHUNK_SIZE = 64 * 1024
+# Shortest track (seconds) worth keeping as a background
+MIN_DURATION = 60
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a')
 
-    API_URL = "https://freesound.org/apiv2/search/text/"
 
-    headers = {"Authorization": f"Token {api_key}"}
-    downloaded_count = 0
-    page = 1
-    
-    while downloaded_count < nsamples:
-        params = {
-            "query": "soft background",
-            "fields": "id,name,previews,license,description,duration",
-            "filter": "tag:music type:wav",
-            "page_size": 100,  # Increased page size to have more options
-            "page": page,
+def track_filename(track_id) -> str:
+    """File name of a downloaded Freesound track (bg_ is taken by the hand-indexed library)."""
+    return f"fs_{track_id}.mp3"
+
+
+class Catalog:
+    """
+    catalog.json of a background folder: one entry per track, keyed by Freesound id.
+
+    Entries are 'pending' from the moment a track is picked until its file is
+    complete, so an interrupted sync knows what to resume.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.path = os.path.join(folder, CATALOG_FILE)
+        self.tracks: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.tracks = {str(t["id"]): t for t in json.load(f)["tracks"]}
+
+    def __contains__(self, track_id) -> bool:
+        return str(track_id) in self.tracks
+
+    def has_path(self, path: str) -> bool:
+        return any(t["path"] == path for t in self.tracks.values())
+
+    def complete(self) -> List[Dict]:
+        return [t for t in self.tracks.values()
+                if t["status"] == "complete" and os.path.exists(os.path.join(self.folder, t["path"]))]
+
+    def pending(self) -> List[Dict]:
+        done = {str(t["id"]) for t in self.complete()}
+        return [t for t in self.tracks.values() if str(t["id"]) not in done and t.get("url")]
+
+    def add(self, track: Dict) -> Dict:
+        """Record a search result as a pending download."""
+        entry = {
+            "id": track["id"],
+            "name": track["name"],
+            "license": track["license"],
+            "duration": track["duration"],
+            "path": track_filename(track["id"]),
+            "url": track["previews"]["preview-hq-mp3"],
+            "status": "pending",
         }
-        
-        # Search for soft background music
-        response = requests.get(API_URL, headers=headers, params=params)
-        
-        if response.status_code != 200:
-            print(f"Error: {response.status_code} - {response.text}")
+        self.tracks[str(track["id"])] = entry
+        return entry
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"tracks": sorted(self.tracks.values(), key=lambda t: str(t["id"]))}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def make_session(api_key: str, max_workers: int = 4) -> requests.Session:
+    """Session with a connection pool for `max_workers` downloads and retries of transient errors."""
+    session = requests.Session()
+    session.headers["Authorization"] = f"Token {api_key}"
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download(session: requests.Session, url: str, dest: str, chunk_size: int = CHUNK_SIZE, timeout: int = 30) -> int:
+    """
+    Stream `url` to `dest` through dest.part, continuing an existing .part file with a Range request.
+
+    Returns:
+        int: Size of the downloaded file in bytes
+    """
+    part = f"{dest}.part"
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        # 416: the .part file already holds the whole track
+        if not (offset and response.status_code == 416):
+            response.raise_for_status()
+            # The server ignored the range and sent the whole file; start over
+            mode = "ab" if offset and response.status_code == 206 else "wb"
+            with open(part, mode) as file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    file.write(chunk)
+    os.replace(part, dest)
+    return os.path.getsize(dest)
+
+
+def measure(path: str) -> Tuple[float, float]:
+    """
+    Decode an audio file once to measure it.
+
+    Returns:
+        Tuple[float, float]: (duration in seconds, loudness in dBFS)
+    """
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(path)
+    return round(len(audio) / 1000, 3), round(audio.dBFS, 2)
+
+
+def _download_track(session: requests.Session, entry: Dict, folder: str) -> Dict:
+    """Download a catalog entry and measure the file; returns the fields to update."""
+    path = os.path.join(folder, entry["path"])
+    update = {"bytes": download(session, entry["url"], path), "status": "complete"}
+    try:
+        update["duration"], update["loudness"] = measure(path)
+    except Exception as e:
+        # Keep Freesound's duration; index_library() can measure the track later
+        print(f"Could not measure {entry['path']}: {e}")
+    return update
+
+
+def index_library(folder: str) -> Tuple[bool, str]:
+    """
+    Add audio files in `folder` that are not in its catalog yet (e.g. copied in
+    by hand) and measure catalog tracks whose loudness is unknown.
+
+    Args:
+        folder (str): Background music folder
+
+    Returns:
+        Tuple[bool, str]: (success status, message)
+    """
+    catalog = Catalog(folder)
+    known = {t["path"] for t in catalog.tracks.values()}
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(AUDIO_EXTENSIONS) and name not in known:
+            track_id = os.path.splitext(name)[0]
+            catalog.tracks[track_id] = {"id": track_id, "name": track_id, "license": None, "duration": None,
+                                        "path": name, "status": "complete"}
+    errors = 0
+    for entry in tqdm(catalog.complete(), desc="Indexing Background Samples"):
+        if entry.get("loudness") is None:
+            try:
+                entry["duration"], entry["loudness"] = measure(os.path.join(folder, entry["path"]))
+            except Exception as e:
+                errors += 1
+                print(f"Could not measure {entry['path']}: {e}")
+    catalog.save()
+    message = f"Indexed {len(catalog.complete())} background music samples"
+    if errors:
+        return False, f"{message}; {errors} could not be measured."
+    return True, f"{message}."
+
+
+def _search(session: requests.Session, api_url: str, query: str, page: int) -> Dict:
+    params = {
+        "query": query,
+        "fields": "id,name,previews,license,description,duration",
+        "filter": "tag:music type:wav",
+        "page_size": 100,  # Increased page size to have more options
+        "page": page,
+    }
+    response = session.get(api_url, params=params, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_soft_background_music(
+    api_key: str,
+    savepath: str,
+    nsamples: int = 10,
+    query: str = "soft background",
+    max_workers: int = 4,
+    api_url: str = API_URL,
+    session: Optional[requests.Session] = None
+) -> Tuple[bool, str]:
+    """
+    Sync the background library in `savepath` up to `nsamples` tracks from Freesound.
+
+    Pending downloads of an earlier sync are resumed first; then new tracks of
+    at least MIN_DURATION seconds that are not in the catalog yet are picked
+    at random from the search results until the library is full.
+
+    Args:
+        api_key (str): Freesound API key
+        savepath (str): Background music folder
+        nsamples (int): Number of tracks the library should hold
+        query (str): Freesound search text
+        max_workers (int): Concurrent downloads
+        api_url (str): Freesound text search endpoint (a local fake API in tests)
+        session (requests.Session): Session to use (default: make_session())
+
+    Returns:
+        Tuple[bool, str]: (success status, message)
+    """
+    os.makedirs(savepath, exist_ok=True)
+    session = session or make_session(api_key, max_workers)
+    catalog = Catalog(savepath)
+    failed = 0
+
+    def fetch(entries, desc):
+        nonlocal failed
+        if not entries:
             return
-            
-        data = response.json()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_download_track, session, e, savepath): e for e in entries}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                entry = futures[future]
+                try:
+                    entry.update(future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"Error downloading track: {entry['name']} ({e})")
+                catalog.save()
+
+    fetch(catalog.pending(), "Resuming Background Samples")
+
+    page = 1
+    while len(catalog.complete()) < nsamples:
+        try:
+            data = _search(session, api_url, query, page)
+        except requests.RequestException as e:
+            return False, f"Error searching Freesound: {e}"
         if not data["results"]:
-            print("No more results found. Could not download requested number of samples.")
-            return
-            
-        # Create a list of valid tracks (duration >= 60 seconds)
-        valid_tracks = [track for track in data["results"] if track["duration"] >= 60]
-        
-        # Shuffle the valid tracks to ensure random selection
+            break
+
+        # Tracks that are long enough and not in the library yet, in random order
+        valid_tracks = [t for t in data["results"] if t["duration"] >= MIN_DURATION and t["id"] not in catalog
+                        and not catalog.has_path(track_filename(t["id"]))]
         random.shuffle(valid_tracks)
-        
-        for track in tqdm(valid_tracks, desc=f"Downloading Background Samples ({downloaded_count}/{nsamples})"):
-            if downloaded_count >= nsamples:
-                break
-                
-            track_name = track["name"]
-            track_duration = track["duration"]
-            preview_url = track["previews"]["preview-hq-mp3"]
-            
-            # Download the music track
-            music_response = requests.get(preview_url)
-            if music_response.status_code == 200:
-                # Save the file
-                file_name = f"{savepath}/bg_{int(track_duration)}.mp3".replace(" ", "_")
-                with open(file_name, "wb") as file:
-                    file.write(music_response.content)
-                downloaded_count += 1
-            else:
-                print(f"Error downloading track: {track_name}")
-                
-        # If we haven't found enough tracks, move to the next page
-        if downloaded_count < nsamples:
-            page += 1
-            
-    print(f"\nSuccessfully downloaded {downloaded_count} background music samples.")
-
-
-
-## Example usage
-pth="../backgrounds"
-os.makedirs(pth,exist_ok=True)
-API_KEY=os.environ["FREESOUND_API_KEY"]
-get_soft_background_music(API_KEY,pth,nsamples=10)
\ No newline at end of file
+        picked = [catalog.add(t) for t in valid_tracks[:nsamples - len(catalog.complete())]]
+        catalog.save()
+        before = len(catalog.complete())
+        fetch(picked, f"Downloading Background Samples ({before}/{nsamples})")
+        if picked and len(catalog.complete()) == before:
+            # Every download failed; leave them for the next sync rather than picking more
+            break
+
+        if not data.get("next"):
+            break
+        page += 1
+
+    count = len(catalog.complete())
+    message = f"Library has {count} background music samples"
+    if failed:
+        message += f" ({failed} downloads failed and will be resumed on the next sync)"
+    if count < nsamples:
+        return False, f"{message}; could not reach the requested {nsamples}."
+    return True, f"{message}."
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                       "backgrounds"), help="Background music folder")
+    parser.add_argument("--nsamples", type=int, default=10, help="Tracks the library should hold")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
+    parser.add_argument("--index", action="store_true", help="Catalog and measure the files already in the folder")
+    args = parser.parse_args()
+    if args.index:
+        ok, msg = index_library(args.path)
+    else:
+        ok, msg = get_soft_background_music(os.environ["FREESOUND_API_KEY"], args.path, args.nsamples,
+                                            max_workers=args.workers)
+    print(msg)
+    raise SystemExit(0 if ok else 1)
@@ -1,151 +1,578 @@
-import pandas as pd
-from gnews import GNews
-from pytrends.request import TrendReq
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.tag import pos_tag
 from collections import Counter
+import copy
+import hashlib
+import json
+import math
+import os
 import re
 import logging
-from typing import List, Dict
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple
 import time
 
+# Regex patterns and brand names for each product category
+PRODUCT_PATTERNS = {
+    "bike": {
+        "brands": [
+            # Indian Brands
+            "Royal Enfield", "Bajaj", "TVS", "Hero", "Honda", "Yamaha", 
+            "KTM", "Jawa", "Yezdi", "Suzuki",
+            # International Brands
+            "Kawasaki", "Triumph", "BMW", "Ducati", "Harley-Davidson"
+        ],
+        "patterns": [
+            # Royal Enfield patterns
+            r"Royal Enfield (?:Classic|Bullet|Meteor|Hunter|Himalayan|Continental|Interceptor) \d+(?:\s?(?:X|GT|Scram))?",
+            r"Royal Enfield Super Meteor \d+",
+            # Bajaj patterns
+            r"Bajaj (?:Pulsar|Dominar|Avenger) \d+(?:\s?(?:F|N|NS|RS|Street|Cruise))?",
+            # TVS patterns
+            r"TVS (?:Apache|Jupiter|Ntorq|Ronin|iQube) \d+(?:\s?(?:RTR|RR|Race|Electric))?",
+            # Hero patterns
+            r"Hero (?:Splendor|HF|Passion|Glamour|Xpulse|Xtreme) \d+(?:\s?(?:Plus|Pro|i3s|Sports))?",
+            # Honda patterns
+            r"Honda (?:Activa|Shine|Unicorn|SP|CB|CBR) \d+(?:\s?(?:X|R|F|DLX))?",
+            # Yamaha patterns
+            r"Yamaha (?:MT|R|FZ|FZS|Aerox) \d+(?:\s?(?:V\d|S|FI|ABS))?",
+            # KTM patterns
+            r"KTM (?:Duke|RC|Adventure) \d+(?:\s?(?:R|X))?",
+            # Jawa/Yezdi patterns
+            r"(?:Jawa|Yezdi) (?:Perak|42|Adventure|Scrambler|Roadster)(?: \d+)?",
+            # Suzuki patterns
+            r"Suzuki (?:Access|Burgman|Gixxer|Hayabusa|V-Strom) \d+(?:\s?(?:SF|GT))?",
+            # Other international brands
+            r"Kawasaki (?:Ninja|Z|Versys|Vulcan) \d+(?:\s?(?:R|RR|X))?",
+            r"Triumph (?:Tiger|Street|Rocket|Trident|Speed) \d+(?:\s?(?:GT|R|RS|RR))?",
+            r"BMW [A-Z]\d+(?:\s?(?:RR|GS|XR))?",
+            r"Ducati (?:Monster|Panigale|Multistrada|Scrambler) \d+(?:\s?(?:V\d|S|R))?",
+            r"Harley-Davidson (?:Iron|Street|Pan America|Nightster|Sportster) \d+(?:\s?(?:S|Special))?"
+        ],
+        "exclude": ["accessory", "cover", "helmet", "service", "spare", "modification"]
+    },
+    "car": {
+        "brands": [
+            # Indian Brands
+            "Tata", "Mahindra", "Maruti Suzuki", 
+            # International Brands in India
+            "Hyundai", "Toyota", "Honda", "Kia", "MG", "Volkswagen", 
+            "Skoda", "Mercedes-Benz", "BMW", "Audi"
+        ],
+        "patterns": [
+            # Tata patterns
+            r"Tata (?:Nexon|Harrier|Safari|Punch|Altroz|Tiago|Tigor)(?: EV)?(?: \d{4})?(?:\s?(?:Dark|Gold|iCNG))?",
+            # Mahindra patterns
+            r"Mahindra (?:Scorpio|XUV|Thar|Bolero|KUV|Marazzo) \d+(?:\s?(?:N|Z|Classic|Neo))?",
+            r"Mahindra XUV\d+(?:\s?(?:L|e))?",
+            # Maruti Suzuki patterns
+            r"Maruti(?: Suzuki)? (?:Swift|Baleno|Brezza|Dzire|Ertiga|Grand Vitara|Jimny|Fronx)(?: \d{4})?(?:\s?(?:Alpha|Delta|Zeta|CNG))?",
+            # Hyundai patterns
+            r"Hyundai (?:Creta|Venue|i\d+|Verna|Exter|Alcazar|Tucson)(?: \d{4})?(?:\s?(?:Knight|N Line))?",
+            # Toyota patterns
+            r"Toyota (?:Fortuner|Innova|Urban Cruiser|Glanza|Camry|Vellfire)(?: \d{4})?(?:\s?(?:Legender|Hycross|Crysta))?",
+            # Honda patterns
+            r"Honda (?:City|Amaze|Elevate|WR-V|CR-V)(?: \d{4})?(?:\s?(?:e:HEV|ZX|VX))?",
+            # Kia patterns
+            r"Kia (?:Seltos|Sonet|Carens|EV6|Carnival)(?: \d{4})?(?:\s?(?:X|GT))?",
+            # MG patterns
+            r"MG (?:Hector|Astor|Comet|ZS|Gloster)(?: EV)?(?: \d{4})?(?:\s?(?:Plus|Sharp|Savvy))?",
+            # Volkswagen patterns
+            r"Volkswagen (?:Taigun|Virtus|Tiguan)(?: \d{4})?(?:\s?(?:GT|Plus))?",
+            # Skoda patterns
+            r"Skoda (?:Kushaq|Slavia|Kodiaq|Octavia|Superb)(?: \d{4})?(?:\s?(?:Style|L&K))?",
+            # Luxury brands
+            r"Mercedes(?:-Benz)? (?:A-Class|C-Class|E-Class|GLA|GLC|GLE|S-Class)(?: \d{4})?",
+            r"BMW (?:[A-Z]\d|X\d)(?: \d{4})?(?:\s?(?:M Sport|xDrive))?",
+            r"Audi (?:[A-Z]\d|Q\d)(?: \d{4})?(?:\s?(?:Technology|Premium Plus))?"
+        ],
+        "exclude": ["service", "spare", "accessory", "insurance", "finance", "second hand", "used"]
+    }
+}
+
+# Include other categories (smartphone, laptop, drone) unchanged
+PRODUCT_PATTERNS.update({
+    "smartphone": {
+        "brands": ["iPhone", "Samsung", "Google", "OnePlus", "Xiaomi", "Vivo", "Oppo", "Realme", "Nothing"],
+        "patterns": [
+            r"iPhone \d+(?:\s?(?:Pro|Plus|Max|Ultra))?",
+            r"Samsung Galaxy (?:S|A|M|F)\d+(?:\s?(?:Plus|Ultra|FE))?",
+            r"OnePlus \d+(?:\s?(?:Pro|R|T))?",
+            r"Xiaomi \d+(?:\s?(?:Pro|X|T|S))?",
+            r"Vivo (?:V|X|Y)\d+(?:\s?(?:Pro|Plus|Max))?",
+            r"Oppo (?:Find|Reno|F|A)\d+(?:\s?(?:Pro|Plus|Max))?",
+            r"Realme \d+(?:\s?(?:Pro|GT|Neo))?",
+            r"Nothing Phone \(\d\)"
+        ],
+        "exclude": ["case", "cover", "screen protector", "charger"]
+    }
+})
+
+
+# An exclude keyword (e.g. "helmet") only rejects products mentioned within this many characters of it
+EXCLUDE_WINDOW = 80
+
+# Characters that end the literal text at the start of a pattern
+_LITERAL_END = re.compile(r"[\\()\[\]{}?*+.|^$]")
+
+
+def _prefixes(pattern: str) -> tuple:
+    """
+    Lowercased literal text that every match of `pattern` starts with; one
+    entry per alternative when the pattern starts with a (?:A|B) group.
+    """
+    if pattern.startswith("(?:"):
+        end = pattern.index(")")
+        tail = _LITERAL_END.split(pattern[end + 1:], 1)[0]
+        return tuple(f"{alt}{tail}".lower() for alt in pattern[3:end].split("|"))
+    return (_LITERAL_END.split(pattern, 1)[0].lower(),)
+
+
+class _CategoryIndex:
+    """
+    Compiled patterns of one category. A pattern only runs on texts that
+    contain its brand prefix, and patterns run in their listed order, so
+    results match running every pattern over every text.
+
+    Exclude keywords are found in one pass per text; a match is dropped when
+    a keyword starts within EXCLUDE_WINDOW characters of it, so a single
+    "helmet" elsewhere in a long description does not reject every product.
+    """
+    def __init__(self, spec: Dict):
+        self.exclude = spec["exclude"]
+        # Longest first so "screen protector" wins over shorter overlapping keywords
+        keywords = sorted(self.exclude, key=len, reverse=True)
+        self.exclude_re = re.compile(r"\b(?:" + "|".join(re.escape(k.lower()) for k in keywords) + ")")
+        self.patterns = [(re.compile(p, re.IGNORECASE), _prefixes(p)) for p in spec["patterns"]]
+
+    def extract(self, text: str) -> List[str]:
+        lowered = text.lower()
+        excluded = None
+        products = []
+        for regex, prefixes in self.patterns:
+            if not any(prefix in lowered for prefix in prefixes):
+                continue
+            for match in regex.finditer(text):
+                if excluded is None:
+                    # Keyword positions are looked up once, and only for texts that mention a product
+                    excluded = [m.start() for m in self.exclude_re.finditer(lowered)]
+                if excluded and _near(excluded, match.start(), match.end()):
+                    continue
+                products.append(match.group())
+        return products
+
+
+def _near(positions: List[int], start: int, end: int) -> bool:
+    """Whether any of the sorted `positions` lies within EXCLUDE_WINDOW of [start, end)."""
+    i = bisect_left(positions, start - EXCLUDE_WINDOW)
+    return i < len(positions) and positions[i] <= end + EXCLUDE_WINDOW
+
+
+# Built once at import; every ranker and call shares them
+_INDEXES = {category: _CategoryIndex(spec) for category, spec in PRODUCT_PATTERNS.items()}
+
+
+@lru_cache(maxsize=8192)
+def _article_products(category: str, title: str, description: str) -> Tuple[str, ...]:
+    """Products in one article, cached so articles seen again (repeat searches) are not rescanned."""
+    index = _INDEXES.get(category)
+    if not index:
+        return ()
+    return tuple(index.extract(title) if title else []) + tuple(index.extract(description) if description else [])
+
+
+logger = logging.getLogger(__name__)
+
+# News searches are reused for this long before they are fetched again (seconds)
+NEWS_CACHE_TTL = 3600
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread calling one service.
+
+    Args:
+        rate (float): Requests per second on average
+        burst (int): Requests that may be made back to back after an idle period
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait until a request may be made."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Shared by every fetcher in the process so repeated findtrend calls reuse results
+_news_cache: Dict[Tuple[str, str, str], Tuple[float, List[Dict]]] = {}
+_news_cache_lock = threading.Lock()
+
+
+class NewsFetcher:
+    """
+    Fetches Google News searches with bounded concurrency, a shared rate
+    limit and a TTL cache keyed by (query, country, period).
+
+    Args:
+        client: GNews-like client with get_news(query) and country/period attributes
+        max_workers (int): Searches in flight at once (default: 4)
+        limiter (RateLimiter): Rate limit for the searches (default: 1 per second, bursts of 4)
+        ttl (float): Seconds a cached search stays valid (default: NEWS_CACHE_TTL)
+    """
+    def __init__(self, client, max_workers: int = 4, limiter: Optional[RateLimiter] = None, ttl: float = NEWS_CACHE_TTL):
+        self.client = client
+        self.max_workers = max_workers
+        self.limiter = limiter or RateLimiter(rate=1.0, burst=4)
+        self.ttl = ttl
+        # GNews takes the period from the client, so other periods get a copy of it each
+        self._period_clients: Dict[str, Any] = {}
+        self._period_lock = threading.Lock()
+
+    def _client(self, period: Optional[str]):
+        """The client searching `period`; the shared client itself is never changed."""
+        if period is None or period == getattr(self.client, "period", None):
+            return self.client
+        with self._period_lock:
+            client = self._period_clients.get(period)
+            if client is None:
+                client = self._period_clients[period] = copy.copy(self.client)
+                client.period = period
+        return client
+
+    def _key(self, query: str, period: Optional[str] = None) -> Tuple[str, str, str]:
+        return (query, getattr(self.client, "country", None) or "", period or getattr(self.client, "period", None) or "")
+
+    def get(self, query: str, period: Optional[str] = None) -> List[Dict]:
+        """
+        Articles for a search, from the cache when it was fetched within the TTL.
+
+        Args:
+            query (str): Search query
+            period (str): Search period (e.g. "12h") instead of the client's own
+        """
+        key = self._key(query, period)
+        with _news_cache_lock:
+            cached = _news_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        self.limiter.acquire()
+        articles = self._client(period).get_news(query) or []
+        with _news_cache_lock:
+            _news_cache[key] = (time.monotonic() + self.ttl, articles)
+        return articles
+
+    def get_many(self, queries: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Articles for several searches, fetched concurrently.
+
+        Returns:
+            dict: {query: articles}; a search that failed maps to an empty list
+        """
+        def fetch(query):
+            try:
+                return self.get(query)
+            except Exception as e:
+                logger.warning(f"News search failed for '{query}': {e}")
+                return []
+
+        unique = list(dict.fromkeys(queries))
+        if len(unique) <= 1:
+            return {q: fetch(q) for q in unique}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique)), thread_name_prefix="news") as pool:
+            return dict(zip(unique, pool.map(fetch, unique)))
+
+
+# Discovered articles, their extracted products and the time of each search
+ARTICLE_DB = "articles.db"
+# Mentions in articles published within this window decide the top products (seconds)
+DISCOVERY_WINDOW = 14 * 86400
+# Stored extractions made with other patterns or exclusion rules are redone
+EXTRACT_VERSION = hashlib.sha256(json.dumps([PRODUCT_PATTERNS, EXCLUDE_WINDOW], sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _published(article: Dict, default: float) -> float:
+    """Publication time of a GNews article as a timestamp."""
+    try:
+        return parsedate_to_datetime(article["published date"]).timestamp()
+    except (KeyError, TypeError, ValueError, IndexError):
+        return default
+
+
+class ArticleStore:
+    """
+    Articles found by news searches, kept in SQLite across runs.
+
+    Articles are deduplicated by URL and by normalized title, products are
+    extracted from each article once per category, and the time of every
+    search is recorded so later runs only fetch what was published since.
+
+    Args:
+        path (str): SQLite database file (default: ARTICLE_DB)
+    """
+    def __init__(self, path: str = ARTICLE_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT UNIQUE,
+                    title_key TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL DEFAULT '',
+                    published REAL NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS articles_published ON articles (published);
+                CREATE TABLE IF NOT EXISTS article_queries (
+                    query TEXT NOT NULL,
+                    article_id INTEGER NOT NULL REFERENCES articles (id),
+                    PRIMARY KEY (query, article_id)
+                );
+                CREATE TABLE IF NOT EXISTS extractions (
+                    article_id INTEGER NOT NULL REFERENCES articles (id),
+                    category TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    PRIMARY KEY (article_id, category)
+                );
+                CREATE TABLE IF NOT EXISTS mentions (
+                    article_id INTEGER NOT NULL REFERENCES articles (id),
+                    category TEXT NOT NULL,
+                    product TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (article_id, category, product)
+                );
+                CREATE INDEX IF NOT EXISTS mentions_category ON mentions (category, product);
+                CREATE TABLE IF NOT EXISTS fetches (
+                    query TEXT NOT NULL,
+                    country TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (query, country)
+                );
+            """)
+
+    @staticmethod
+    def _title_key(title: str) -> str:
+        return " ".join((title or "").lower().split())
+
+    def last_fetch(self, query: str, country: str = "") -> Optional[float]:
+        """When `query` was last searched, or None if it never was."""
+        with self._lock:
+            row = self._db.execute("SELECT fetched_at FROM fetches WHERE query = ? AND country = ?",
+                                   (query, country)).fetchone()
+        return row[0] if row else None
+
+    def add(self, query: str, articles: List[Dict], country: str = "", fetched_at: Optional[float] = None) -> int:
+        """
+        Store the result of a search.
+
+        Returns:
+            int: Number of articles that were not stored yet
+        """
+        fetched_at = fetched_at or time.time()
+        added = 0
+        with self._lock, self._db:
+            for article in articles:
+                title = article.get("title") or ""
+                key = self._title_key(title)
+                if not key:
+                    continue
+                url = article.get("url") or None
+                cur = self._db.execute(
+                    "INSERT OR IGNORE INTO articles (url, title_key, title, description, published, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, key, title, article.get("description") or "", _published(article, fetched_at), fetched_at))
+                if cur.rowcount:
+                    article_id = cur.lastrowid
+                    added += 1
+                else:
+                    article_id = self._db.execute("SELECT id FROM articles WHERE url = ? OR title_key = ?",
+                                                  (url, key)).fetchone()[0]
+                self._db.execute("INSERT OR IGNORE INTO article_queries (query, article_id) VALUES (?, ?)",
+                                 (query, article_id))
+            self._db.execute("INSERT OR REPLACE INTO fetches (query, country, fetched_at) VALUES (?, ?, ?)",
+                             (query, country, fetched_at))
+        return added
+
+    def extract_missing(self, category: str, query: str, extract) -> int:
+        """
+        Extract products from the articles of `query` that have no current extraction.
+
+        Args:
+            extract (Callable): Maps an article dict and the category to its product mentions
+
+        Returns:
+            int: Number of articles extracted
+        """
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT a.id, a.title, a.description FROM articles a
+                JOIN article_queries q ON q.article_id = a.id
+                LEFT JOIN extractions e ON e.article_id = a.id AND e.category = ?
+                WHERE q.query = ? AND (e.version IS NULL OR e.version != ?)""",
+                (category, query, EXTRACT_VERSION)).fetchall()
+        results = [(article_id, Counter(extract({"title": title, "description": description}, category)))
+                   for article_id, title, description in rows]
+        with self._lock, self._db:
+            for article_id, products in results:
+                self._db.execute("DELETE FROM mentions WHERE article_id = ? AND category = ?", (article_id, category))
+                self._db.executemany(
+                    "INSERT INTO mentions (article_id, category, product, count) VALUES (?, ?, ?, ?)",
+                    [(article_id, category, product, count) for product, count in products.items()])
+                self._db.execute("INSERT OR REPLACE INTO extractions (article_id, category, version) VALUES (?, ?, ?)",
+                                 (article_id, category, EXTRACT_VERSION))
+        return len(results)
+
+    def mention_counts(self, category: str, query: str, since: float, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Products mentioned in the articles of `query` published after `since`, most mentioned first."""
+        sql = """
+            SELECT m.product, SUM(m.count) AS mentions FROM mentions m
+            JOIN articles a ON a.id = m.article_id
+            JOIN article_queries q ON q.article_id = a.id
+            WHERE m.category = ? AND q.query = ? AND a.published >= ?
+            GROUP BY m.product ORDER BY mentions DESC, MIN(a.id)"""
+        params = [category, query, since]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [(product, count) for product, count in self._db.execute(sql, params)]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# Google Trends compares at most this many terms per request
+TRENDS_BATCH = 5
+# interest_over_time frames are cached on disk and reused for this long (seconds)
+TRENDS_CACHE_DIR = os.path.join("cache", "trends")
+TRENDS_CACHE_TTL = 12 * 3600
+# Google Trends answers bursts with HTTP 429, so payloads are spaced out
+_trends_limiter = RateLimiter(rate=0.2, burst=1)
+
+
+def _trend_batches(terms: List[str], anchor: str) -> List[List[str]]:
+    """Payloads of at most TRENDS_BATCH terms that all contain `anchor`."""
+    others = [t for t in terms if t != anchor]
+    size = TRENDS_BATCH - 1
+    return [[anchor] + others[i:i + size] for i in range(0, len(others), size)] or [[anchor]]
+
+
 class AutoProductRanker:
-    def __init__(self):
-        """Initialize the analyzer with required clients and NLTK downloads"""
+    def __init__(self, news=None, trends=None, store_path: str = ARTICLE_DB):
+        """
+        Initialize the analyzer. The news and trends clients and the article
+        store are created when first used, so a ranker is cheap to create.
+
+        Args:
+            news: GNews-like client (default: GNews for the Indian market)
+            trends: TrendReq-like client (default: TrendReq in the Indian timezone)
+            store_path (str): SQLite file of the article store
+        """
         # Initialize logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
-        
-        # Initialize clients with Indian market focus
-        self.news = GNews(language='en', country='IN', period='14d', max_results=100)
-        self.trends = TrendReq(hl='en-IN', tz=330)  # Indian timezone
-        
-        try:
-            nltk.download('punkt', quiet=True)
-            nltk.download('averaged_perceptron_tagger', quiet=True)
-            nltk.download('maxent_ne_chunker', quiet=True)
-            nltk.download('words', quiet=True)
-        except Exception as e:
-            self.logger.warning(f"NLTK download error: {str(e)}")
+
+        self._news = news
+        self._trends = trends
+        self._fetcher = None
+        self._store = None
+        self._store_path = store_path
+        self._lock = threading.Lock()
+
+    @property
+    def news(self):
+        if self._news is None:
+            with self._lock:
+                if self._news is None:
+                    from gnews import GNews
+                    # Initialize clients with Indian market focus
+                    self._news = GNews(language='en', country='IN', period='14d', max_results=100)
+        return self._news
+
+    @property
+    def trends(self):
+        if self._trends is None:
+            with self._lock:
+                if self._trends is None:
+                    from pytrends.request import TrendReq
+                    self._trends = TrendReq(hl='en-IN', tz=330)  # Indian timezone
+        return self._trends
+
+    @property
+    def fetcher(self) -> NewsFetcher:
+        if self._fetcher is None:
+            news = self.news
+            with self._lock:
+                if self._fetcher is None:
+                    self._fetcher = NewsFetcher(news)
+        return self._fetcher
+
+    @property
+    def store(self) -> ArticleStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = ArticleStore(self._store_path)
+        return self._store
 
     def get_product_patterns(self, category: str) -> Dict:
         """
         Get regex patterns and brand names for different product categories
         """
-        patterns = {
-            "bike": {
-                "brands": [
-                    # Indian Brands
-                    "Royal Enfield", "Bajaj", "TVS", "Hero", "Honda", "Yamaha", 
-                    "KTM", "Jawa", "Yezdi", "Suzuki",
-                    # International Brands
-                    "Kawasaki", "Triumph", "BMW", "Ducati", "Harley-Davidson"
-                ],
-                "patterns": [
-                    # Royal Enfield patterns
-                    r"Royal Enfield (?:Classic|Bullet|Meteor|Hunter|Himalayan|Continental|Interceptor) \d+(?:\s?(?:X|GT|Scram))?",
-                    r"Royal Enfield Super Meteor \d+",
-                    # Bajaj patterns
-                    r"Bajaj (?:Pulsar|Dominar|Avenger) \d+(?:\s?(?:F|N|NS|RS|Street|Cruise))?",
-                    # TVS patterns
-                    r"TVS (?:Apache|Jupiter|Ntorq|Ronin|iQube) \d+(?:\s?(?:RTR|RR|Race|Electric))?",
-                    # Hero patterns
-                    r"Hero (?:Splendor|HF|Passion|Glamour|Xpulse|Xtreme) \d+(?:\s?(?:Plus|Pro|i3s|Sports))?",
-                    # Honda patterns
-                    r"Honda (?:Activa|Shine|Unicorn|SP|CB|CBR) \d+(?:\s?(?:X|R|F|DLX))?",
-                    # Yamaha patterns
-                    r"Yamaha (?:MT|R|FZ|FZS|Aerox) \d+(?:\s?(?:V\d|S|FI|ABS))?",
-                    # KTM patterns
-                    r"KTM (?:Duke|RC|Adventure) \d+(?:\s?(?:R|X))?",
-                    # Jawa/Yezdi patterns
-                    r"(?:Jawa|Yezdi) (?:Perak|42|Adventure|Scrambler|Roadster)(?: \d+)?",
-                    # Suzuki patterns
-                    r"Suzuki (?:Access|Burgman|Gixxer|Hayabusa|V-Strom) \d+(?:\s?(?:SF|GT))?",
-                    # Other international brands
-                    r"Kawasaki (?:Ninja|Z|Versys|Vulcan) \d+(?:\s?(?:R|RR|X))?",
-                    r"Triumph (?:Tiger|Street|Rocket|Trident|Speed) \d+(?:\s?(?:GT|R|RS|RR))?",
-                    r"BMW [A-Z]\d+(?:\s?(?:RR|GS|XR))?",
-                    r"Ducati (?:Monster|Panigale|Multistrada|Scrambler) \d+(?:\s?(?:V\d|S|R))?",
-                    r"Harley-Davidson (?:Iron|Street|Pan America|Nightster|Sportster) \d+(?:\s?(?:S|Special))?"
-                ],
-                "exclude": ["accessory", "cover", "helmet", "service", "spare", "modification"]
-            },
-            "car": {
-                "brands": [
-                    # Indian Brands
-                    "Tata", "Mahindra", "Maruti Suzuki", 
-                    # International Brands in India
-                    "Hyundai", "Toyota", "Honda", "Kia", "MG", "Volkswagen", 
-                    "Skoda", "Mercedes-Benz", "BMW", "Audi"
-                ],
-                "patterns": [
-                    # Tata patterns
-                    r"Tata (?:Nexon|Harrier|Safari|Punch|Altroz|Tiago|Tigor)(?: EV)?(?: \d{4})?(?:\s?(?:Dark|Gold|iCNG))?",
-                    # Mahindra patterns
-                    r"Mahindra (?:Scorpio|XUV|Thar|Bolero|KUV|Marazzo) \d+(?:\s?(?:N|Z|Classic|Neo))?",
-                    r"Mahindra XUV\d+(?:\s?(?:L|e))?",
-                    # Maruti Suzuki patterns
-                    r"Maruti(?: Suzuki)? (?:Swift|Baleno|Brezza|Dzire|Ertiga|Grand Vitara|Jimny|Fronx)(?: \d{4})?(?:\s?(?:Alpha|Delta|Zeta|CNG))?",
-                    # Hyundai patterns
-                    r"Hyundai (?:Creta|Venue|i\d+|Verna|Exter|Alcazar|Tucson)(?: \d{4})?(?:\s?(?:Knight|N Line))?",
-                    # Toyota patterns
-                    r"Toyota (?:Fortuner|Innova|Urban Cruiser|Glanza|Camry|Vellfire)(?: \d{4})?(?:\s?(?:Legender|Hycross|Crysta))?",
-                    # Honda patterns
-                    r"Honda (?:City|Amaze|Elevate|WR-V|CR-V)(?: \d{4})?(?:\s?(?:e:HEV|ZX|VX))?",
-                    # Kia patterns
-                    r"Kia (?:Seltos|Sonet|Carens|EV6|Carnival)(?: \d{4})?(?:\s?(?:X|GT))?",
-                    # MG patterns
-                    r"MG (?:Hector|Astor|Comet|ZS|Gloster)(?: EV)?(?: \d{4})?(?:\s?(?:Plus|Sharp|Savvy))?",
-                    # Volkswagen patterns
-                    r"Volkswagen (?:Taigun|Virtus|Tiguan)(?: \d{4})?(?:\s?(?:GT|Plus))?",
-                    # Skoda patterns
-                    r"Skoda (?:Kushaq|Slavia|Kodiaq|Octavia|Superb)(?: \d{4})?(?:\s?(?:Style|L&K))?",
-                    # Luxury brands
-                    r"Mercedes(?:-Benz)? (?:A-Class|C-Class|E-Class|GLA|GLC|GLE|S-Class)(?: \d{4})?",
-                    r"BMW (?:[A-Z]\d|X\d)(?: \d{4})?(?:\s?(?:M Sport|xDrive))?",
-                    r"Audi (?:[A-Z]\d|Q\d)(?: \d{4})?(?:\s?(?:Technology|Premium Plus))?"
-                ],
-                "exclude": ["service", "spare", "accessory", "insurance", "finance", "second hand", "used"]
-            }
-        }
-        
-        # Include other categories (smartphone, laptop, drone) unchanged
-        patterns.update({
-            "smartphone": {
-                "brands": ["iPhone", "Samsung", "Google", "OnePlus", "Xiaomi", "Vivo", "Oppo", "Realme", "Nothing"],
-                "patterns": [
-                    r"iPhone \d+(?:\s?(?:Pro|Plus|Max|Ultra))?",
-                    r"Samsung Galaxy (?:S|A|M|F)\d+(?:\s?(?:Plus|Ultra|FE))?",
-                    r"OnePlus \d+(?:\s?(?:Pro|R|T))?",
-                    r"Xiaomi \d+(?:\s?(?:Pro|X|T|S))?",
-                    r"Vivo (?:V|X|Y)\d+(?:\s?(?:Pro|Plus|Max))?",
-                    r"Oppo (?:Find|Reno|F|A)\d+(?:\s?(?:Pro|Plus|Max))?",
-                    r"Realme \d+(?:\s?(?:Pro|GT|Neo))?",
-                    r"Nothing Phone \(\d\)"
-                ],
-                "exclude": ["case", "cover", "screen protector", "charger"]
-            }
-        })
-        
-        return patterns.get(category.lower(), {})
+        return PRODUCT_PATTERNS.get(category.lower(), {})
 
     # Rest of the class methods remain unchanged
     def extract_products_from_text(self, text: str, category: str) -> List[str]:
         """Extract product mentions from text using regex patterns"""
-        patterns = self.get_product_patterns(category)
-        if not patterns:
+        index = _INDEXES.get(category.lower())
+        if not index or not text:
             return []
-            
-        products = []
-        for pattern in patterns["patterns"]:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                product = match.group()
-                if not any(excl in text.lower() for excl in patterns["exclude"]):
-                    products.append(product)
-                    
-        return products
+        return index.extract(text)
+
+    def extract_products_batch(self, texts: List[str], category: str) -> List[List[str]]:
+        """Extract product mentions from many texts, using the category's index for all of them"""
+        index = _INDEXES.get(category.lower())
+        if not index:
+            return [[] for _ in texts]
+        return [index.extract(text) if text else [] for text in texts]
+
+    def article_products(self, article: Dict, category: str) -> List[str]:
+        """Product mentions in an article's title and description (cached per article)"""
+        return list(_article_products(category.lower(), article.get('title') or '', article.get('description') or ''))
+
+    def _refresh_articles(self, query: str) -> None:
+        """Store the articles of `query` published since it was last searched."""
+        country = getattr(self.news, "country", None) or ""
+        now = time.time()
+        last = self.store.last_fetch(query, country)
+        if last is not None and now - last < NEWS_CACHE_TTL:
+            return
+        period = None
+        if last is not None and now - last < DISCOVERY_WINDOW:
+            # An hour of overlap covers articles indexed late
+            period = f"{math.ceil((now - last) / 3600) + 1}h"
+        articles = self.fetcher.get(query, period=period)
+        added = self.store.add(query, articles, country=country, fetched_at=now)
+        self.logger.info(f"Stored {added} new of {len(articles)} articles for '{query}'")
 
     def get_top_products(self, category: str, limit: int = 5) -> List[str]:
         """Discover top products in a category from news articles"""
@@ -157,46 +584,96 @@ class AutoProductRanker:
             }
             
             search_query = search_queries.get(category.lower(), f"new {category} launch review India")
-            articles = self.news.get_news(search_query)
-            
-            product_mentions = []
-            for article in articles:
-                title_products = self.extract_products_from_text(article['title'], category)
-                desc_products = self.extract_products_from_text(article.get('description', ''), category)
-                product_mentions.extend(title_products + desc_products)
-            
-            if product_mentions:
-                product_counter = Counter(product_mentions)
-                return [product for product, _ in product_counter.most_common(limit)]
-            
-            return []
+            self._refresh_articles(search_query)
+            self.store.extract_missing(category.lower(), search_query, self.article_products)
+
+            counts = self.store.mention_counts(category.lower(), search_query,
+                                               since=time.time() - DISCOVERY_WINDOW, limit=limit)
+            return [product for product, _ in counts]
             
         except Exception as e:
             self.logger.error(f"Error discovering products: {str(e)}")
             return []
 
+    def _interest_over_time(self, payload: List[str]):
+        """interest_over_time frame of one payload, from the disk cache when it is recent enough"""
+        key = hashlib.sha256(json.dumps([payload, self.trends.hl, self.trends.tz]).encode()).hexdigest()[:24]
+        path = os.path.join(TRENDS_CACHE_DIR, f"{key}.pkl")
+        try:
+            if time.time() - os.path.getmtime(path) < TRENDS_CACHE_TTL:
+                import pandas as pd
+                return pd.read_pickle(path)
+        except (OSError, ValueError, EOFError):
+            pass
+        _trends_limiter.acquire()
+        self.trends.build_payload(payload)
+        frame = self.trends.interest_over_time()
+        try:
+            os.makedirs(TRENDS_CACHE_DIR, exist_ok=True)
+            frame.to_pickle(f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            self.logger.warning(f"Could not cache Google Trends data: {e}")
+        return frame
+
+    def get_trend_scores(self, terms: List[str], anchor: Optional[str] = None) -> Dict[str, float]:
+        """
+        Mean Google Trends interest (0-100) of any number of terms on one scale.
+
+        Terms are queried in payloads of TRENDS_BATCH that all include `anchor`
+        (default: the first term). Each payload is rescaled so the anchor's
+        interest matches its level in the first payload, then everything is
+        scaled so the highest point is 100, as if all terms had been compared
+        in a single request.
+        """
+        if not terms:
+            return {}
+        anchor = anchor or terms[0]
+        series = {}
+        reference = None
+        for payload in _trend_batches(terms, anchor):
+            try:
+                frame = self._interest_over_time(payload)
+            except Exception as e:
+                self.logger.warning(f"Google Trends request failed for {payload}: {e}")
+                continue
+            if frame.empty or anchor not in frame.columns:
+                continue
+            level = frame[anchor].mean()
+            if reference is None and level > 0:
+                reference = level
+            if level > 0:
+                scale = reference / level
+            else:
+                scale = 1.0
+                self.logger.warning(f"Anchor '{anchor}' has no interest in {payload}; its scores are not normalized")
+            for term in payload:
+                if term in frame.columns and term not in series:
+                    series[term] = frame[term] * scale
+        if not series:
+            return {}
+        peak = max(s.max() for s in series.values())
+        if peak <= 0:
+            return {term: 0.0 for term in series}
+        return {term: float(s.mean() * 100 / peak) for term, s in series.items()}
+
     def get_product_scores(self, category: str, products: List[str]) -> Dict:
         """Get combined scores based on news mentions and trends"""
         scores = {}
         
         try:
+            results = self.fetcher.get_many([f"{product} {category} India" for product in products])
             for product in products:
-                search_query = f"{product} {category} India"
-                news_results = self.news.get_news(search_query)
-                scores[product] = len(news_results)
-                time.sleep(1)
+                scores[product] = len(results[f"{product} {category} India"])
             
-            if len(products) <= 5:
-                search_terms = [f"{product} {category} India" for product in products]
-                self.trends.build_payload(search_terms)
-                trends_data = self.trends.interest_over_time()
-                
-                if not trends_data.empty:
-                    for product in products:
-                        search_term = f"{product} {category} India"
-                        if search_term in trends_data.columns:
-                            trend_score = trends_data[search_term].mean()
-                            scores[product] = scores[product] * (1 + trend_score/100)
+            # The most reported product is the anchor: it is the most likely to have
+            # search interest in every batch, which normalization depends on
+            search_terms = {product: f"{product} {category} India" for product in products}
+            anchor = search_terms[max(products, key=lambda p: scores.get(p, 0))] if products else None
+            trend_scores = self.get_trend_scores(list(search_terms.values()), anchor=anchor)
+            for product, search_term in search_terms.items():
+                if search_term in trend_scores:
+                    scores[product] = scores[product] * (1 + trend_scores[search_term]/100)
             
         except Exception as e:
             self.logger.error(f"Error calculating scores: {str(e)}")
@@ -206,9 +683,23 @@ class AutoProductRanker:
 
 
 
+_ranker = None
+_ranker_lock = threading.Lock()
+
+
+def get_ranker() -> AutoProductRanker:
+    """The process-wide ranker; its clients, caches and article store are reused by every call."""
+    global _ranker
+    if _ranker is None:
+        with _ranker_lock:
+            if _ranker is None:
+                _ranker = AutoProductRanker()
+    return _ranker
+
+
 ### main function to call
 def findtrend(category='bike',limit=5):
-    ranker = AutoProductRanker()
+    ranker = get_ranker()
     
     categories = ["smartphone", "laptop", "bike", "car", "drone"]
     print("\nAvailable categories:")
@@ -0,0 +1,212 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import runpy
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Heavy modules every pipeline job needs; imported once per worker instead of once per job
+DEFAULT_PRELOAD = (
+    "moviepy.editor",
+    "pydub",
+    "gtts",
+    "google.generativeai",
+    "pollinations",
+    "genmethods",
+    "media_methods",
+    "main",
+)
+
+
+def _warm_clients() -> None:
+    """Create the API clients a job would otherwise create on first use."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    from providers import get_providers
+    providers = get_providers()
+    if api_key:
+        providers.script_model(api_key)
+
+
+def _run_spec(spec: Dict) -> Tuple[bool, str]:
+    """Run one job inside the worker process."""
+    script = spec["script"]
+    params = spec.get("params") or {}
+    if os.path.basename(script) == "main.py":
+        from main import run_project
+        from project import Project
+        project = Project.from_dict(params["project"]) if params.get("project") else Project.from_config()
+        report = run_project(project, force=params.get("force", ()), from_stage=params.get("from_stage"))
+        return report.ok, report.summary()
+
+    # Any other script runs as if started with `python <script>`
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            return False, f"{script} exited with status {e.code}"
+    return True, f"{script} completed"
+
+
+def _worker_main(conn, preload: Sequence[str], max_jobs: int) -> None:
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Worker could not preload {module}: {e}")
+    try:
+        _warm_clients()
+    except Exception as e:
+        logger.warning(f"Worker could not create API clients: {e}")
+    # Progress events from the pipeline's stage threads share the job's pipe
+    import progress
+    send_lock = threading.Lock()
+
+    def send_progress(event):
+        with send_lock:
+            conn.send(("progress", event))
+    progress.set_sink(send_progress)
+
+    conn.send(("ready", os.getpid()))
+
+    for _ in range(max_jobs):
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg[0] == "stop":
+            return
+        try:
+            success, message = _run_spec(msg[1])
+        except BaseException as e:
+            success, message = False, f"{e}\n{traceback.format_exc()}"
+        with send_lock:
+            conn.send(("result", success, message))
+    # Exit after max_jobs jobs; the pool replaces this worker with a fresh one
+
+
+class _Worker:
+    def __init__(self, ctx, preload: Sequence[str], max_jobs: int):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, tuple(preload), max_jobs), daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    async def recv(self):
+        """Wait for the next message from the worker without blocking the event loop."""
+        if not self.conn.poll():
+            loop = asyncio.get_running_loop()
+            readable = loop.create_future()
+            fd = self.conn.fileno()
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+            try:
+                await readable
+            finally:
+                loop.remove_reader(fd)
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Pool of long-lived worker processes that run pipeline jobs in-process.
+
+    Workers import the heavy media/AI modules and create the API clients once
+    at startup, so a job starts running immediately instead of paying
+    interpreter startup and import time. Each worker is replaced by a fresh
+    one after `max_jobs_per_worker` jobs to bound memory growth, and a worker
+    whose job is cancelled is killed and replaced.
+
+    Args:
+        size (int): Number of worker processes
+        max_jobs_per_worker (int): Jobs a worker runs before it is recycled (default: 20)
+        preload (Sequence[str]): Modules imported by each worker at startup
+    """
+
+    def __init__(self, size: int, max_jobs_per_worker: int = 20, preload: Sequence[str] = DEFAULT_PRELOAD):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.preload = preload
+        # spawn: a fork of the bot would inherit its event loop and threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[_Worker] = []
+
+    def _spawn(self) -> None:
+        worker = _Worker(self._ctx, self.preload, self.max_jobs_per_worker)
+        self._workers.append(worker)
+        self._idle.put_nowait(worker)
+
+    def _retire(self, worker: _Worker) -> None:
+        worker.kill()
+        self._workers.remove(worker)
+        self._spawn()
+
+    def start(self) -> None:
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._spawn()
+        logger.info(f"Started {self.size} warm worker(s)")
+
+    async def run(
+        self,
+        script: str,
+        params: Optional[Dict] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Tuple[bool, str]:
+        """
+        Run a job on the next idle worker.
+
+        Cancelling the awaiting task kills the worker running the job.
+
+        Args:
+            script (str): Script file of the job
+            params (dict): Job parameters
+            on_progress (Callable): Called with each progress event the job emits
+
+        Returns:
+            Tuple[bool, str]: (Success status, Message)
+        """
+        worker = await self._idle.get()
+        try:
+            worker.conn.send(("run", {"script": script, "params": params or {}}))
+            while True:
+                msg = await worker.recv()
+                if msg[0] == "result":
+                    break
+                if msg[0] == "progress" and on_progress:
+                    on_progress(msg[1])
+        except asyncio.CancelledError:
+            self._retire(worker)
+            raise
+        except (EOFError, OSError) as e:
+            self._retire(worker)
+            return False, f"Worker exited unexpectedly: {e}"
+
+        worker.jobs += 1
+        if worker.jobs >= self.max_jobs_per_worker:
+            self._retire(worker)
+        else:
+            self._idle.put_nowait(worker)
+        return msg[1], msg[2]
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            try:
+                worker.conn.send(("stop",))
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self._workers = []